@@ -1,56 +1,83 @@
+import argparse
 import tkinter as tk
-from tkinter import ttk, messagebox
-import json
-import os
-from datetime import datetime, timedelta
+from tkinter import ttk, messagebox, simpledialog
+from datetime import datetime
 import calendar
-from collections import defaultdict
+from habit_store import HabitStore, date_range, parse_date
+from habit_writer import CoalescingWriter
+from habit_scheduler import RefreshScheduler
+from habit_worker import IOWorker
+import habit_analytics
+from habit_themes import load_themes, theme_label
+from habit_widgets import CalendarCanvas, DebugOverlay, HeatmapCanvas, ThemeRegistry
+from habit_profiler import Profiler
+from habit_search import HabitIndex
+from habit_history import AddHabit, CommandHistory, DeleteHabit, EditHabit, SetCompletions
+from habit_calendar import MonthCache
+from habit_schedule import DAILY
+from habit_workspace import Workspace
+
+# Vistas de la pestaña calendario
+CALENDAR_VIEWS = {"Mes": "month", "Año": "year", "Comparar": "compare"}
+
+# Filtros de estado de la lista de habitos
+STATUS_FILTERS = {"Todos": None, "Pendientes hoy": "pending", "Racha ≥ N": "streak"}
+ALL_CATEGORIES = "Todas"
+
+# Frecuencias sugeridas (se puede escribir cualquier otra valida)
+FREQUENCY_PRESETS = [DAILY, "weekly:3", "weekdays:0,2,4", "weekdays:5,6", "every:2"]
+
+# Lista virtualizada: a partir de cuantos habitos y alto fijo de cada fila
+VIRTUAL_THRESHOLD = 200
+VIRTUAL_ROW_HEIGHT = 150
+VIRTUAL_BUFFER_ROWS = 3 # filas ya colocadas por encima y por debajo del viewport
+VIRTUAL_MIN_ROWS = 3 # alto minimo del viewport virtual, en filas
 
 class HabitTracker:
-    def __init__(self):
+    def __init__(self, profile=False):
         self.root = tk.Tk()
         self.root.title("Habit Tracker - Seguimiento de Habitos")
         self.root.geometry("1100x800")
 
+        # Instrumentacion opcional (HABIT_PROFILE=1 o --profile)
+        self.profiler = Profiler.from_env(force=profile)
+        self.profiler.count_widgets(tk)
+        self.profiler.instrument(self, {"load_store": "load_data",
+                                        "refresh_display": "refresh_display",
+                                        "update_stats": "update_stats",
+                                        "update_habits_display": "update_habits_display",
+                                        "update_calendar": "update_calendar",
+                                        "update_heatmap": "update_heatmap",
+                                        "update_analytics": "update_analytics",
+                                        "apply_theme": "apply_theme"})
+
         # Configuracion de temas
         self.current_theme = "light"
-        self.themes = {
-            "light": {
-                "bg_primary": "#f0f4f8",
-                "bg_secondary": "white",
-                "bg_accent": "#4338ca",
-                "text_primary": "#1e293b",
-                "text_secondary": "#64748b",
-                "text_accent": "white",
-                "border": "#e2e8f0",
-                "success": "#059669",
-                "danger": "#dc2626",
-                "card_bg": "white",
-                "stats_bg": "#f8fafc"
-            },
-            "dark": {
-                "bg_primary": "#0f172a",
-                "bg_secondary": "#1e293b",
-                "bg_accent": "#6366f1",
-                "text_primary": "#f1f5f9",
-                "text_secondary": "#94a3b8",
-                "text_accent": "white",
-                "border": "#334155",
-                "success": "#10b981",
-                "danger": "#ef4444",
-                "card_bg": "#1e293b",
-                "stats_bg": "#0f172a"
-            }
-        }
-
-        # Datos 
-        self.data_file = "habits_data.json"
-        self.habits = {}
-        self.completions = defaultdict(set) # {habit_name: set(dates)}
+        self.themes = load_themes()
+        self.theme_registry = ThemeRegistry()
+
+        # Perfiles: un archivo de datos cada uno, con los almacenes recientes en cache
+        self.workspace = Workspace()
+        self.profile_name = self.workspace.active
+        self.histories = {} # {perfil: CommandHistory}, se descartan al expulsar el perfil
+        self.decoding = set() # perfiles con historiales decodificandose
+
+        # Datos (vacios hasta que termine la carga en segundo plano)
+        self.store = self.workspace.open(self.profile_name)
+        self.store_ready = False
+        self.shown_profile = None # perfil de self.store una vez cargado
         self.selected_habit_for_calendar = None
+        self.month_cache = MonthCache(self.load_month_completed, load_due=self.load_month_due)
+        self.history = CommandHistory(self.store)
 
-        # Cargar datos exsistentes
-        self.load_data()
+        # Hilo de E/S: cargas y guardados fuera del mainloop
+        self.worker = IOWorker(self.root)
+
+        # Agrupar guardados rapidos en un solo flush
+        self.writer = CoalescingWriter(self.save_in_background, delay=0.5,
+                                       after=lambda delay, callback: self.root.after(int(delay * 1000), callback),
+                                       cancel=self.root.after_cancel)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Configurar estilos
         self.setup_styles()
@@ -58,17 +85,42 @@ class HabitTracker:
         # Crear interfaz
         self.create_widgets()
 
+        # Repintado agrupado por regiones sucias
+        self.scheduler = RefreshScheduler(self.root, {
+            "stats": lambda keys: self.update_stats(),
+            "habits": self.update_habits_display,
+            "calendar": lambda keys: self.update_calendar(),
+            "analytics": lambda keys: self.on_tab_changed(),
+        })
+        self.profiler.instrument(self.scheduler, {"flush": "frame"})
+        if self.profiler.enabled:
+            self.debug_overlay = DebugOverlay(self.root, self.profiler)
+            self.root.bind("<F12>", self.debug_overlay.toggle)
+            self.profiler.watch_mainloop(self.root)
+
         # Actualizar vista
         self.refresh_display()
         self.apply_theme()
 
+        # Cargar datos exsistentes
+        self.start_loading()
+
     def get_theme(self, key):
         """Obtener color del tema actual"""
         return self.themes[self.current_theme][key]
     
+    def themed(self, widget, role="primary"):
+        """Registrar un widget en el tema con su rol y devolverlo"""
+        return self.theme_registry.register(widget, role, self.themes[self.current_theme])
+
+    def next_theme(self):
+        """Nombre del tema siguiente (claro, oscuro y los personalizados)"""
+        names = list(self.themes)
+        return names[(names.index(self.current_theme) + 1) % len(names)]
+
     def toggle_theme(self):
-        """Cambiar entre tema claro y oscuro"""
-        self.current_theme = "dark" if self.current_theme == "light" else "light"
+        """Cambiar al siguiente tema"""
+        self.current_theme = self.next_theme()
         self.apply_theme()
 
     def apply_theme(self):
@@ -76,60 +128,17 @@ class HabitTracker:
         # Configurar root
         self.root.configure(bg=self.get_theme("bg_primary"))
 
-        # Aplicar tema recursivamente
-        self._apply_theme_recursive(self.root)
+        # Actualizar por lotes los widgets registrados por rol
+        self.theme_registry.apply(self.themes[self.current_theme])
+        self.theme_button.configure(text=theme_label(self.next_theme()))
 
         # Actualizar estilos de ttk
         self.setup_styles()
 
-    def _apply_theme_recursive(self, widget):
-        """Aplicar tema recursivamente a widgets"""
-        widget_class = widget.winfo_class()
-
-        if widget_class == "Frame":
-            if hasattr(widget, '_theme_type'):
-                if widget._theme_type == 'card':
-                    widget.configure(bg=self.get_theme("card_bg"))
-                elif widget._theme_type == 'stats':
-                    widget.configure(bg=self.get_theme("stats_bg"))
-                elif widget._theme_type == 'header':
-                    widget.configure(bg=self.get_theme("bg_accent"))
-                else:
-                    widget.configure(bg=self.get_theme("bg_primary"))
-            else:
-                widget.configure(bg=self.get_theme("bg_primary"))
-        
-        elif widget_class == "Label":
-            if hasattr(widget, '_theme_type'):
-                if widget._theme_type == 'header':
-                    widget.configure(bg=self.get_theme("bg_accent"), fg=self.get_theme("text_accent"))
-                elif widget._theme_type == 'accent':
-                    widget.configure(bg=self.get_theme("bg_accent"), fg=self.get_theme("text_accent"))
-                elif widget._theme_type == 'card':
-                    widget.configure(bg=self.get_theme("card_bg"), fg=self.get_theme("text_primary"))
-                elif widget._theme_type == 'stats':
-                    widget.configure(bg=self.get_theme("stats_bg"), fg=self.get_theme("text_primary"))
-                elif widget._theme_type == 'secondary':
-                    widget.configure(bg=self.get_theme("card_bg"), fg=self.get_theme("text_secondary"))
-                else:
-                    widget.configure(bg=self.get_theme("bg_primary"), fg=self.get_theme("text_primary"))
-            else:
-                # Detectar por color de fondo actual
-                current_bg = str(widget.cget("bg"))
-                if current_bg in ["white", "#ffffff"]:
-                    widget.configure(bg=self.get_theme("card_bg"), fg=self.get_theme("text_primary"))
-                else:
-                    widget.configure(bg=self.get_theme("bg_primary"), fg=self.get_theme("text_primary"))
-
-        elif widget_class == "Button":
-            # Los botones mantienen sus colores especificos
-            pass
-        elif widget_class == "Canvas":
-            widget.configure(bg=self.get_theme("bg_primary"))
-
-        # Aplicar recursivamente a hijos
-        for child in widget.winfo_children():
-            self._apply_theme_recursive(child)
+        # Recolorear items del calendario y cards de estadisticas
+        self.calendar_canvas.refresh_colors()
+        self.heatmap_canvas.refresh_colors()
+        self.scheduler.mark("stats")
 
     def setup_styles(self):
         """Configurar estilos personalizados"""
@@ -156,6 +165,17 @@ class HabitTracker:
                         fieldbackground=self.get_theme("card_bg"),
                         background=self.get_theme("card_bg"),
                         foreground=self.get_theme("text_primary"))
+
+        # Estilo para la tabla de analiticas
+        style.configure("Custom.Treeview",
+                        background=self.get_theme("card_bg"),
+                        fieldbackground=self.get_theme("card_bg"),
+                        foreground=self.get_theme("text_primary"),
+                        rowheight=26)
+        style.configure("Custom.Treeview.Heading",
+                        background=self.get_theme("bg_secondary"),
+                        foreground=self.get_theme("text_primary"),
+                        font=("Arial", 10, "bold"))
         
     def create_widgets(self):
         """Crear todos los widgets de la interfaz"""
@@ -171,11 +191,13 @@ class HabitTracker:
 
         # Pestaña calendario
         self.create_calendar_tab()
+
+        # Pestaña de analiticas
+        self.create_analytics_tab()
     
     def create_header(self):
         """Crear el header de la aplicacion"""
-        header_frame = tk.Frame(self.root, height=100)
-        header_frame._theme_type = 'header'
+        header_frame = self.themed(tk.Frame(self.root, height=100), 'header')
         header_frame.pack(fill="x", padx=20, pady=(20, 20))
         header_frame.pack_propagate(False)
 
@@ -183,34 +205,191 @@ class HabitTracker:
         title_label = tk.Label(header_frame,
                                text=" Habit Tracker",
                                font=("Arial", 24, "bold"))
-        title_label._theme_type = 'header'
+        self.themed(title_label, 'header')
         title_label.pack(side="left", padx=20, pady=20)
 
         # Botones del header
-        header_buttons = tk.Frame(header_frame)
-        header_buttons._theme_type = 'header'
+        header_buttons = self.themed(tk.Frame(header_frame), 'header')
         header_buttons.pack(side="right", padx=20, pady=20)
 
         # Boton cambiar tema
-        theme_text = " Oscuro" if self.current_theme == "light" else "Claro"
-        self.theme_button = tk.Button(header_buttons, text=theme_text,
+        self.theme_button = tk.Button(header_buttons, text=theme_label(self.next_theme()),
                                       command=self.toggle_theme,
-                                      bg=self.get_theme("card_bg"),
-                                      fg=self.get_theme("text_primary"),
                                       font=("Arial", 10, "bold"),
                                       relief="solid", bd=1)
-        self.theme_button.pack()
+        self.themed(self.theme_button, 'card')
+        self.theme_button.pack(side="right")
+
+        # Selector de perfil
+        new_profile_button = tk.Button(header_buttons, text="+ Perfil", command=self.new_profile,
+                                       font=("Arial", 10, "bold"), relief="solid", bd=1)
+        self.themed(new_profile_button, 'card')
+        new_profile_button.pack(side="right", padx=(0, 10))
+        self.profile_var = tk.StringVar(value=self.profile_name)
+        self.profile_selector = ttk.Combobox(header_buttons, textvariable=self.profile_var,
+                                             values=self.workspace.names(), width=14, state="readonly",
+                                             style="Custom.TCombobox")
+        self.profile_selector.bind("<<ComboboxSelected>>",
+                                   lambda event: self.switch_profile(self.profile_var.get()))
+        self.profile_selector.pack(side="right", padx=(0, 10))
+
+        # Deshacer / rehacer (tambien con Ctrl+Z y Ctrl+Y)
+        for text, command in (("Rehacer", self.redo), ("Deshacer", self.undo)):
+            button = tk.Button(header_buttons, text=text, command=command,
+                               font=("Arial", 10, "bold"), relief="solid", bd=1)
+            self.themed(button, 'card')
+            button.pack(side="right", padx=(0, 10))
+        self.root.bind("<Control-z>", lambda event: self.undo())
+        self.root.bind("<Control-y>", lambda event: self.redo())
+        self.root.bind("<Control-Z>", lambda event: self.redo())
+
+        # Estado de carga y errores de guardado (sin ventanas modales)
+        self.status_label = self.themed(tk.Label(header_frame, text="", font=("Arial", 10)), 'header')
+        self.status_label.pack(side="right", padx=10)
+
+    def show_status(self, text=""):
+        """Mostrar un aviso no bloqueante en el header"""
+        self.status_label.configure(text=text)
+
+    def load_store(self, profile_name):
+        """Abrir y cargar los metadatos de un perfil (se ejecuta en el hilo de E/S)"""
+        store = self.workspace.open(profile_name)
+        if isinstance(store, HabitStore):
+            store.load_data(lazy=True)
+        else:
+            store.load_data()
+        return store
+
+    def start_loading(self):
+        """Cargar los datos del perfil activo en segundo plano mostrando el estado de carga"""
+        profile_name = self.profile_name
+        self.show_status("Cargando habitos...")
+        self.worker.submit(lambda: self.load_store(profile_name),
+                           on_done=lambda store: self.on_store_loaded(profile_name, store),
+                           on_error=self.on_load_error)
+
+    def on_store_loaded(self, profile_name, store):
+        """Guardar el almacen cargado en la cache y mostrarlo si su perfil sigue activo"""
+        store.on_external_change = lambda: self.on_external_change(store)
+        if profile_name == self.profile_name:
+            self.install_store(profile_name, store)
+        # Si se cambio de perfil durante la carga, el almacen queda en cache para luego;
+        # el perfil que sigue en pantalla no se expulsa aunque ya no sea el activo
+        for evicted_name, evicted in self.workspace.put(profile_name, store, keep=(self.shown_profile,)):
+            self.close_store(evicted_name, evicted)
+
+    def install_store(self, profile_name, store):
+        """Sustituir el almacen mostrado por el de un perfil y repintar"""
+        if self.store_ready and store is not self.store:
+            self.writer.flush() # los cambios pendientes son del perfil anterior
+        self.store = store
+        self.store_ready = True
+        self.shown_profile = profile_name
+        self.selected_habit_for_calendar = None
+        self.calendar_anchor = None
+        self.month_cache.clear()
+        self.history = self.histories.setdefault(profile_name, CommandHistory(store))
+        self.habit_index.rebuild(store.habits)
+        self.update_category_filter()
+        self.profile_var.set(profile_name)
+        self.scheduler.mark_all()
+
+        # Los historiales se decodifican despues del primer pintado
+        decode = store.prepare_history_load() if isinstance(store, HabitStore) else None
+        if decode is None or profile_name in self.decoding:
+            self.show_status()
+        else:
+            self.show_status("Cargando historial...")
+            self.decoding.add(profile_name)
+            self.worker.submit(decode, on_done=lambda bitmaps: self.on_histories_loaded(profile_name, store, bitmaps),
+                               on_error=lambda error: self.on_history_error(profile_name, error))
+
+    def on_external_change(self, store):
+        """Otro proceso (la CLI) cambio el archivo: repintar con lo incorporado al guardar"""
+        if store is not self.store:
+            return
+        self.month_cache.clear()
+        self.habit_index.rebuild(store.habits)
+        self.update_category_filter()
+        self.scheduler.mark_all()
+
+    def on_histories_loaded(self, profile_name, store, bitmaps):
+        """Instalar los historiales decodificados en segundo plano"""
+        self.decoding.discard(profile_name)
+        store.install_histories(bitmaps)
+        if store is self.store:
+            self.show_status()
+            self.scheduler.mark_all()
+
+    def on_history_error(self, profile_name, error):
+        """Avisar del fallo al decodificar; otra instalacion del perfil lo reintentara"""
+        self.decoding.discard(profile_name)
+        self.on_load_error(error)
+
+    def switch_profile(self, profile_name):
+        """Mostrar otro perfil: al instante si esta en cache, si no cargandolo"""
+        if profile_name == self.profile_name:
+            return
+        self.profile_name = profile_name
+        self.workspace.activate(profile_name)
+        self.worker.submit(self.workspace.prepare_save(), on_error=self.on_save_error)
+        store = self.workspace.cached(profile_name)
+        if store is not None:
+            self.install_store(profile_name, store)
+            self.show_status(f"Perfil '{profile_name}'")
+        else:
+            # El perfil anterior sigue visible (y guardandose) hasta que termine la carga
+            self.start_loading()
+
+    def new_profile(self):
+        """Crear un perfil con su propio archivo de datos y cambiar a el"""
+        name = simpledialog.askstring("Nuevo perfil", "Nombre del perfil:", parent=self.root)
+        if not name:
+            return
+        sqlite = messagebox.askyesno(
+            "Nuevo perfil",
+            "Guardar este perfil en una base SQLite (.db)?\n\n"
+            "Conviene con historiales muy grandes; con \"No\" se usa un archivo JSON.",
+            parent=self.root)
+        try:
+            self.workspace.add_profile(name, sqlite=sqlite)
+        except ValueError as e:
+            messagebox.showwarning("Error", str(e))
+            return
+        self.profile_selector['values'] = self.workspace.names()
+        self.switch_profile(name.strip())
+
+    def close_store(self, profile_name, store):
+        """Guardar lo pendiente de un perfil expulsado de la cache y cerrarlo"""
+        self.histories.pop(profile_name, None)
+        write = store.prepare_persist()
+        if write is not None:
+            self.worker.submit(write, on_error=self.on_save_error)
+        store.close()
+
+    def on_load_error(self, error):
+        """Avisar del fallo de carga; los cambios quedan bloqueados para no pisar el archivo"""
+        self.show_status(f"Error al cargar los datos: {error}")
+
+    def save_in_background(self):
+        """Capturar los cambios en el hilo de Tk y escribirlos en el de E/S"""
+        write = self.store.prepare_persist()
+        if write is not None:
+            self.worker.submit(self.profiler.wrap("save_data", write), on_error=self.on_save_error)
+
+    def on_save_error(self, error):
+        """Avisar sin bloquear; el siguiente guardado reescribe el snapshot completo"""
+        self.show_status(f"Error al guardar: {error}")
     
     def create_main_tab(self):
         """Crear pestaña principal con habitos"""
         # Frame principal con scrollbar
-        main_frame = tk.Frame(self.notebook)
-        main_frame.configure(bg=self.get_theme("bg_primary"))
+        main_frame = self.themed(tk.Frame(self.notebook))
 
-        main_canvas = tk.Canvas(main_frame, bg=self.get_theme("bg_primary"))
+        main_canvas = self.themed(tk.Canvas(main_frame))
+        self.main_canvas = main_canvas
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=main_canvas.yview)
-        self.scrollable_frame = tk.Frame(main_canvas)
-        self.scrollable_frame.configure(bg=self.get_theme("bg_primary"))
+        self.scrollable_frame = self.themed(tk.Frame(main_canvas))
 
         self.scrollable_frame.bind(
             "<Configure>",
@@ -234,6 +413,7 @@ class HabitTracker:
             main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
 
         main_canvas.bind("<MouseWheel>", _on_mousewheel)
+        main_canvas.bind("<Configure>", lambda e: self.render_visible_rows())
 
         # Packs canvas y scrollbar
         main_canvas.pack(side="left", fill="both", expand=True)
@@ -244,29 +424,25 @@ class HabitTracker:
 
     def create_calendar_tab(self):
         """Crear pestaña de calendario"""
-        calendar_frame = tk.Frame(self.notebook)
-        calendar_frame.configure(bg=self.get_theme("bg_primary"))
+        calendar_frame = self.themed(tk.Frame(self.notebook))
 
         # Frame principal del calendario
-        main_cal_frame = tk.Frame(calendar_frame)
-        main_cal_frame.configure(bg=self.get_theme("bg_primary"))
+        main_cal_frame = self.themed(tk.Frame(calendar_frame))
         main_cal_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
         # Titulo y selector de habito
-        top_frame = tk.Frame(main_cal_frame)
-        top_frame.configure(bg=self.get_theme("bg_primary"))
+        top_frame = self.themed(tk.Frame(main_cal_frame))
         top_frame.pack(fill="x", pady=(0, 20))
 
-        tk.Label(top_frame, text="Calendario de habitos",
-                 font=("Arial", 18, "bold")).pack(side="left")
+        self.themed(tk.Label(top_frame, text="Calendario de habitos",
+                             font=("Arial", 18, "bold"))).pack(side="left")
         
         # Selector de habito
-        selector_frame = tk.Frame(top_frame)
-        selector_frame.configure(bg=self.get_theme("bg_primary"))
+        selector_frame = self.themed(tk.Frame(top_frame))
         selector_frame.pack(side="right")
 
-        tk.Label(selector_frame, text="Habito",
-                 font=("Arial", 12)).pack(side="left", padx=(0,5))
+        self.themed(tk.Label(selector_frame, text="Habito",
+                             font=("Arial", 12))).pack(side="left", padx=(0,5))
         
         self.habit_selector = ttk.Combobox(selector_frame, width=20,
                                           style="Custom.TCombobox")
@@ -274,65 +450,163 @@ class HabitTracker:
         self.habit_selector.pack(side="left")
         self.habit_selector.bind('<<ComboboxSelected>>', self.on_habit_selected)
 
+        # Selector de vista: mes, año de un habito o comparacion de todos
+        self.themed(tk.Label(selector_frame, text="Vista",
+                             font=("Arial", 12))).pack(side="left", padx=(15, 5))
+        self.calendar_view_var = tk.StringVar(value="Mes")
+        view_selector = ttk.Combobox(selector_frame, textvariable=self.calendar_view_var,
+                                     values=list(CALENDAR_VIEWS), width=10,
+                                     state="readonly", style="Custom.TCombobox")
+        view_selector.pack(side="left")
+        view_selector.bind('<<ComboboxSelected>>', self.on_calendar_view_changed)
+        self.calendar_view = "month"
+
+        # Marcar rangos de fechas en varios habitos a la vez
+        backfill_button = tk.Button(selector_frame, text="Rellenar rango",
+                                    command=self.open_backfill_dialog,
+                                    font=("Arial", 10, "bold"))
+        self.themed(backfill_button, 'accent')
+        backfill_button.pack(side="left", padx=(15, 0))
+
         # Frame del calendario
-        self.calendar_frame = tk.Frame(main_cal_frame)
-        self.calendar_frame.configure(bg=self.get_theme("bg_primary"))
+        self.calendar_frame = self.themed(tk.Frame(main_cal_frame))
         self.calendar_frame.pack(fill="both", expand=True)
 
         # Controles de navegacion del calendario
-        nav_frame = tk.Frame(self.calendar_frame)
-        nav_frame.configure(bg=self.get_theme("bg_primary"))
+        nav_frame = self.themed(tk.Frame(self.calendar_frame))
         nav_frame.pack(fill="x", pady=(0, 20))
 
         self.prev_button = tk.Button(nav_frame, text="< Anterior",
                                      command=self.prev_month,
-                                     bg=self.get_theme("bg_accent"),
-                                     fg=self.get_theme("text_accent"),
                                      font=("Arial", 10, "bold"))
+        self.themed(self.prev_button, 'accent')
         self.prev_button.pack(side="left")
 
-        self.month_label = tk.Label(nav_frame, text="",
-                                    font=("Arial", 16, "bold"))
+        self.month_label = self.themed(tk.Label(nav_frame, text="",
+                                                font=("Arial", 16, "bold")))
         self.month_label.pack(side="left", expand=True)
 
         self.next_button = tk.Button(nav_frame, text="> Siguiente",
                                      command=self.next_month,
-                                     bg=self.get_theme("bg_accent"),
-                                     fg=self.get_theme("text_accent"),
                                      font=("Arial", 10, "bold"))
+        self.themed(self.next_button, 'accent')
         self.next_button.pack(side="right")
 
         # Variables para el calendario
         self.current_cal_date = datetime.now()
+        self.calendar_anchor = None # (fecha, estado) del ultimo clic, para Shift+clic
 
         # Grid del calendario
-        self.calendar_grid_frame = tk.Frame(self.calendar_frame)
-        self.calendar_grid_frame.configure(bg=self.get_theme("bg_primary"))
-        self.calendar_grid_frame.pack(fill="both", expand=True)
+        self.calendar_canvas = self.themed(CalendarCanvas(self.calendar_frame, self.get_theme,
+                                                          on_day_click=self.on_calendar_day_click))
+        self.calendar_canvas.pack(fill="both", expand=True)
+
+        # Mapa de calor anual (se muestra en lugar de la cuadricula mensual)
+        self.heatmap_frame = self.themed(tk.Frame(self.calendar_frame))
+        self.heatmap_canvas = self.themed(HeatmapCanvas(self.heatmap_frame, self.get_theme))
+        heatmap_scroll = ttk.Scrollbar(self.heatmap_frame, orient="vertical",
+                                       command=self.heatmap_canvas.yview)
+        self.heatmap_canvas.configure(yscrollcommand=heatmap_scroll.set)
+        self.heatmap_canvas.pack(side="left", fill="both", expand=True)
+        heatmap_scroll.pack(side="right", fill="y")
 
         self.notebook.add(calendar_frame, text=" Calendario")
 
         # Actualizar calendario inicial
         self.update_calendar()
 
+    def create_analytics_tab(self):
+        """Crear pestaña de analiticas (porcentajes, rachas y tendencias)"""
+        self.analytics_frame = self.themed(tk.Frame(self.notebook))
+
+        self.themed(tk.Label(self.analytics_frame, text="Estadisticas detalladas",
+                             font=("Arial", 18, "bold"))).pack(anchor="w", padx=20, pady=20)
+
+        self.analytics_tree = None
+        if habit_analytics.np is None:
+            missing_label = tk.Label(self.analytics_frame,
+                                     text="Instala numpy para ver las estadisticas detalladas",
+                                     font=("Arial", 14))
+            self.themed(missing_label, 'muted')
+            missing_label.pack(expand=True)
+        else:
+            table_frame = self.themed(tk.Frame(self.analytics_frame))
+            table_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+
+            columns = (["habit"] + [f"rate_{window}" for window in habit_analytics.WINDOWS]
+                       + ["longest", "trend"] + habit_analytics.WEEKDAYS)
+            self.analytics_tree = ttk.Treeview(table_frame, columns=columns, show="headings",
+                                               style="Custom.Treeview")
+            headings = (["Habito"] + [f"{window}d" for window in habit_analytics.WINDOWS]
+                        + ["Mejor racha", "Tendencia"] + habit_analytics.WEEKDAYS)
+            for column, heading in zip(columns, headings):
+                self.analytics_tree.heading(column, text=heading)
+                self.analytics_tree.column(column, width=160 if column == "habit" else 70,
+                                           anchor="w" if column == "habit" else "center")
+
+            tree_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.analytics_tree.yview)
+            self.analytics_tree.configure(yscrollcommand=tree_scroll.set)
+            self.analytics_tree.pack(side="left", fill="both", expand=True)
+            tree_scroll.pack(side="right", fill="y")
+
+        self.notebook.add(self.analytics_frame, text=" Estadisticas")
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def on_tab_changed(self, event=None):
+        """Actualizar las analiticas solo cuando su pestaña es visible"""
+        if self.notebook.select() == str(self.analytics_frame):
+            self.update_analytics()
+
+    def update_analytics(self):
+        """Recalcular la tabla de analiticas en una sola pasada vectorizada"""
+        if self.analytics_tree is None:
+            return
+        self.analytics_tree.delete(*self.analytics_tree.get_children())
+
+        for habit_name, metrics in habit_analytics.analyze(self.store).items():
+            trend = metrics["trend"]
+            values = ([habit_name]
+                      + [f"{metrics['rates'][window]:.0f}%" for window in habit_analytics.WINDOWS]
+                      + [metrics["longest_streak"], f"{trend:+.1f}"]
+                      + [f"{rate:.0f}%" for rate in metrics["weekday"]])
+            self.analytics_tree.insert("", "end", values=values)
+
     def on_habit_selected(self, event=None):
         """Cuando se selecciona un habito en el calendario"""
         selected = self.habit_selector.get()
-        if selected and selected in self.habits:
+        if selected and selected in self.store.habits:
             self.selected_habit_for_calendar = selected
             self.update_calendar()
 
+    def on_calendar_view_changed(self, event=None):
+        """Alternar entre la cuadricula mensual y los mapas de calor"""
+        view = CALENDAR_VIEWS[self.calendar_view_var.get()]
+        if view == self.calendar_view:
+            return
+        if view == "month":
+            self.heatmap_frame.pack_forget()
+            self.calendar_canvas.pack(fill="both", expand=True)
+        elif self.calendar_view == "month":
+            self.calendar_canvas.pack_forget()
+            self.heatmap_frame.pack(fill="both", expand=True)
+        self.calendar_view = view
+        self.update_calendar()
+
     def prev_month(self):
-        """Ir al mes anterior"""
-        if self.current_cal_date.month == 1:
+        """Ir al mes anterior (al año anterior en los mapas de calor)"""
+        if self.calendar_view != "month":
+            self.current_cal_date = self.current_cal_date.replace(year=self.current_cal_date.year-1, day=1)
+        elif self.current_cal_date.month == 1:
             self.current_cal_date = self.current_cal_date.replace(year=self.current_cal_date.year-1, month=12)
         else: 
             self.current_cal_date = self.current_cal_date.replace(month=self.current_cal_date.month-1)
         self.update_calendar()
 
     def next_month(self):
-        """Ir al mes siguiente"""
-        if self.current_cal_date.month == 12:
+        """Ir al mes siguiente (al año siguiente en los mapas de calor)"""
+        if self.calendar_view != "month":
+            self.current_cal_date = self.current_cal_date.replace(year=self.current_cal_date.year+1, day=1)
+        elif self.current_cal_date.month == 12:
             self.current_cal_date = self.current_cal_date.replace(year=self.current_cal_date.year+1, month=1)
         else:
             self.current_cal_date = self.current_cal_date.replace(month=self.current_cal_date.month+1)
@@ -340,12 +614,8 @@ class HabitTracker:
 
     def update_calendar(self):
         """Actualizar el calendario"""
-        # Limpiar grid anterior
-        for widget in self.calendar_grid_frame.winfo_children():
-            widget.destroy()
-
         # Actualizar selector de habitos
-        habit_names = list(self.habits.keys()) if self.habits else []
+        habit_names = list(self.store.habits.keys())
         self.habit_selector['values'] = habit_names
 
         if not self.selected_habit_for_calendar and habit_names:
@@ -353,129 +623,173 @@ class HabitTracker:
             self.habit_selector.set(self.selected_habit_for_calendar)
 
         # Actualizar etiqueta del mes
-        month_year = self.current_cal_date.strftime("%B %Y").title()
+        if self.calendar_view == "month":
+            month_year = self.current_cal_date.strftime("%B %Y").title()
+        else:
+            month_year = str(self.current_cal_date.year)
         self.month_label.configure(text=month_year)
 
         if not self.selected_habit_for_calendar:
-            no_habit_label = tk.Label(self.calendar_grid_frame,
-                                      text="No hay habitos para mostrar",
-                                      font=("Arial", 14),
-                                      fg=self.get_theme("text_secondary"))
-            no_habit_label.pack(expand=True)
+            self.calendar_canvas.show_message("No hay habitos para mostrar")
+            self.heatmap_canvas.show_message("No hay habitos para mostrar")
             return
-        
-        # Crear calendario
-        cal = calendar.monthcalendar(self.current_cal_date.year, self.current_cal_date.month)
-
-        # Headers de dias de la semana
-        days = ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom']
-        for i, day in enumerate(days):
-            header = tk.Label(self.calendar_grid_frame, text=day,
-                              font=("Arial", 12, "bold"),
-                              fg=self.get_theme("text_secondary"))
-            header._theme_type = 'secondary'
-            header.grid(row=0, column=i, pady=1, padx=1, sticky="nsew")
-
-        # Dias del calendario
-        completions = self.completions.get(self.selected_habit_for_calendar, set())
-
-        for week_num, week in enumerate(cal):
-            for day_num, day in enumerate(week):
-                if day == 0:
-                    # Dia vacio
-                    empty_frame = tk.Frame(self.calendar_grid_frame,
-                                           width=60, height=60,
-                                           bg=self.get_theme("bg_primary"))
-                    empty_frame.grid(row=week_num+1, column=day_num, padx=1, pady=1, sticky="nsew")
-                else:
-                    # Dia del mes
-                    date_str = f"{self.current_cal_date.year}-{self.current_cal_date.month:02d}-{day:02d}"
-                    is_completed = date_str in completions
-                    is_today = (datetime.now().date() ==
-                                datetime(self.current_cal_date.year, self.current_cal_date.month, day).date())
-                    
-                    # Color del dia
-                    if is_completed:
-                        bg_color = self.get_theme("success")
-                        text_color = "white"
-                    elif is_today:
-                        bg_color = self.get_theme("bg_accent")
-                        text_color = "white"
-                    else:
-                        bg_color = self.get_theme("card_bg")
-                        text_color = self.get_theme("text_primary")
-
-                    day_frame = tk.Frame(self.calendar_grid_frame,
-                                         width=60, height=60,
-                                         bg=bg_color,
-                                         relief="solid", bd=1)
-                    day_frame.grid(row=week_num+1, column=day_num, padx=1, pady=1, sticky="nsew")
-                    day_frame.pack_propagate(False)
-
-                    day_label = tk.Label(day_frame, text=str(day),
-                                         bg=bg_color, fg=text_color,
-                                         font=("Arial", 12, "bold"))
-                    day_label.pack(expand=True)
-
-                    # Indicador visual para dias completados
-                    if is_completed:
-                        check_label = tk.Label(day_frame, text="✓",
-                                               bg=bg_color, fg=text_color,
-                                               font=("Arial", 8, "bold"))
-                        check_label.place(relx=0.8, rely=0.2)
-
-            # Configurar peso de filas y columnas
-            for i in range(7):
-                self.calendar_grid_frame.columnconfigure(i, weight=1)
-            for i in range(len(cal)+1):
-                self.calendar_grid_frame.rowconfigure(i, weight=1)
-
-            # Actualizar tema del calendario
-            self._apply_theme_recursive(self.calendar_grid_frame)
+
+        if self.calendar_view != "month":
+            self.update_heatmap()
+            return
+
+        # Modelo del mes desde la cache LRU
+        model = self.month_cache.get(self.selected_habit_for_calendar,
+                                     self.current_cal_date.year, self.current_cal_date.month)
+        self.calendar_canvas.show_month(*model)
+
+    def on_calendar_day_click(self, day_number, extend):
+        """Clic: alternar un dia. Shift+clic: aplicar el mismo estado hasta el dia"""
+        habit_name = self.selected_habit_for_calendar
+        if not self.store_ready or habit_name not in self.store.habits:
+            return
+        day = datetime(self.current_cal_date.year, self.current_cal_date.month, day_number).date()
+        if day > datetime.now().date():
+            self.show_status("No se pueden marcar dias futuros")
+            return
+        if extend and self.calendar_anchor is not None:
+            anchor, done = self.calendar_anchor
+            self.set_completions([habit_name], date_range(min(anchor, day), max(anchor, day)), done)
+        else:
+            done = not self.store.is_completed(habit_name, day)
+            self.set_completions([habit_name], [day], done)
+            self.calendar_anchor = (day, done)
+
+    def open_backfill_dialog(self):
+        """Dialogo para marcar o desmarcar un rango de fechas en varios habitos"""
+        if not self.store_ready or not self.store.habits:
+            return
+        dialog = self.themed(tk.Toplevel(self.root))
+        dialog.title("Rellenar rango")
+        dialog.transient(self.root)
+
+        form = self.themed(tk.Frame(dialog))
+        form.pack(fill="both", expand=True, padx=20, pady=20)
+
+        today = datetime.now().date()
+        entries = {}
+        for row, (label, default) in enumerate((("Desde (AAAA-MM-DD):", today.replace(day=1)),
+                                                ("Hasta (AAAA-MM-DD):", today))):
+            self.themed(tk.Label(form, text=label)).grid(row=row, column=0, sticky="w", pady=(0, 5))
+            entry = self.themed(tk.Entry(form, width=14, relief="solid", bd=1), 'card')
+            entry.insert(0, default.isoformat())
+            entry.grid(row=row, column=1, sticky="w", pady=(0, 5))
+            entries[row] = entry
+
+        self.themed(tk.Label(form, text="Habitos:")).grid(row=2, column=0, sticky="nw", pady=(10, 0))
+        habit_list = self.themed(tk.Listbox(form, selectmode="multiple", height=8, exportselection=False), 'card')
+        names = list(self.store.habits)
+        habit_list.insert("end", *names)
+        if self.selected_habit_for_calendar in names:
+            habit_list.selection_set(names.index(self.selected_habit_for_calendar))
+        habit_list.grid(row=2, column=1, sticky="ew", pady=(10, 0))
+
+        def apply(done):
+            selected = [names[index] for index in habit_list.curselection()]
+            try:
+                start, end = parse_date(entries[0].get().strip()), parse_date(entries[1].get().strip())
+            except ValueError:
+                messagebox.showwarning("Error", "Fechas invalidas, usa el formato AAAA-MM-DD", parent=dialog)
+                return
+            if not selected or start > end:
+                messagebox.showwarning("Error", "Elige al menos un habito y un rango valido", parent=dialog)
+                return
+            self.set_completions(selected, date_range(start, min(end, today)), done)
+            dialog.destroy()
+
+        buttons = self.themed(tk.Frame(form))
+        buttons.grid(row=3, column=0, columnspan=2, pady=(15, 0))
+        ttk.Button(buttons, text="Marcar", command=lambda: apply(True),
+                   style="Primary.TButton").pack(side="left", padx=(0, 10))
+        self.themed(tk.Button(buttons, text="Desmarcar", command=lambda: apply(False),
+                              relief="flat", font=("Arial", 10, "bold")), 'danger').pack(side="left")
+
+    def set_completions(self, habit_names, days, done):
+        """Aplicar un cambio masivo: un solo guardado y un solo repintado"""
+        changed = self.run_command(SetCompletions(habit_names, days, done))
+        if not changed:
+            return
+        self.scheduler.mark("calendar")
+        self.show_status(f"{changed} dias {'marcados' if done else 'desmarcados'}")
+
+    def update_heatmap(self):
+        """Pintar el año del habito seleccionado o la comparacion de todos"""
+        year = self.current_cal_date.year
+        start, end = datetime(year, 1, 1), datetime(year, 12, 31)
+        today = datetime.now().date().toordinal()
+
+        def row(habit_name):
+            completed = {day.toordinal() for day in self.store.completed_dates(habit_name, start, end)}
+            created = datetime.strptime(self.store.habits[habit_name]["created_date"], "%Y-%m-%d")
+            return habit_name, completed, created.toordinal()
+
+        if self.calendar_view == "year":
+            _, completed, created = row(self.selected_habit_for_calendar)
+            self.heatmap_canvas.show_year(year, completed, created, today)
+        else:
+            self.heatmap_canvas.show_comparison(year, [row(name) for name in self.store.habits], today)
+
+    def load_month_completed(self, habit_name, year, month):
+        """Dias completados de un mes (consulta por rango, para la cache)"""
+        last_day = calendar.monthrange(year, month)[1]
+        return {day.day for day in self.store.completed_dates(habit_name, datetime(year, month, 1),
+                                                              datetime(year, month, last_day))}
+
+    def load_month_due(self, habit_name, year, month):
+        """Dias del mes que tocan segun la frecuencia (None si tocan todos)"""
+        schedule = self.store.schedule(habit_name)
+        if schedule.daily or schedule.kind == "weekly":
+            return None
+        created = parse_date(self.store.habits[habit_name]["created_date"]).toordinal()
+        mask = schedule.due_mask(created, datetime(year, month, 1).toordinal(), calendar.monthrange(year, month)[1])
+        return {index + 1 for index, due in enumerate(mask) if due}
         
     def create_stats_section(self):
         """Crear seccion de estadisticas"""
-        stats_frame = tk.Frame(self.scrollable_frame)
+        stats_frame = self.themed(tk.Frame(self.scrollable_frame))
         stats_frame.pack(fill="x", padx=0, pady=20)
 
-        tk.Label(stats_frame,
-                 text="Estadisticas",
-                 font=("Arial", 16, "bold")).pack(anchor="w", pady=(0, 10))
+        self.themed(tk.Label(stats_frame,
+                             text="Estadisticas",
+                             font=("Arial", 16, "bold"))).pack(anchor="w", pady=(0, 10))
         
         # Frame para las estadisticas
-        self.stats_container = tk.Frame(stats_frame)
+        self.stats_container = self.themed(tk.Frame(stats_frame))
+        self.stat_value_labels = []
         self.stats_container.pack(fill="x")
     
     def create_add_habit_form(self):
         """Crear formulario para agregar habitos"""
-        form_frame = tk.Frame(self.scrollable_frame, relief="solid", bd=1)
-        form_frame._theme_type = 'card'
+        form_frame = self.themed(tk.Frame(self.scrollable_frame, relief="solid", bd=1), 'card')
         form_frame.pack(fill="x", pady=(0, 20))
 
         title_label = tk.Label(form_frame,
                                text="Agregar Nuevo Habito",
                                font=("Arial", 16, "bold"))
-        title_label._theme_type = 'card'
+        self.themed(title_label, 'card')
         title_label.pack(anchor="w", padx=20, pady=(20, 10))
 
-        input_frame = tk.Frame(form_frame)
-        input_frame._theme_type = 'card'
+        input_frame = self.themed(tk.Frame(form_frame), 'card')
         input_frame.pack(fill="x", padx=20, pady=(0, 20))
 
         # Nombre del habito
         name_label = tk.Label(input_frame, text="Nombre del habito:")
-        name_label._theme_type = 'card'
+        self.themed(name_label, 'card')
         name_label.grid(row=0, column=0, sticky="w", padx=(0, 10))
 
         self.habit_name_entry = tk.Entry(input_frame, width=30, font=("Arial", 11),
-                                         bg=self.get_theme("card_bg"),
-                                         fg=self.get_theme("text_primary"),
                                          relief="solid", bd=1)
+        self.themed(self.habit_name_entry, 'card')
         self.habit_name_entry.grid(row=0, column=1, padx=(0,20))
 
         # Categoria
         cat_label = tk.Label(input_frame, text="Categoria:")
-        cat_label._theme_type = 'card'
+        self.themed(cat_label, 'card')
         cat_label.grid(row=0, column=2, sticky="w", padx=(0, 10))
 
         self.category_var = tk.StringVar(value="Salud")
@@ -486,15 +800,23 @@ class HabitTracker:
 
         # Descripcion
         desc_label = tk.Label(input_frame, text="Descripcion:")
-        desc_label._theme_type = 'card'
+        self.themed(desc_label, 'card')
         desc_label.grid(row=1, column=0, sticky="w", pady=(10, 0), padx=(0, 10))
 
         self.description_entry = tk.Entry(input_frame, width=50, font=("Arial", 11),
-                                          bg=self.get_theme("card_bg"),
-                                          fg=self.get_theme("text_primary"),
                                           relief="solid", bd=1)
+        self.themed(self.description_entry, 'card')
         self.description_entry.grid(row=1, column=1, columnspan=2, sticky="ew", pady=(10,0), padx=(0, 20))
 
+        # Frecuencia objetivo
+        freq_label = tk.Label(input_frame, text="Frecuencia:")
+        self.themed(freq_label, 'card')
+        freq_label.grid(row=2, column=0, sticky="w", pady=(10, 0), padx=(0, 10))
+
+        self.frequency_var = tk.StringVar(value=DAILY)
+        ttk.Combobox(input_frame, textvariable=self.frequency_var, values=FREQUENCY_PRESETS,
+                     style="Custom.TCombobox").grid(row=2, column=1, sticky="w", pady=(10, 0))
+
         # Boton agregar
         add_button = ttk.Button(input_frame, text="Agregar Habito",
                                  command=self.add_habit, style="Primary.TButton")
@@ -505,232 +827,515 @@ class HabitTracker:
 
     def create_habits_section(self):
         """Crear seccion de habitos existentes"""
-        self.habits_frame = tk.Frame(self.scrollable_frame)
+        self.habit_cards = {} # {habit_name: widgets de la tarjeta}
+        self.habits_frame = self.themed(tk.Frame(self.scrollable_frame))
         self.habits_frame.pack(fill="both", expand=True, pady=(0, 20))
 
-        habits_title = tk.Label(self.habits_frame,
-                                text="Mis habitos",
-                                font=("Arial", 16, "bold"))
+        habits_title = self.themed(tk.Label(self.habits_frame,
+                                            text="Mis habitos",
+                                            font=("Arial", 16, "bold")))
         habits_title.pack(anchor="w", pady=(0, 15))
 
+        # Busqueda y filtros sobre indices mantenidos (categoria y texto)
+        self.habit_index = HabitIndex()
+        self.filtered_names = []
+        filter_frame = self.themed(tk.Frame(self.habits_frame))
+        filter_frame.pack(fill="x", pady=(0, 10))
+
+        self.themed(tk.Label(filter_frame, text="Buscar:")).pack(side="left", padx=(0, 5))
+        self.search_var = tk.StringVar()
+        search_entry = self.themed(tk.Entry(filter_frame, textvariable=self.search_var, width=25,
+                                            font=("Arial", 11), relief="solid", bd=1), 'card')
+        search_entry.pack(side="left", padx=(0, 15))
+
+        self.themed(tk.Label(filter_frame, text="Categoria:")).pack(side="left", padx=(0, 5))
+        self.category_filter_var = tk.StringVar(value=ALL_CATEGORIES)
+        self.category_filter = ttk.Combobox(filter_frame, textvariable=self.category_filter_var,
+                                            values=[ALL_CATEGORIES], width=12, state="readonly",
+                                            style="Custom.TCombobox")
+        self.category_filter.pack(side="left", padx=(0, 15))
+
+        self.themed(tk.Label(filter_frame, text="Estado:")).pack(side="left", padx=(0, 5))
+        self.status_filter_var = tk.StringVar(value="Todos")
+        ttk.Combobox(filter_frame, textvariable=self.status_filter_var, values=list(STATUS_FILTERS),
+                     width=14, state="readonly", style="Custom.TCombobox").pack(side="left", padx=(0, 5))
+        self.min_streak_var = tk.StringVar(value="3")
+        self.themed(tk.Spinbox(filter_frame, from_=1, to=3650, width=5,
+                               textvariable=self.min_streak_var), 'card').pack(side="left")
+
+        for variable in (self.search_var, self.category_filter_var, self.status_filter_var, self.min_streak_var):
+            variable.trace_add("write", lambda *args: self.scheduler.mark("habits"))
+
+        # Lista virtualizada: un viewport de alto fijo con su propia barra;
+        # las filas se colocan relativas al viewport segun virtual_offset
+        self.virtual_mode = False
+        self.virtual_rows = [] # tarjetas recicladas
+        self.virtual_offset = 0 # desplazamiento en pixeles dentro de la lista
+        self.virtual_container = self.themed(tk.Frame(self.habits_frame))
+        self.virtual_container.pack_propagate(False)
+        self.virtual_viewport = self.themed(tk.Frame(self.virtual_container))
+        self.virtual_scrollbar = ttk.Scrollbar(self.virtual_container, orient="vertical",
+                                               command=self.on_virtual_scroll)
+        self.virtual_scrollbar.pack(side="right", fill="y")
+        self.virtual_viewport.pack(side="left", fill="both", expand=True)
+        # La rueda no sube de los widgets de una tarjeta a su marco: se escucha
+        # en toda la app y solo se usa si el puntero esta sobre la lista
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.root.bind_all(sequence, self.on_virtual_wheel, add="+")
+
     def add_habit(self):
         """Agregar un nuevo habito"""
+        if not self.store_ready:
+            messagebox.showwarning("Espera", "Los habitos aun se estan cargando")
+            return
         name = self.habit_name_entry.get().strip()
         category = self.category_var.get()
         description = self.description_entry.get().strip()
+        frequency = self.frequency_var.get()
 
-        if not name:
-            messagebox.showwarning("Error", "Por favor ingresa el nombre del habito")
-            return
-        
-        if name in self.habits:
-            messagebox.showwarning("Error", "Este habito ya existe")
-            return
-        
         # Agregar habito
-        self.habits[name] = {
-            "category": category,
-            "description": description,
-            "created_date": datetime.now().strftime("%Y-%m-%d"),
-            "target_frequency": "daily"
-        }
+        try:
+            self.run_command(AddHabit(name, category, description, frequency))
+        except ValueError as e:
+            messagebox.showwarning("Error", str(e))
+            return
 
         # Limpiar formulario
         self.habit_name_entry.delete(0, tk.END)
         self.description_entry.delete(0, tk.END)
 
-        # Guardar y actualizar 
-        self.save_data()
-        self.refresh_display()
-
         messagebox.showinfo("Exito", f"Habito '{name}' agregado correctamente")
 
     def toggle_habit_completion(self, habit_name):
         """Marcar/desmarcar habito como completado para hoy"""
-        today = datetime.now().strftime("%Y-%m-%d")
-
-        if today in self.completions[habit_name]:
-            self.completions[habit_name].discard(today)
-            status = "desmarcado"
-        else:
-            self.completions[habit_name].add(today)
-            status = "completado"
-
-        self.save_data()
-        self.refresh_display()
+        today = datetime.now().date()
+        done = not self.store.is_completed(habit_name, today)
+        self.run_command(SetCompletions([habit_name], [today], done))
+        status = "completado" if done else "desmarcado"
 
-        messagebox.showinfo("Actualizado", f"Habito '{habit_name}' {status} para hoy")
+        self.show_status(f"Habito '{habit_name}' {status} para hoy")
 
     def delete_habit(self, habit_name):
-        """Eliminar un habito"""
-        if messagebox.askyesno("Confirmar", f"¿Estas seguro de eliminar '{habit_name}'?"):
-            del self.habits[habit_name]
-            if habit_name in self.completions:
-                del self.completions[habit_name]
-
-            # Actualizar selector del calendario
-            if self.selected_habit_for_calendar == habit_name:
-                self.selected_habit_for_calendar = None
-
-            self.save_data()
-            self.refresh_display()
-            messagebox.showinfo("Eliminado", f"Habito '{habit_name}' eliminado")
-
-    def calculate_streak(self, habit_name):
-        """Calcular racha actual de un habito """
-        if habit_name not in self.completions:
-            return 0
-        
-        completed_dates = sorted(self.completions[habit_name])
-        if not completed_dates:
-            return 0
-        
-        # Verificar racha desde hoy hacia atras 
-        current_date = datetime.now().date()
-        streak = 0
-
-        while True:
-            date_str = current_date.strftime("%Y-%m-%d")
-            if date_str in completed_dates:
-                streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-        return streak
-    
-    def calculate_completion_rate(self, habit_name, days=30):
-        """Calcular porcentaje de completitud en los ultimos N dias"""
-        if habit_name not in self.habits:
-            return 0
-        
-        created_date = datetime.strptime(self.habits[habit_name]["created_date"], "%Y-%m-%d").date()
-        end_date = datetime.now().date()
-        start_date = max(created_date, end_date - timedelta(days=days-1))
+        """Eliminar un habito (se puede deshacer)"""
+        self.run_command(DeleteHabit(habit_name))
+        self.show_status(f"Habito '{habit_name}' eliminado (Ctrl+Z para deshacer)")
+
+    def edit_habit(self, habit_name):
+        """Dialogo para cambiar la categoria, la descripcion y la frecuencia de un habito"""
+        data = self.store.habits[habit_name]
+        dialog = self.themed(tk.Toplevel(self.root))
+        dialog.title(f"Editar '{habit_name}'")
+        dialog.transient(self.root)
+
+        form = self.themed(tk.Frame(dialog))
+        form.pack(fill="both", expand=True, padx=20, pady=20)
+
+        self.themed(tk.Label(form, text="Categoria:")).grid(row=0, column=0, sticky="w", pady=(0, 5))
+        category_var = tk.StringVar(value=data.get("category", "Otro"))
+        ttk.Combobox(form, textvariable=category_var,
+                     values=["Salud", "Ejercicio", "Estudio", "Trabajo", "Personal", "Otro"],
+                     style="Custom.TCombobox").grid(row=0, column=1, sticky="ew", pady=(0, 5))
+
+        self.themed(tk.Label(form, text="Descripcion:")).grid(row=1, column=0, sticky="w")
+        description_entry = self.themed(tk.Entry(form, width=40, relief="solid", bd=1), 'card')
+        description_entry.insert(0, data.get("description", ""))
+        description_entry.grid(row=1, column=1, sticky="ew")
+
+        self.themed(tk.Label(form, text="Frecuencia:")).grid(row=2, column=0, sticky="w", pady=(5, 0))
+        frequency_var = tk.StringVar(value=data.get("target_frequency", DAILY))
+        ttk.Combobox(form, textvariable=frequency_var, values=FREQUENCY_PRESETS,
+                     style="Custom.TCombobox").grid(row=2, column=1, sticky="ew", pady=(5, 0))
+
+        def save():
+            changes = {key: value for key, value in (("category", category_var.get()),
+                                                     ("description", description_entry.get().strip()),
+                                                     ("target_frequency", frequency_var.get().strip()))
+                       if value != data.get(key)}
+            if changes:
+                try:
+                    self.run_command(EditHabit(habit_name, **changes))
+                except ValueError as e:
+                    messagebox.showwarning("Error", str(e), parent=dialog)
+                    return
+            dialog.destroy()
+
+        ttk.Button(form, text="Guardar", command=save,
+                   style="Primary.TButton").grid(row=3, column=1, sticky="e", pady=(15, 0))
+
+    def run_command(self, command):
+        """Ejecutar una mutacion a traves del historial de deshacer"""
+        result = self.history.execute(command)
+        self.after_command(command)
+        return result
+
+    def undo(self):
+        """Deshacer la ultima mutacion"""
+        if not self.store_ready:
+            return
+        command = self.history.undo()
+        if command is None:
+            self.show_status("Nada que deshacer")
+            return
+        self.after_command(command)
+        self.show_status(f"Deshecho: {command.label} {', '.join(command.names)}")
 
-        total_days = (end_date - start_date).days + 1
-        completed_days = 0
+    def redo(self):
+        """Rehacer la ultima mutacion deshecha"""
+        if not self.store_ready:
+            return
+        command = self.history.redo()
+        if command is None:
+            self.show_status("Nada que rehacer")
+            return
+        self.after_command(command)
+        self.show_status(f"Rehecho: {command.label} {', '.join(command.names)}")
+
+    def after_command(self, command):
+        """Invalidar caches e indices de los habitos afectados, guardar y repintar"""
+        if command.structural:
+            for habit_name in command.names:
+                self.month_cache.invalidate_habit(habit_name)
+                if habit_name in self.store.habits:
+                    self.habit_index.add(habit_name, self.store.habits[habit_name])
+                else:
+                    self.habit_index.remove(habit_name)
+                    if self.selected_habit_for_calendar == habit_name:
+                        self.selected_habit_for_calendar = None
+            self.update_category_filter()
+            self.writer.request()
+            self.scheduler.mark_all()
+            return
 
-        current_date = start_date
-        while current_date <= end_date:
-            if current_date.strftime("%Y-%m-%d") in self.completions[habit_name]:
-                completed_days += 1
-            current_date += timedelta(days=1)
+        for habit_name, days in command.changed.items():
+            for month in {day.replace(day=1) for day in days}:
+                self.month_cache.invalidate(habit_name, month)
+        self.writer.request()
+        with self.scheduler.batch():
+            for habit_name in command.changed:
+                self.mark_habit_dirty(habit_name)
 
-        return (completed_days / total_days) * 100 if total_days > 0 else 0
-    
     def refresh_display(self):
-        """Actualizar toda la interfaz"""
-        self.update_stats()
-        self.update_habits_display()
-        self.update_calendar()
-
-        # Actualizar boton de tema
-        theme_text = "Oscuro" if self.current_theme == "light" else "Claro"
-        self.theme_button.configure(text=theme_text,
-                                    bg=self.get_theme("card_bg"),
-                                    fg=self.get_theme("text_primary"))
+        """Actualizar toda la interfaz de inmediato"""
+        self.scheduler.mark_all()
+        self.scheduler.flush()
+
+    def mark_habit_dirty(self, habit_name):
+        """Programar el repintado de lo que depende de un solo habito"""
+        self.scheduler.mark("stats")
+        if self.status_filter():
+            # El estado puede sacar o meter el habito en la lista filtrada
+            self.scheduler.mark("habits")
+        else:
+            self.scheduler.mark("habits", habit_name)
+        if habit_name == self.selected_habit_for_calendar or self.calendar_view == "compare":
+            self.scheduler.mark("calendar")
+        self.scheduler.mark("analytics")
         
     def update_stats(self):
         """Actualizar seccion de estadisticas"""
-        # limpiar estadisticas anteriores
-        for widget in self.stats_container.winfo_children():
-            widget.destroy()
-
-        # Calcular estadistica
-        total_habits = len(self.habits)
-        today = datetime.now().strftime("%Y-%m-%d")
-        completed_today = sum(1 for habit in self.habits if today in self.completions[habit])
+        # Calcular estadistica (las que dependen del historial esperan a su carga)
+        total_habits = len(self.store.habits)
+        if self.store.pending_history():
+            completed_today, avg_streak = "...", "..."
+        else:
+            completed_today = self.store.completed_today()
 
-        # Calcular racha promedio
-        avg_streak = 0
-        if self.habits:
-            total_streak = sum(self.calculate_streak(habit) for habit in self.habits)
-            avg_streak = total_streak / len(self.habits)
+            # Calcular racha promedio
+            avg_streak = f"{self.store.average_streak():.1f}"
 
         # Crear cards de estadistica
         stats_data = [
             ("Habitos Totales", total_habits, self.get_theme("bg_accent")),
             ("Completados Hoy", completed_today, self.get_theme("success")),
-            ("Racha Promedio", f"{avg_streak:.1f}", self.get_theme("danger")),
+            ("Racha Promedio", avg_streak, self.get_theme("danger")),
         ]
 
-        for i, (label, value, color) in enumerate(stats_data):
-            stat_frame = tk.Frame(self.stats_container, relief="solid", bd=1)
-            stat_frame._theme_type = 'stats'
-            stat_frame.configure(bg=self.get_theme("stats_bg"))
-            stat_frame.pack(side="left", expand=True, fill="both", padx=10)
-
-            stat_label = tk.Label(stat_frame, text=label,
-                                  font=("Arial", 12), fg=self.get_theme("text_secondary"))
-            stat_label._theme_type = 'stats'
-            stat_label.pack(pady=(10, 0))
-
-            value_label = tk.Label(stat_frame, text=str(value),
-                                    font=("Arial", 20, "bold"), bg=color,
-                                    fg="white", width=12, height=2)
-            value_label._theme_type = 'accent'
-            value_label.pack(pady=10)
-
-    def update_habits_display(self):
-        """Actualizar la lista de habitos mostrados"""
-        # Limpiar habitos anteriores
-        for widget in self.habits_frame.winfo_children():
-            if isinstance(widget, tk.Frame):
-                widget.destroy()
-
-        for habit_name, habit_data in self.habits.items():
-            habit_frame = tk.Frame(self.habits_frame, relief="solid", bd=1)
-            habit_frame._theme_type = 'card'
-            habit_frame.pack(fill="x", padx=0, pady=5)
-
-            title_label = tk.Label(habit_frame, text=habit_name,
-                                   font=("Arial", 14, "bold"))
-            title_label._theme_type = 'card'
-            title_label.pack(anchor="w", padx=10, pady=5)
-
-            info_label = tk.Label(habit_frame, text=f"{habit_data['category']} - {habit_data['description']}",
-                                  font=("Arial", 10))
-            info_label._theme_type = 'secondary'
-            info_label.pack(anchor="w", padx=10, pady=(0, 10))
-
-            # Botones
-            btn_frame = tk.Frame(habit_frame)
-            btn_frame._theme_type = 'card'
-            btn_frame.pack(anchor="e", padx=10, pady=(0, 10))
-
-            complete_btn = ttk.Button(btn_frame, text="Completar Hoy",
-                                      command=lambda name=habit_name: self.toggle_habit_completion(name),
-                                      style="Primary.TButton")
-            complete_btn.pack(side="left", padx=(0, 10))
-
-            delete_btn = tk.Button(btn_frame, text="Eliminar",
-                                   command=lambda name=habit_name: self.delete_habit(name),
-                                   bg=self.get_theme("danger"),
-                                   fg="white", relief="flat", font=("Arial", 10, "bold"))
-            delete_btn.pack(side="left")
-
-    def save_data(self):
-        """Guardar datos a archivos JSON"""
-        data = {
-            "habits": self.habits,
-            "completions": {k: list(v) for k, v in self.completions.items()}
-        }
-        with open(self.data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-
-    def load_data(self):
-        """Cargar datos desde archivo JSON"""
-        if os.path.exists(self.data_file):
-            with open(self.data_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.habits = data.get("habits", {})
-                self.completions = defaultdict(set,
-                                               {k: set(v) for k, v in data.get("completions", {})}
-                                               )
-    
+        # Crear las cards una sola vez y luego solo cambiar su texto
+        if not self.stat_value_labels:
+            for label, _, _ in stats_data:
+                stat_frame = self.themed(tk.Frame(self.stats_container, relief="solid", bd=1), 'stats')
+                stat_frame.pack(side="left", expand=True, fill="both", padx=10)
+
+                stat_label = self.themed(tk.Label(stat_frame, text=label, font=("Arial", 12)), 'stats')
+                stat_label.pack(pady=(10, 0))
+
+                value_label = tk.Label(stat_frame, font=("Arial", 20, "bold"),
+                                       fg="white", width=12, height=2)
+                value_label.pack(pady=10)
+                self.stat_value_labels.append(value_label)
+
+        for value_label, (_, value, color) in zip(self.stat_value_labels, stats_data):
+            value_label.configure(text=str(value), bg=color)
+
+    def update_category_filter(self):
+        """Ofrecer en el filtro las categorias presentes en el indice"""
+        self.category_filter['values'] = [ALL_CATEGORIES] + self.habit_index.categories()
+
+    def status_filter(self):
+        """Filtro de estado activo: None, ("pending",) o ("streak", n)"""
+        status = STATUS_FILTERS.get(self.status_filter_var.get())
+        if status == "streak":
+            try:
+                return ("streak", max(1, int(self.min_streak_var.get())))
+            except ValueError:
+                return None
+        return (status,) if status else None
+
+    def filter_habits(self):
+        """Nombres visibles segun busqueda, categoria y estado, en orden de insercion"""
+        category = self.category_filter_var.get()
+        matches = self.habit_index.search(self.search_var.get(),
+                                          None if category == ALL_CATEGORIES else category)
+        status = self.status_filter()
+        if matches is None and status is None:
+            return list(self.store.habits)
+
+        names = [name for name in self.store.habits if matches is None or name in matches]
+        if status is None:
+            return names
+        if status[0] == "pending":
+            return [name for name in names if not self.store.is_completed(name)]
+        return [name for name in names if self.store.calculate_streak(name) >= status[1]]
+
+    def update_habits_display(self, names=None):
+        """Actualizar la lista de habitos mostrados
+
+        Mantiene una tarjeta por nombre de habito y solo crea, actualiza o
+        elimina las tarjetas cuyo contenido cambio. Con `names` solo se
+        revisan esas tarjetas. Los habitos filtrados conservan su tarjeta
+        oculta. Con mas de VIRTUAL_THRESHOLD habitos visibles cambia a la
+        lista virtualizada.
+        """
+        if names is None:
+            self.filtered_names = self.filter_habits()
+        if len(self.filtered_names) > VIRTUAL_THRESHOLD:
+            self.enter_virtual_mode()
+            self.render_visible_rows()
+            return
+        self.leave_virtual_mode()
+
+        if names is not None:
+            for habit_name in names:
+                if habit_name in self.habit_cards and habit_name in self.store.habits:
+                    self.update_habit_card(self.habit_cards[habit_name], habit_name)
+            return
+
+        # Eliminar tarjetas de habitos borrados
+        for habit_name in list(self.habit_cards):
+            if habit_name not in self.store.habits:
+                self.habit_cards.pop(habit_name)["frame"].destroy()
+
+        # Ocultar sin destruir las tarjetas filtradas
+        visible = set(self.filtered_names)
+        for habit_name, card in self.habit_cards.items():
+            if habit_name not in visible and card["packed"]:
+                card["frame"].pack_forget()
+                card["packed"] = False
+
+        # Volver a empaquetar solo si cambia el orden de las tarjetas visibles
+        packed = [name for name in self.filtered_names if self.habit_cards.get(name, {}).get("packed")]
+        if packed != self.filtered_names[:len(packed)]:
+            for habit_name in packed:
+                self.habit_cards[habit_name]["frame"].pack_forget()
+                self.habit_cards[habit_name]["packed"] = False
+
+        for habit_name in self.filtered_names:
+            card = self.habit_cards.get(habit_name)
+            if card is None:
+                card = self.create_habit_card(self.habits_frame)
+                self.habit_cards[habit_name] = card
+            if not card["packed"]:
+                card["frame"].pack(fill="x", padx=0, pady=5)
+                card["packed"] = True
+            self.update_habit_card(card, habit_name)
+
+    def enter_virtual_mode(self):
+        """Pasar de una tarjeta por habito a la lista virtualizada"""
+        if self.virtual_mode:
+            return
+        for card in self.habit_cards.values():
+            card["frame"].destroy()
+        self.habit_cards = {}
+        self.virtual_offset = 0
+        self.virtual_container.pack(fill="x")
+        self.virtual_mode = True
+
+    def leave_virtual_mode(self):
+        """Volver a una tarjeta por habito"""
+        if not self.virtual_mode:
+            return
+        for card in self.virtual_rows:
+            card["frame"].destroy()
+        self.virtual_rows = []
+        self.virtual_container.pack_forget()
+        self.virtual_mode = False
+
+    def virtual_height(self):
+        """Alto del viewport virtual: el del canvas principal, con un minimo"""
+        return max(self.main_canvas.winfo_height(), VIRTUAL_MIN_ROWS * VIRTUAL_ROW_HEIGHT)
+
+    def on_virtual_scroll(self, *args):
+        """Comandos de la barra de la lista virtual ("moveto" o "scroll")"""
+        total = len(self.filtered_names) * VIRTUAL_ROW_HEIGHT
+        if args[0] == "moveto":
+            self.virtual_offset = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = self.virtual_height() if args[2] == "pages" else VIRTUAL_ROW_HEIGHT
+            self.virtual_offset += int(args[1]) * step
+        self.render_visible_rows()
+
+    def on_virtual_wheel(self, event):
+        """Rueda del raton (o botones 4/5 en X11) sobre cualquier widget de la lista virtual"""
+        if not self.virtual_mode:
+            return None
+        widget = self.root.winfo_containing(event.x_root, event.y_root)
+        container = str(self.virtual_container)
+        if widget is None or not (str(widget) == container or str(widget).startswith(container + ".")):
+            return None
+        if event.num == 4:
+            units = -1
+        elif event.num == 5:
+            units = 1
+        else:
+            units = int(-1*(event.delta/120))
+        self.on_virtual_scroll("scroll", units, "units")
+        return "break"
+
+    def render_visible_rows(self):
+        """Crear o reciclar tarjetas solo para las filas del viewport
+
+        El contenedor mide un viewport, no la lista entera: las coordenadas
+        de X11 son de 16 bits y un marco de N filas dejaria de funcionar a
+        partir de unos cientos de habitos. El desplazamiento se lleva en
+        virtual_offset y la barra recibe las fracciones visibles.
+        """
+        if not self.virtual_mode:
+            return
+        names = self.filtered_names
+        height = self.virtual_height()
+        self.virtual_container.configure(height=height)
+
+        total = len(names) * VIRTUAL_ROW_HEIGHT
+        self.virtual_offset = max(0, min(self.virtual_offset, total - height))
+        offset = self.virtual_offset
+        if total:
+            self.virtual_scrollbar.set(offset / total, min(1.0, (offset + height) / total))
+        else:
+            self.virtual_scrollbar.set(0.0, 1.0)
+
+        first = max(0, offset // VIRTUAL_ROW_HEIGHT - VIRTUAL_BUFFER_ROWS)
+        last = min(len(names), (offset + height) // VIRTUAL_ROW_HEIGHT + 1 + VIRTUAL_BUFFER_ROWS)
+        visible = max(0, last - first)
+
+        while len(self.virtual_rows) < visible:
+            self.virtual_rows.append(self.create_habit_card(self.virtual_viewport))
+
+        for slot, card in enumerate(self.virtual_rows):
+            if slot < visible:
+                index = first + slot
+                self.update_habit_card(card, names[index])
+                card["frame"].place(x=0, y=index * VIRTUAL_ROW_HEIGHT - offset + 5,
+                                    relwidth=1, height=VIRTUAL_ROW_HEIGHT - 10)
+            else:
+                card["frame"].place_forget()
+
+    def habit_card_state(self, habit_name):
+        """Contenido visible de la tarjeta de un habito"""
+        habit_data = self.store.habits[habit_name]
+        schedule = self.store.schedule(habit_name)
+        if not self.store.history_loaded(habit_name):
+            # Historial aun en carga: no forzar su decodificacion al pintar
+            return (habit_name, habit_data["category"], habit_data["description"], schedule, None, None, None)
+        return (habit_name,
+                habit_data["category"],
+                habit_data["description"],
+                schedule,
+                self.store.calculate_streak(habit_name),
+                self.store.longest_streak(habit_name),
+                self.store.is_completed(habit_name))
+
+    def create_habit_card(self, parent):
+        """Crear los widgets de una tarjeta de habito (sin colocarla)
+
+        Los botones leen el habito de card["name"], asi la misma tarjeta
+        puede reasignarse a otro habito en la lista virtualizada.
+        """
+        card = {"name": None, "state": None, "packed": False}
+
+        habit_frame = self.themed(tk.Frame(parent, relief="solid", bd=1), 'card')
+
+        title_label = self.themed(tk.Label(habit_frame, font=("Arial", 14, "bold")), 'card')
+        title_label.pack(anchor="w", padx=10, pady=5)
+
+        info_label = self.themed(tk.Label(habit_frame, font=("Arial", 10)), 'secondary')
+        info_label.pack(anchor="w", padx=10, pady=(0, 5))
+
+        streak_label = self.themed(tk.Label(habit_frame, font=("Arial", 10)), 'secondary')
+        streak_label.pack(anchor="w", padx=10, pady=(0, 10))
+
+        # Botones
+        btn_frame = self.themed(tk.Frame(habit_frame), 'card')
+        btn_frame.pack(anchor="e", padx=10, pady=(0, 10))
+
+        complete_btn = ttk.Button(btn_frame, text="Completar Hoy",
+                                  command=lambda: self.toggle_habit_completion(card["name"]),
+                                  style="Primary.TButton")
+        complete_btn.pack(side="left", padx=(0, 10))
+
+        edit_btn = tk.Button(btn_frame, text="Editar",
+                             command=lambda: self.edit_habit(card["name"]),
+                             relief="flat", font=("Arial", 10, "bold"))
+        self.themed(edit_btn, 'accent')
+        edit_btn.pack(side="left", padx=(0, 10))
+
+        delete_btn = tk.Button(btn_frame, text="Eliminar",
+                               command=lambda: self.delete_habit(card["name"]),
+                               relief="flat", font=("Arial", 10, "bold"))
+        self.themed(delete_btn, 'danger')
+        delete_btn.pack(side="left")
+
+        card.update({"frame": habit_frame, "title": title_label, "info": info_label,
+                     "streak": streak_label, "complete": complete_btn})
+        return card
+
+    def update_habit_card(self, card, habit_name):
+        """Asignar una tarjeta a un habito y reconfigurarla solo si cambio"""
+        card["name"] = habit_name
+        state = self.habit_card_state(habit_name)
+        if state == card["state"]:
+            return
+        _, category, description, schedule, streak, longest, done_today = state
+        card["title"].configure(text=habit_name)
+        info = f"{category} - {description}"
+        if not schedule.daily:
+            info += f"  ({schedule.label()})"
+        card["info"].configure(text=info)
+        if streak is None:
+            card["streak"].configure(text="Racha: cargando...")
+        else:
+            unit = schedule.unit
+            card["streak"].configure(text=f"Racha: {streak} {unit}  |  Mejor racha: {longest} {unit}")
+        card["complete"].configure(text="Desmarcar Hoy" if done_today else "Completar Hoy")
+        card["state"] = state
+
+    def on_close(self):
+        """Guardar cambios pendientes y cerrar la app"""
+        self.writer.flush()
+        if self.store_ready:
+            # Reintentar un guardado fallido antes de salir
+            self.save_in_background()
+        self.worker.stop()
+        self.workspace.close()
+        self.store.close()
+        self.profiler.close()
+        self.root.destroy()
+
     def run(self):
         """Ejecutar la app"""
         self.root.mainloop()
 
 if __name__ == "__main__":
-    HabitTracker().run()
+    parser = argparse.ArgumentParser(description="Habit Tracker")
+    parser.add_argument("--profile", action="store_true",
+                        help="activar la instrumentacion (superposicion con F12 y habit_profile.log)")
+    HabitTracker(profile=parser.parse_args().profile).run()
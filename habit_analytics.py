@@ -0,0 +1,198 @@
+from datetime import date
+from habit_bitmap import CompletionBitmap
+from habit_schedule import weekday as ordinal_weekday
+from habit_store import parse_date
+
+try:
+    import numpy as np
+except ImportError: # dependencia opcional
+    np = None
+
+WINDOWS = (7, 30, 90, 365)
+WEEKDAYS = ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom']
+
+
+def require_numpy():
+    """Comprobar que numpy esta disponible"""
+    if np is None:
+        raise ImportError("Las analiticas requieren numpy (pip install numpy)")
+
+
+def completion_matrix(store, today=None):
+    """Construir la matriz booleana dias x habitos del historial completo
+
+    Devuelve (matriz, nombres, ordinal_inicial, desplazamientos_de_creacion).
+    Las celdas anteriores a la fecha de creacion de cada habito quedan en
+    False para que no cuenten en los porcentajes.
+    """
+    require_numpy()
+    store.ensure_history()
+    names = list(store.habits)
+    end = parse_date(today).toordinal()
+    created = np.array([parse_date(store.habits[name]["created_date"]).toordinal() for name in names],
+                       dtype=np.int64)
+    start = min(int(created.min()) if names else end, end)
+    n_days = end - start + 1
+
+    matrix = np.zeros((n_days, len(names)), dtype=bool)
+    bitmaps = getattr(store, "completions", None)
+    for column, name in enumerate(names):
+        bitmap = bitmaps.get(name) if bitmaps is not None else None
+        if isinstance(bitmap, CompletionBitmap):
+            # Desempaquetar el bitmap directamente, sin pasar por fechas
+            if not bitmap.bits:
+                continue
+            bits = np.unpackbits(np.frombuffer(bytes(bitmap.bits), dtype=np.uint8), bitorder="little")
+            first = max(bitmap.origin, start)
+            last = min(bitmap.origin + bits.size - 1, end)
+            if first <= last:
+                matrix[first - start:last - start + 1, column] = \
+                    bits[first - bitmap.origin:last - bitmap.origin + 1].astype(bool)
+        else:
+            ordinals = [day.toordinal() - start for day in store.completed_dates(name, None, date.fromordinal(end))]
+            ordinals = [offset for offset in ordinals if offset >= 0]
+            matrix[ordinals, column] = True
+
+    offsets = np.clip(created - start, 0, n_days)
+    active = np.arange(n_days)[:, None] >= offsets[None, :]
+    return matrix & active, names, start, offsets
+
+
+def schedule_weights(store, names, start, offsets, n_days):
+    """Completitudes esperadas por dia y habito (dias x habitos)
+
+    1 los dias que tocan segun la frecuencia y 0 los que no (mascaras
+    precalculadas de habit_schedule), N/7 para "N veces por semana" y 0
+    antes de la creacion. Los habitos diarios son la mascara de actividad.
+    """
+    weights = (np.arange(n_days)[:, None] >= offsets[None, :]).astype(float)
+    for column, name in enumerate(names):
+        schedule = store.schedule(name)
+        if schedule.kind == "weekly":
+            weights[:, column] *= schedule.value / 7
+        elif not schedule.daily:
+            created = parse_date(store.habits[name]["created_date"]).toordinal()
+            weights[:, column] *= np.frombuffer(schedule.due_mask(created, start, n_days), dtype=np.uint8)
+    return weights
+
+
+def _rate(completed, expected):
+    return np.where(expected > 0, np.minimum(100.0, completed * 100.0 / np.maximum(expected, 1e-9)), 0.0)
+
+
+def _rolling_rates(matrix, weights, windows):
+    """Porcentaje de completitud de cada ventana para todos los habitos"""
+    n_days = matrix.shape[0]
+    cumulative = np.vstack([np.zeros((1, matrix.shape[1]), dtype=np.int64),
+                            np.cumsum(matrix & (weights > 0), axis=0, dtype=np.int64)])
+    expected = np.vstack([np.zeros((1, matrix.shape[1])), np.cumsum(weights, axis=0)])
+    rates = {}
+    for window in windows:
+        first = max(0, n_days - window)
+        rates[window] = _rate(cumulative[-1] - cumulative[first], expected[-1] - expected[first])
+    return rates
+
+
+def _weekday_rates(matrix, weights, start):
+    """Porcentaje de completitud por dia de la semana (7 x habitos)"""
+    n_days = matrix.shape[0]
+    weekday = (date.fromordinal(start).weekday() + np.arange(n_days)) % 7
+    onehot = (weekday[:, None] == np.arange(7)[None, :]).astype(np.int64)
+    completed = onehot.T @ (matrix & (weights > 0)).astype(np.int64)
+    return _rate(completed, onehot.T @ weights)
+
+
+def _run_lengths(done, due):
+    """Racha mas larga y actual contando solo las unidades que tocan
+
+    Una unidad que toca y no se completo corta la racha; las que no
+    tocan ni suman ni cortan. Cada fallo abre un grupo nuevo y la racha
+    es el numero de aciertos del grupo, todo con cumsum y bincount.
+    """
+    n_units, n_habits = done.shape
+    hits = done & due
+    groups = np.cumsum(due & ~done, axis=0)
+    keys = groups + np.arange(n_habits)[None, :] * (n_units + 1)
+    counts = np.bincount(keys.ravel(), weights=hits.ravel(),
+                         minlength=n_habits * (n_units + 1)).reshape(n_habits, n_units + 1)
+    longest = counts.max(axis=1).astype(np.int64)
+    current = counts[np.arange(n_habits), groups[-1]].astype(np.int64)
+    return longest, current
+
+
+def _streaks(matrix, weights, start, weekly):
+    """Racha mas larga (desde la creacion) y racha actual de cada habito
+
+    `weekly` da el objetivo semanal de cada habito (0 si la frecuencia
+    es por dias); esas rachas se cuentan en semanas que lo cumplen, y la
+    semana en curso solo cuenta si ya se cumplio.
+    """
+    longest, current = _run_lengths(matrix, weights > 0)
+    columns = np.nonzero(weekly)[0]
+    if columns.size:
+        # Alinear a lunes y completar la ultima semana para agrupar por semanas
+        lead = ordinal_weekday(start)
+        n_weeks = -(-(lead + matrix.shape[0]) // 7)
+        padded = np.zeros((n_weeks * 7, columns.size), dtype=bool)
+        active = np.zeros_like(padded)
+        padded[lead:lead + matrix.shape[0]] = matrix[:, columns]
+        active[lead:lead + matrix.shape[0]] = weights[:, columns] > 0
+        done = padded.reshape(n_weeks, 7, -1).sum(axis=1) >= weekly[columns][None, :]
+        due = active.reshape(n_weeks, 7, -1).any(axis=1)
+        due[-1] &= done[-1]
+        longest[columns], current[columns] = _run_lengths(done, due)
+    return longest, current
+
+
+def _trend(matrix, weights, weeks):
+    """Pendiente (puntos porcentuales por semana) de la completitud semanal"""
+    n_days = matrix.shape[0]
+    weeks = min(weeks, n_days // 7)
+    if weeks < 2:
+        return np.zeros(matrix.shape[1])
+    recent = (matrix & (weights > 0))[n_days - weeks * 7:].reshape(weeks, 7, -1)
+    completed = recent.sum(axis=1)
+    total = weights[n_days - weeks * 7:].reshape(weeks, 7, -1).sum(axis=1)
+    valid = total > 0
+    y = _rate(completed, total)
+
+    # Regresion lineal ponderada por semanas validas, para todos los habitos a la vez
+    x = np.arange(weeks, dtype=float)[:, None]
+    count = np.maximum(valid.sum(axis=0), 1)
+    x_mean = (x * valid).sum(axis=0) / count
+    y_mean = (y * valid).sum(axis=0) / count
+    covariance = (valid * (x - x_mean) * (y - y_mean)).sum(axis=0)
+    variance = (valid * (x - x_mean) ** 2).sum(axis=0)
+    return np.where(variance > 0, covariance / np.where(variance > 0, variance, 1), 0.0)
+
+
+def analyze(store, windows=WINDOWS, trend_weeks=12, today=None):
+    """Calcular todas las metricas de todos los habitos en una pasada
+
+    Devuelve {habit_name: {"rates": {ventana: %}, "weekday": [7 %],
+    "longest_streak", "current_streak", "trend"}}.
+    """
+    matrix, names, start, offsets = completion_matrix(store, today)
+    if not names:
+        return {}
+
+    # Solo cuentan los dias que tocan segun la frecuencia de cada habito
+    weights = schedule_weights(store, names, start, offsets, matrix.shape[0])
+    schedules = [store.schedule(name) for name in names]
+    weekly = np.array([schedule.value if schedule.kind == "weekly" else 0 for schedule in schedules],
+                      dtype=np.int64)
+    rates = _rolling_rates(matrix, weights, windows)
+    weekday = _weekday_rates(matrix, weights, start)
+    longest, current = _streaks(matrix, weights, start, weekly)
+    trend = _trend(matrix, weights, trend_weeks)
+
+    results = {}
+    for column, name in enumerate(names):
+        results[name] = {
+            "rates": {window: float(rates[window][column]) for window in windows},
+            "weekday": [float(value) for value in weekday[:, column]],
+            "longest_streak": int(longest[column]),
+            "current_streak": int(current[column]),
+            "trend": float(trend[column]),
+        }
+    return results
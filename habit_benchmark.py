@@ -0,0 +1,237 @@
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from habit_store import HabitStore, date_range, open_store
+
+try:
+    import habit_analytics
+except ImportError: # numpy opcional
+    habit_analytics = None
+
+
+def generate_store(store, habits=50, years=3, density=0.7, seed=0):
+    """Llenar un almacen con N habitos x M años de historial sintetico
+
+    Cada dia se marca con probabilidad `density`; las rachas salen de
+    forma natural. La semilla hace reproducibles los datos.
+    """
+    rng = random.Random(seed)
+    end = date.today()
+    days = date_range(end - timedelta(days=int(years * 365) - 1), end)
+    with store.bulk_update():
+        for index in range(habits):
+            name = f"Habito {index:04d}"
+            store.add_habit(name, rng.choice(["Salud", "Ejercicio", "Estudio", "Trabajo", "Personal"]),
+                            f"Habito sintetico {index}", days[0])
+            store.set_completions([name], [day for day in days if rng.random() < density], True)
+    store.save_data()
+    return store
+
+
+def measure(func, repeat=5, setup=None):
+    """Tiempo (mediana y minimo, ms) y pico de memoria (KiB) de `func`"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+
+    # Memoria en una pasada aparte: tracemalloc ralentiza la ejecucion
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": round(statistics.median(times), 3),
+            "min_ms": round(min(times), 3),
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def bench_store(data_file, repeat):
+    """Operaciones del almacen sobre un archivo ya generado"""
+    store = open_store(data_file, journal=True)
+    store.load_data()
+    names = list(store.habits)
+    results = {}
+
+    def reload(lazy=False):
+        fresh = open_store(data_file, journal=True)
+        if lazy:
+            fresh.load_data(lazy=True)
+        else:
+            fresh.load_data()
+        return fresh
+
+    results["load_data"] = measure(reload, repeat)
+    if isinstance(store, HabitStore):
+        results["load_data_lazy"] = measure(lambda: reload(lazy=True), repeat)
+    results["save_data"] = measure(store.save_data, repeat)
+    results["calculate_streak"] = measure(lambda: [store.calculate_streak(name) for name in names], repeat)
+    results["longest_streak"] = measure(lambda: [store.longest_streak(name) for name in names], repeat)
+    results["calculate_completion_rate"] = measure(
+        lambda: [store.calculate_completion_rate(name, 365) for name in names], repeat)
+    results["completed_today"] = measure(store.completed_today, repeat)
+
+    today = date.today()
+    results["toggle_completion"] = measure(
+        lambda: [store.toggle_completion(name, today) for name in names], repeat)
+    results["persist"] = measure(lambda: (store.set_completion(names[0], today, True), store.persist()), repeat)
+
+    month_start = today.replace(day=1)
+    results["month_query"] = measure(
+        lambda: [store.completed_dates(name, month_start, today) for name in names], repeat)
+
+    if habit_analytics is not None and habit_analytics.np is not None:
+        results["analytics"] = measure(lambda: habit_analytics.analyze(store), repeat)
+    store.close()
+    return results
+
+
+def start_display():
+    """Asegurar un DISPLAY: el actual o un Xvfb temporal; devuelve el proceso o None"""
+    if os.environ.get("DISPLAY"):
+        return None
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("No hay DISPLAY ni Xvfb para las pruebas graficas")
+    display = ":97"
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def bench_gui(workdir, repeat):
+    """Repintados de la interfaz con Tk real (en el directorio de datos generado)"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Habit tracker.py")
+    spec = importlib.util.spec_from_file_location("habit_tracker_app", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        app = module.HabitTracker()
+        while not app.store_ready or app.worker.busy:
+            app.root.update()
+        results = {"startup_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+        def rebuild_cards():
+            for card in app.habit_cards.values():
+                card["frame"].destroy()
+            app.habit_cards = {}
+
+        def repaint(func):
+            func()
+            app.root.update_idletasks()
+
+        results["update_habits_display_cold"] = measure(lambda: repaint(app.update_habits_display),
+                                                        repeat, setup=rebuild_cards)
+        results["update_habits_display_warm"] = measure(lambda: repaint(app.update_habits_display), repeat)
+        results["update_stats"] = measure(lambda: repaint(app.update_stats), repeat)
+        results["update_calendar"] = measure(lambda: repaint(app.update_calendar), repeat,
+                                             setup=app.month_cache.clear)
+        results["apply_theme"] = measure(lambda: repaint(app.toggle_theme), repeat)
+
+        app.calendar_view = "compare"
+        results["heatmap_compare"] = measure(lambda: repaint(app.update_heatmap), repeat,
+                                             setup=lambda: setattr(app.heatmap_canvas, "_model", None))
+        app.worker.stop()
+        app.root.destroy()
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def compare(previous, current):
+    """Tabla de cambios de mediana entre dos resultados"""
+    lines = []
+    for section, operations in current["results"].items():
+        old = previous.get("results", {}).get(section, {})
+        for name, values in operations.items():
+            if not isinstance(values, dict) or name not in old:
+                continue
+            before, after = old[name]["median_ms"], values["median_ms"]
+            ratio = after / before if before else float("inf")
+            lines.append(f"{section}.{name:<32} {before:>10.2f} -> {after:>10.2f} ms  x{ratio:.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks con historiales sinteticos")
+    parser.add_argument("--habits", type=int, default=50, help="numero de habitos")
+    parser.add_argument("--years", type=float, default=3, help="años de historial")
+    parser.add_argument("--density", type=float, default=0.7, help="probabilidad de completar cada dia")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="repeticiones por operacion")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--gui", action="store_true", help="medir tambien la interfaz (Tk real o Xvfb)")
+    parser.add_argument("--output", help="guardar los resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de una ejecucion anterior para comparar")
+    args = parser.parse_args(argv)
+
+    params = {key: getattr(args, key) for key in ("habits", "years", "density", "seed", "repeat", "backend")}
+    report = {
+        "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(),
+                 "platform": platform.platform(),
+                 "params": params},
+        "results": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="habit-bench-")
+    try:
+        data_file = os.path.join(workdir, "habits_data.db" if args.backend == "sqlite" else "habits_data.json")
+        start = time.perf_counter()
+        generate_store(open_store(data_file, journal=True), args.habits, args.years, args.density, args.seed)
+        report["meta"]["generate_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        report["meta"]["data_bytes"] = os.path.getsize(data_file)
+
+        report["results"]["store"] = bench_store(data_file, args.repeat)
+
+        if args.gui:
+            if args.backend != "json":
+                parser.error("--gui usa el archivo habits_data.json de la interfaz")
+            display = None
+            try:
+                display = start_display()
+                report["results"]["gui"] = bench_gui(workdir, args.repeat)
+            except RuntimeError as e:
+                report["results"]["gui"] = {"skipped": str(e)}
+            finally:
+                if display is not None:
+                    display.terminate()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print(compare(json.load(f), report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
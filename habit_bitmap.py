@@ -0,0 +1,196 @@
+from datetime import date
+
+
+def to_ordinal(day):
+    """Convertir date o ordinal a ordinal de dia"""
+    return day if isinstance(day, int) else day.toordinal()
+
+
+def popcount(value):
+    """Numero de bits encendidos de un entero no negativo"""
+    if hasattr(value, "bit_count"):
+        return value.bit_count()
+    return bin(value).count("1")
+
+
+class CompletionBitmap:
+    """Conjunto compacto de dias completados de un habito
+
+    Cada dia es un bit de un bytearray cuyo origen es un ordinal de dia
+    alineado a 8. Diez anios de historial ocupan unos 460 bytes en lugar
+    de miles de cadenas 'YYYY-MM-DD'; la pertenencia es O(1) y los
+    conteos por rango usan popcount sobre bloques de bytes.
+    """
+
+    __slots__ = ("origin", "bits")
+
+    def __init__(self, days=()):
+        self.origin = 0
+        self.bits = bytearray()
+        for day in days:
+            self.add(day)
+
+    def _ensure(self, ordinal):
+        """Ampliar el bytearray para que cubra el ordinal indicado"""
+        aligned = ordinal - ordinal % 8
+        if not self.bits:
+            self.origin = aligned
+            self.bits = bytearray(1)
+        elif ordinal < self.origin:
+            self.bits[0:0] = bytes((self.origin - aligned) // 8)
+            self.origin = aligned
+        else:
+            needed = (ordinal - self.origin) // 8 + 1
+            if needed > len(self.bits):
+                self.bits.extend(bytes(needed - len(self.bits)))
+
+    def add(self, day):
+        """Marcar un dia como completado"""
+        ordinal = to_ordinal(day)
+        self._ensure(ordinal)
+        offset = ordinal - self.origin
+        self.bits[offset >> 3] |= 1 << (offset & 7)
+
+    def discard(self, day):
+        """Desmarcar un dia (sin error si no estaba marcado)"""
+        offset = to_ordinal(day) - self.origin
+        if 0 <= offset < len(self.bits) * 8:
+            self.bits[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+
+    def __contains__(self, day):
+        offset = to_ordinal(day) - self.origin
+        if offset < 0 or offset >= len(self.bits) * 8:
+            return False
+        return bool(self.bits[offset >> 3] >> (offset & 7) & 1)
+
+    def __len__(self):
+        return popcount(int.from_bytes(self.bits, "little"))
+
+    def __iter__(self):
+        return self.iter_ordinals()
+
+    def _clip(self, start, end):
+        """Recortar un rango de ordinales a los desplazamientos cubiertos"""
+        first = 0 if start is None else max(0, to_ordinal(start) - self.origin)
+        last = len(self.bits) * 8 - 1
+        if end is not None:
+            last = min(last, to_ordinal(end) - self.origin)
+        return first, last
+
+    def iter_ordinals(self, start=None, end=None):
+        """Ordinales completados en orden ascendente dentro de un rango"""
+        first, last = self._clip(start, end)
+        bits, origin = self.bits, self.origin
+        for index in range(first >> 3, (last >> 3) + 1 if last >= first else 0):
+            byte = bits[index]
+            if not byte:
+                continue
+            base = index * 8
+            for bit in range(8):
+                if byte >> bit & 1 and first <= base + bit <= last:
+                    yield origin + base + bit
+
+    def dates(self, start=None, end=None):
+        """Fechas completadas (date) dentro de un rango"""
+        return [date.fromordinal(ordinal) for ordinal in self.iter_ordinals(start, end)]
+
+    def bit_string(self, start, end):
+        """Dias de `start` a `end` como cadena '0'/'1' (un caracter por dia)"""
+        length = to_ordinal(end) - to_ordinal(start) + 1
+        if length <= 0:
+            return ""
+        offset = to_ordinal(start) - self.origin
+        # Bits en orden de dia: el binario del entero al reves
+        text = format(int.from_bytes(self.bits, "little"), "b")[::-1] if self.bits else ""
+        if offset < 0:
+            text, offset = "0" * -offset + text, 0
+        return text[offset:offset + length].ljust(length, "0")
+
+    def count_range(self, start=None, end=None):
+        """Contar dias completados en un rango inclusivo con popcount"""
+        first, last = self._clip(start, end)
+        if last < first:
+            return 0
+        chunk = int.from_bytes(self.bits[first >> 3:(last >> 3) + 1], "little")
+        chunk >>= first & 7
+        return popcount(chunk & ((1 << (last - first + 1)) - 1))
+
+    def run_length_back(self, day):
+        """Dias consecutivos completados terminando en `day` (hacia atras)"""
+        offset = to_ordinal(day) - self.origin
+        if offset >= len(self.bits) * 8:
+            return 0
+        bits = self.bits
+        run = 0
+        while offset >= 0:
+            # Saltar bytes completos de una vez
+            if offset & 7 == 7 and bits[offset >> 3] == 0xFF:
+                run += 8
+                offset -= 8
+            elif bits[offset >> 3] >> (offset & 7) & 1:
+                run += 1
+                offset -= 1
+            else:
+                break
+        return run
+
+    def run_length_forward(self, day):
+        """Dias consecutivos completados empezando en `day` (hacia adelante)"""
+        offset = to_ordinal(day) - self.origin
+        if offset < 0:
+            return 0
+        bits = self.bits
+        limit = len(bits) * 8
+        run = 0
+        while offset < limit:
+            if offset & 7 == 0 and bits[offset >> 3] == 0xFF:
+                run += 8
+                offset += 8
+            elif bits[offset >> 3] >> (offset & 7) & 1:
+                run += 1
+                offset += 1
+            else:
+                break
+        return run
+
+    def last_before(self, day=None):
+        """Ultimo ordinal completado en o antes de `day` (None si no hay)"""
+        offset = len(self.bits) * 8 - 1
+        if day is not None:
+            offset = min(offset, to_ordinal(day) - self.origin)
+        if offset < 0:
+            return None
+        index = offset >> 3
+        byte = self.bits[index] & ((1 << ((offset & 7) + 1)) - 1)
+        while True:
+            if byte:
+                return self.origin + index * 8 + byte.bit_length() - 1
+            index -= 1
+            if index < 0:
+                return None
+            byte = self.bits[index]
+
+    def longest_run(self):
+        """Longitud de la racha mas larga de dias consecutivos"""
+        best = run = 0
+        for byte in self.bits:
+            if byte == 0xFF:
+                run += 8
+            elif byte == 0:
+                best = max(best, run)
+                run = 0
+            else:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        run += 1
+                    else:
+                        best = max(best, run)
+                        run = 0
+        return max(best, run)
+
+    def copy(self):
+        """Copia independiente del bitmap"""
+        clone = CompletionBitmap()
+        clone.origin = self.origin
+        clone.bits = bytearray(self.bits)
+        return clone
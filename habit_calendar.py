@@ -0,0 +1,69 @@
+import calendar
+from collections import OrderedDict, namedtuple
+from datetime import date
+from functools import lru_cache
+
+# Modelo de un mes listo para CalendarCanvas.show_month; `due` son los dias
+# que tocan segun la frecuencia del habito (None si tocan todos)
+MonthModel = namedtuple("MonthModel", ["weeks", "completed", "today", "due"])
+
+
+@lru_cache(maxsize=64)
+def month_weeks(year, month):
+    """Cuadricula de calendar.monthcalendar como tuplas inmutables"""
+    return tuple(tuple(week) for week in calendar.monthcalendar(year, month))
+
+
+class MonthCache:
+    """Cache LRU de modelos de mes por (habito, año, mes)
+
+    Cada entrada guarda los numeros de dia completados de un mes; la
+    cuadricula sale de `month_weeks` y el dia actual se resuelve al
+    pedir el modelo. Marcar o desmarcar una fecha invalida solo la
+    entrada de ese mes.
+    """
+
+    MAXSIZE = 48
+
+    def __init__(self, load_completed, maxsize=MAXSIZE, load_due=None):
+        self.load_completed = load_completed # funcion(habit_name, year, month) -> dias completados
+        self.load_due = load_due # funcion(habit_name, year, month) -> dias que tocan o None
+        self.maxsize = maxsize
+        self._entries = OrderedDict() # {(habit_name, year, month): (dias completados, dias que tocan)}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, habit_name, year, month, today=None):
+        """Modelo del mes, calculado solo si no esta en cache"""
+        key = (habit_name, year, month)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            due = self.load_due(habit_name, year, month) if self.load_due is not None else None
+            entry = (frozenset(self.load_completed(habit_name, year, month)),
+                     None if due is None else frozenset(due))
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        today = today or date.today()
+        today_day = today.day if (today.year, today.month) == (year, month) else None
+        return MonthModel(month_weeks(year, month), entry[0], today_day, entry[1])
+
+    def invalidate(self, habit_name, day):
+        """Descartar el mes que contiene `day` para un habito"""
+        self._entries.pop((habit_name, day.year, day.month), None)
+
+    def invalidate_habit(self, habit_name):
+        """Descartar todos los meses de un habito"""
+        for key in [key for key in self._entries if key[0] == habit_name]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,152 @@
+import argparse
+import json
+import sys
+from habit_store import open_store, parse_date
+
+
+def open_data(path):
+    """Abrir el almacen cargando solo metadatos; los historiales se leen al consultarlos"""
+    store = open_store(path, journal=True)
+    if hasattr(store, "prepare_history_load"):
+        store.load_data(lazy=True)
+    else:
+        store.load_data()
+    return store
+
+
+def cmd_add(store, args):
+    store.add_habit(args.name, args.category, args.description, target_frequency=args.frequency)
+    store.persist()
+    print(f"Habito '{args.name.strip()}' agregado")
+
+
+def cmd_done(store, args):
+    day = parse_date(args.date)
+    store.set_completion(args.name, day, not args.undo)
+    store.persist()
+    status = "desmarcado" if args.undo else "completado"
+    print(f"Habito '{args.name}' {status} el {day.isoformat()}")
+
+
+def cmd_delete(store, args):
+    store.delete_habit(args.name)
+    store.persist()
+    print(f"Habito '{args.name}' eliminado")
+
+
+def cmd_list(store, args):
+    for name, data in store.habits.items():
+        print(f"{name}\t{data.get('category', '')}\t{data.get('description', '')}")
+
+
+def cmd_stats(store, args):
+    stats = {
+        "habits": len(store.habits),
+        "completed_today": store.completed_today(),
+        "average_streak": round(store.average_streak(), 1),
+    }
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        print(f"Habitos Totales: {stats['habits']}")
+        print(f"Completados Hoy: {stats['completed_today']}")
+        print(f"Racha Promedio: {stats['average_streak']:.1f}")
+
+
+def cmd_streak(store, args):
+    names = [args.name] if args.name else list(store.habits)
+    for name in names:
+        if name not in store.habits:
+            raise KeyError(name)
+        current, longest = store.calculate_streak(name), store.longest_streak(name)
+        schedule = store.schedule(name)
+        if args.json:
+            print(json.dumps({"habit": name, "current": current, "longest": longest,
+                              "frequency": str(schedule)}, ensure_ascii=False))
+        else:
+            print(f"{name}: racha {current} {schedule.unit} (mejor {longest})")
+
+
+def cmd_export(store, args):
+    # Importacion diferida: solo este subcomando necesita csv
+    from habit_transfer import export_file
+    total = export_file(store, args.path, args.format)
+    print(f"{total} registros exportados a {args.path}", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="habit_cli", description="Seguimiento de habitos desde la terminal")
+    parser.add_argument("--data", default="habits_data.json",
+                        help="archivo de datos (.json o base SQLite)")
+    parser.add_argument("--perfil", help="perfil de habit_workspace.json (en lugar de --data)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="agregar un habito")
+    add.add_argument("name")
+    add.add_argument("--category", default="Otro")
+    add.add_argument("--description", default="")
+    add.add_argument("--frequency", default="daily",
+                     help="daily, weekly:N, weekdays:0,2,4 (0 = lunes) o every:N")
+    add.set_defaults(func=cmd_add)
+
+    done = commands.add_parser("done", help="marcar un habito como completado")
+    done.add_argument("name")
+    done.add_argument("--date", help="fecha AAAA-MM-DD (hoy por defecto)")
+    done.add_argument("--undo", action="store_true", help="desmarcar en lugar de marcar")
+    done.set_defaults(func=cmd_done)
+
+    delete = commands.add_parser("delete", help="eliminar un habito")
+    delete.add_argument("name")
+    delete.set_defaults(func=cmd_delete)
+
+    listing = commands.add_parser("list", help="listar los habitos")
+    listing.set_defaults(func=cmd_list)
+
+    stats = commands.add_parser("stats", help="estadisticas generales")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(func=cmd_stats)
+
+    streak = commands.add_parser("streak", help="racha actual y mejor racha")
+    streak.add_argument("name", nargs="?", help="habito (todos por defecto)")
+    streak.add_argument("--json", action="store_true")
+    streak.set_defaults(func=cmd_streak)
+
+    export = commands.add_parser("export", help="exportar completitudes a CSV/NDJSON")
+    export.add_argument("path")
+    export.add_argument("--format", choices=("csv", "ndjson"))
+    export.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.perfil:
+        # Importacion diferida: solo hace falta con perfiles
+        from habit_workspace import Workspace
+        try:
+            args.data = Workspace().data_file(args.perfil)
+        except KeyError:
+            print(f"Error: no existe el perfil '{args.perfil}'", file=sys.stderr)
+            return 1
+    try:
+        # Un snapshot corrupto o ilegible es un error del usuario, no una traza
+        store = open_data(args.data)
+    except (OSError, ValueError) as e:
+        print(f"Error: no se pudo abrir {args.data}: {e}", file=sys.stderr)
+        return 1
+    try:
+        args.func(store, args)
+    except KeyError as e:
+        print(f"Error: no existe el habito {e}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
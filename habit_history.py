@@ -0,0 +1,155 @@
+from collections import deque
+from habit_store import parse_date
+
+HISTORY_LIMIT = 100
+
+
+class Command:
+    """Mutacion reversible del almacen
+
+    `apply` guarda en el propio comando el delta necesario para que
+    `revert` deshaga el cambio sin recargar los datos. `names` son los
+    habitos afectados y `structural` indica si cambian altas, bajas o
+    metadatos (y no solo completitudes).
+    """
+
+    label = ""
+    structural = False
+
+    def __init__(self, name):
+        self.names = (name,)
+
+    def apply(self, store):
+        raise NotImplementedError
+
+    def revert(self, store):
+        raise NotImplementedError
+
+
+class AddHabit(Command):
+    label = "agregar"
+    structural = True
+
+    def __init__(self, name, category="Otro", description="", target_frequency="daily"):
+        super().__init__(name.strip())
+        self.category = category
+        self.description = description
+        self.target_frequency = target_frequency
+        self.created_date = None
+
+    def apply(self, store):
+        data = store.add_habit(self.names[0], self.category, self.description, self.created_date,
+                               self.target_frequency)
+        self.created_date = data["created_date"] # rehacer conserva la fecha de creacion
+        return data
+
+    def revert(self, store):
+        store.delete_habit(self.names[0])
+
+
+class DeleteHabit(Command):
+    label = "eliminar"
+    structural = True
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.tombstone = None
+
+    def apply(self, store):
+        self.tombstone = store.delete_habit(self.names[0])
+
+    def revert(self, store):
+        store.restore_habit(self.names[0], self.tombstone)
+        self.tombstone = None
+
+
+class EditHabit(Command):
+    label = "editar"
+    structural = True
+
+    def __init__(self, name, **changes):
+        super().__init__(name)
+        self.changes = changes
+        self.previous = None
+
+    def apply(self, store):
+        self.previous = store.update_habit(self.names[0], **self.changes)
+
+    def revert(self, store):
+        store.update_habit(self.names[0], **self.previous)
+
+
+class SetCompletions(Command):
+    """Marcar o desmarcar fechas; el delta son solo los pares que cambiaron"""
+
+    label = "marcar"
+
+    def __init__(self, names, days, done=True):
+        self.names = tuple(names)
+        self.days = [parse_date(day) for day in days]
+        self.done = done
+        self.changed = {} # {habit_name: fechas que cambiaron}
+
+    def apply(self, store):
+        self.changed = {}
+        for name in self.names:
+            if name not in store.habits:
+                raise KeyError(name)
+            days = [day for day in self.days if store.is_completed(name, day) != self.done]
+            if days:
+                self.changed[name] = days
+        for name, days in self.changed.items():
+            store.set_completions([name], days, self.done)
+        return sum(len(days) for days in self.changed.values())
+
+    def revert(self, store):
+        for name, days in self.changed.items():
+            store.set_completions([name], days, not self.done)
+
+
+class CommandHistory:
+    """Historial acotado de comandos con deshacer y rehacer"""
+
+    def __init__(self, store, limit=HISTORY_LIMIT):
+        self.store = store
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def execute(self, command):
+        """Aplicar un comando nuevo; descarta lo que se podia rehacer"""
+        result = command.apply(self.store)
+        self._undo.append(command)
+        self._redo.clear()
+        return result
+
+    def undo(self):
+        """Deshacer el ultimo comando; devuelve el comando o None"""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        command.revert(self.store)
+        self._redo.append(command)
+        return command
+
+    def redo(self):
+        """Rehacer el ultimo comando deshecho; devuelve el comando o None"""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        command.apply(self.store)
+        self._undo.append(command)
+        return command
+
+    def reset(self, store):
+        """Vaciar el historial (al cambiar de almacen)"""
+        self.store = store
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+from habit_writer import atomic_open
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+MARKER_OP = "snapshot"
+
+
+def _lock_file(fd):
+    os.lseek(fd, 0, os.SEEK_SET)
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError: # LK_LOCK se rinde tras 10 s; se sigue esperando
+            continue
+
+
+def _unlock_file(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class HabitJournal:
+    """Diario de solo-anexar con un registro JSON por linea
+
+    Varios procesos (la interfaz y la CLI) pueden usar el mismo archivo:
+    anexar, compactar y releer se hace con un bloqueo advisory sobre
+    `<diario>.lock`. Al compactar, el diario se reescribe con una sola
+    linea marcador {"op": "snapshot", "seq": N}; asi cada proceso sabe
+    si otro compacto desde su ultima lectura (`base` distinto).
+
+    `offset` y `base` describen lo que este proceso ya leyo o escribio;
+    se actualizan al preparar cada escritura, en el hilo del almacen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.record_count = 0
+        self.offset = 0 # bytes del diario ya aplicados; None si se desconoce (escritura fallida)
+        self.base = 0 # seq del marcador de la ultima compactacion leida o escrita
+        self._holders = 0
+        self._holders_lock = threading.Lock()
+        self._lock_fd = None
+
+    def acquire(self):
+        """Tomar el bloqueo entre procesos; devuelve True si nadie de este proceso lo tenia
+
+        Es reentrante dentro del proceso: un guardado preparado en el hilo
+        de la interfaz lo retiene hasta que el hilo de E/S termina de
+        escribir, y mientras tanto ningun otro proceso puede tocar el diario.
+        """
+        with self._holders_lock:
+            self._holders += 1
+            if self._holders > 1:
+                return False
+            try:
+                fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o666)
+                try:
+                    _lock_file(fd)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._holders -= 1
+                raise
+            self._lock_fd = fd
+            return True
+
+    def release(self):
+        """Soltar una referencia al bloqueo"""
+        with self._holders_lock:
+            self._holders -= 1
+            if self._holders:
+                return
+            fd, self._lock_fd = self._lock_fd, None
+            try:
+                _unlock_file(fd)
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def encode(records):
+        """Serializar registros a lineas JSON"""
+        return "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+
+    def write(self, lines):
+        """Anexar lineas ya serializadas (solo E/S, no toca `record_count`)"""
+        if not lines:
+            return
+        with open(self.path, "a", encoding="utf-8", newline="") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def prepare_append(self, records):
+        """Serializar registros y devolver la funcion que los anexa (solo E/S)"""
+        lines = self.encode(records)
+        if self.offset is not None:
+            self.offset += len(lines.encode("utf-8"))
+        return lambda: self.write(lines)
+
+    def prepare_reset(self, seq):
+        """Devolver la funcion que deja el diario solo con el marcador de `seq`"""
+        line = self.encode([{"op": MARKER_OP, "seq": seq}])
+        self.base, self.offset = seq, len(line.encode("utf-8"))
+
+        def reset():
+            with atomic_open(self.path, newline="") as f:
+                f.write(line)
+        return reset
+
+    def _read(self, f, start):
+        """Registros completos desde `start`; recorta una ultima linea cortada"""
+        f.seek(start)
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # Escritura cortada por un cierre inesperado: se recorta para
+            # que el siguiente registro anexado no quede pegado a ella
+            f.truncate(start + end)
+            f.flush()
+            os.fsync(f.fileno())
+        records = []
+        for line in data[:end].decode("utf-8", errors="replace").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Linea corrupta: se ignora
+                continue
+            if not isinstance(record, dict):
+                continue
+            if record.get("op") == MARKER_OP:
+                self.base = record.get("seq", 0)
+                continue
+            records.append(record)
+        return records, start + end
+
+    def replay(self):
+        """Leer todos los registros del diario en orden (con el bloqueo tomado)"""
+        self.record_count, self.offset, self.base = 0, 0, 0
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r+b") as f:
+            records, self.offset = self._read(f, 0)
+        self.record_count = len(records)
+        return records
+
+    def read_new(self):
+        """Registros que otro proceso anexo desde la ultima lectura (con el bloqueo tomado)
+
+        Devuelve None si otro proceso compacto el diario entretanto: lo
+        que habia en el diario ya esta en el snapshot y hay que releerlo.
+        """
+        if self.offset is None:
+            return []
+        if not os.path.exists(self.path):
+            return [] if self.base == 0 and self.offset == 0 else None
+        with open(self.path, "r+b") as f:
+            first = f.readline()
+            base = 0
+            try:
+                marker = json.loads(first)
+                if isinstance(marker, dict) and marker.get("op") == MARKER_OP:
+                    base = marker.get("seq", 0)
+            except ValueError:
+                pass
+            f.seek(0, os.SEEK_END)
+            if base != self.base or f.tell() < self.offset:
+                return None
+            records, self.offset = self._read(f, self.offset)
+        self.record_count += len(records)
+        return records
@@ -0,0 +1,153 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+ENV_VAR = "HABIT_PROFILE"
+LOG_FILE = "habit_profile.log"
+SLOW_MS = 16 # un frame a 60 Hz
+STALL_MS = 200
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False)
+
+
+class Profiler:
+    """Instrumentacion opcional de las rutas calientes de la interfaz
+
+    Desactivado no envuelve nada, asi que no cuesta nada. Activado
+    (variable HABIT_PROFILE=1 o --profile) acumula por seccion el numero
+    de llamadas y el tiempo total/maximo, cuenta los widgets creados y
+    destruidos dentro de cada seccion y detecta bloqueos del mainloop.
+    Las secciones lentas y los bloqueos van a un log JSON rotativo.
+    """
+
+    def __init__(self, enabled=False, log_path=LOG_FILE, slow_ms=SLOW_MS, stall_ms=STALL_MS):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.stall_ms = stall_ms
+        self.sections = {} # {nombre: {"calls", "total_ms", "max_ms", "last_ms", "created", "destroyed"}}
+        self.stalls = [] # ultimos bloqueos (ms)
+        self.stall_count = 0
+        self.widgets_created = 0
+        self.widgets_destroyed = 0
+        self._lock = threading.Lock()
+        self._log = None
+        if enabled and log_path:
+            self._log = logging.getLogger(f"habit_profiler.{id(self)}")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            handler = RotatingFileHandler(log_path, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+            handler.setFormatter(_JsonFormatter())
+            self._log.addHandler(handler)
+
+    @classmethod
+    def from_env(cls, force=False):
+        """Crear el perfilador segun HABIT_PROFILE (o `force`, para --profile)"""
+        enabled = force or os.environ.get(ENV_VAR, "") not in ("", "0")
+        return cls(enabled,
+                   log_path=os.environ.get(ENV_VAR + "_LOG", LOG_FILE),
+                   slow_ms=float(os.environ.get(ENV_VAR + "_SLOW_MS", SLOW_MS)),
+                   stall_ms=float(os.environ.get(ENV_VAR + "_STALL_MS", STALL_MS)))
+
+    def _emit(self, event):
+        if self._log is not None:
+            event["ts"] = time.time()
+            self._log.info(event)
+
+    def record(self, name, elapsed_ms, created=0, destroyed=0):
+        """Acumular una medicion de una seccion"""
+        with self._lock:
+            stats = self.sections.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                                    "last_ms": 0.0, "created": 0, "destroyed": 0})
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["last_ms"] = elapsed_ms
+            stats["created"] += created
+            stats["destroyed"] += destroyed
+        if elapsed_ms >= self.slow_ms:
+            self._emit({"event": "slow", "section": name, "ms": round(elapsed_ms, 3),
+                        "created": created, "destroyed": destroyed,
+                        "thread": threading.current_thread().name})
+
+    def wrap(self, name, func):
+        """Devolver `func` medida como la seccion `name` (o tal cual si esta desactivado)"""
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            created, destroyed = self.widgets_created, self.widgets_destroyed
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, (time.perf_counter() - start) * 1000,
+                            self.widgets_created - created, self.widgets_destroyed - destroyed)
+        return timed
+
+    def instrument(self, obj, methods):
+        """Reemplazar metodos de una instancia por versiones medidas
+
+        `methods` es una lista de nombres o un dict {metodo: seccion}.
+        """
+        if not self.enabled:
+            return
+        if not isinstance(methods, dict):
+            methods = {name: name for name in methods}
+        for attribute, section in methods.items():
+            setattr(obj, attribute, self.wrap(section, getattr(obj, attribute)))
+
+    def count_widgets(self, tk):
+        """Contar los widgets creados y destruidos (parchea tkinter.BaseWidget)"""
+        if not self.enabled:
+            return
+        profiler = self
+        original_init, original_destroy = tk.BaseWidget.__init__, tk.BaseWidget.destroy
+
+        def __init__(widget, *args, **kwargs):
+            profiler.widgets_created += 1
+            original_init(widget, *args, **kwargs)
+
+        def destroy(widget):
+            profiler.widgets_destroyed += 1
+            original_destroy(widget)
+
+        tk.BaseWidget.__init__, tk.BaseWidget.destroy = __init__, destroy
+
+    def watch_mainloop(self, root, interval_ms=100):
+        """Detectar bloqueos: un latido con root.after que llega tarde"""
+        if not self.enabled:
+            return
+
+        def beat(expected):
+            late_ms = (time.perf_counter() - expected) * 1000
+            if late_ms >= self.stall_ms:
+                with self._lock:
+                    self.stalls = (self.stalls + [late_ms])[-50:]
+                    self.stall_count += 1
+                self._emit({"event": "stall", "ms": round(late_ms, 3)})
+            root.after(interval_ms, beat, time.perf_counter() + interval_ms / 1000)
+
+        root.after(interval_ms, beat, time.perf_counter() + interval_ms / 1000)
+
+    def summary(self):
+        """Resumen ordenado por tiempo total"""
+        with self._lock:
+            sections = sorted(self.sections.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+            return {"sections": {name: dict(stats) for name, stats in sections},
+                    "widgets": {"created": self.widgets_created, "destroyed": self.widgets_destroyed,
+                                "alive": self.widgets_created - self.widgets_destroyed},
+                    "stalls": {"count": self.stall_count,
+                               "max_ms": round(max(self.stalls), 3) if self.stalls else 0.0}}
+
+    def close(self):
+        """Escribir el resumen final en el log"""
+        if self.enabled:
+            self._emit(dict(self.summary(), event="summary"))
@@ -0,0 +1,152 @@
+from collections import namedtuple
+from functools import lru_cache
+from itertools import compress
+
+DAILY = "daily"
+WEEKDAYS = ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom']
+
+
+def weekday(ordinal):
+    """Dia de la semana (0 = lunes) de un ordinal; el ordinal 1 fue lunes"""
+    return (ordinal - 1) % 7
+
+
+@lru_cache(maxsize=256)
+def _repeat(pattern, phase, length):
+    """Patron periodico de bytes 0/1 rotado `phase` y repetido hasta `length`"""
+    rotated = pattern[phase:] + pattern[:phase]
+    return (rotated * (length // len(rotated) + 1))[:length]
+
+
+class Schedule(namedtuple("Schedule", ["kind", "value"])):
+    """Frecuencia objetivo de un habito (campo `target_frequency`)
+
+    - "daily": todos los dias.
+    - "weekdays:0,2,4": solo esos dias de la semana (0 = lunes).
+    - "every:3": cada N dias contando desde la fecha de creacion.
+    - "weekly:3": N veces por semana, cualquier dia; la racha se mide
+      en semanas que cumplen el objetivo.
+
+    Los dias que tocan se describen con mascaras de bytes 0/1 construidas
+    repitiendo el patron del periodo (7 o N dias), cacheadas por fase y
+    longitud; rachas y porcentajes se calculan filtrando el historial con
+    la mascara (`itertools.compress`) y operaciones de cadena, sin
+    ramificar dia a dia.
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def parse(text):
+        """Convertir el texto guardado en una Schedule (ValueError si no es valido)"""
+        text = (text or DAILY).strip().lower()
+        kind, _, value = text.partition(":")
+        try:
+            if kind == DAILY and not value:
+                return Schedule(DAILY, None)
+            if kind == "weekly":
+                times = int(value)
+                if not 1 <= times <= 7:
+                    raise ValueError
+                return Schedule(DAILY, None) if times == 7 else Schedule("weekly", times)
+            if kind == "every":
+                interval = int(value)
+                if interval < 1:
+                    raise ValueError
+                return Schedule(DAILY, None) if interval == 1 else Schedule("every", interval)
+            if kind == "weekdays":
+                days = tuple(sorted({int(day) for day in value.split(",")}))
+                if not days or days[0] < 0 or days[-1] > 6:
+                    raise ValueError
+                return Schedule(DAILY, None) if len(days) == 7 else Schedule("weekdays", days)
+        except ValueError:
+            pass
+        raise ValueError(f"Frecuencia invalida: '{text}' (usa daily, weekly:N, weekdays:0,2,4 o every:N)")
+
+    def __str__(self):
+        if self.kind == DAILY:
+            return DAILY
+        if self.kind == "weekdays":
+            return "weekdays:" + ",".join(str(day) for day in self.value)
+        return f"{self.kind}:{self.value}"
+
+    @property
+    def daily(self):
+        return self.kind == DAILY
+
+    @property
+    def unit(self):
+        """Unidad de las rachas"""
+        return "semanas" if self.kind == "weekly" else "dias"
+
+    def label(self):
+        """Descripcion legible"""
+        if self.kind == "weekly":
+            return f"{self.value} veces por semana"
+        if self.kind == "every":
+            return f"Cada {self.value} dias"
+        if self.kind == "weekdays":
+            return ", ".join(WEEKDAYS[day] for day in self.value)
+        return "Diario"
+
+    def due_mask(self, created, start, length):
+        """Bytes 0/1: si toca cada dia desde el ordinal `start` (`length` dias)
+
+        Con "weekly" cualquier dia vale, asi que la mascara es completa.
+        """
+        if length <= 0:
+            return b""
+        if self.kind == "weekdays":
+            pattern = bytes(1 if day in self.value else 0 for day in range(7))
+            return _repeat(pattern, weekday(start), length)
+        if self.kind == "every":
+            pattern = b"\1" + bytes(self.value - 1)
+            return _repeat(pattern, (start - created) % self.value, length)
+        return _repeat(b"\1", 0, length)
+
+    def is_due(self, ordinal, created):
+        """Indicar si toca el dia `ordinal`"""
+        return self.due_mask(created, ordinal, 1) == b"\1"
+
+    def history(self, bitmap, created, today):
+        """Secuencia '0'/'1' de las unidades que tocan hasta hoy
+
+        Una unidad es un dia que toca o, con "weekly", una semana que
+        cumple el objetivo. La semana en curso solo cuenta si ya se
+        cumplio: aun no esta perdida.
+        """
+        if today < created:
+            return ""
+        if self.kind == "weekly":
+            monday = created - weekday(created)
+            days = "0" * (created - monday) + bitmap.bit_string(created, today)
+            weeks = "".join("1" if days.count("1", index, index + 7) >= self.value else "0"
+                            for index in range(0, len(days), 7))
+            return weeks[:-1] if weeks.endswith("0") else weeks
+        days = bitmap.bit_string(created, today)
+        return "".join(compress(days, self.due_mask(created, created, len(days))))
+
+    def streaks(self, bitmap, created, today):
+        """(racha actual, racha mas larga) en unidades que tocan"""
+        units = self.history(bitmap, created, today)
+        current = len(units) - units.rfind("0") - 1
+        longest = max(map(len, units.split("0")))
+        return current, longest
+
+    def completion_rate(self, bitmap, created, start, end):
+        """Porcentaje de lo que tocaba en [start, end] que se completo
+
+        Los dias que no tocan no cuentan; con "weekly" se esperan N/7
+        completitudes por dia y el porcentaje se limita a 100.
+        """
+        length = end - start + 1
+        if length <= 0:
+            return 0
+        days = bitmap.bit_string(start, end)
+        if self.kind == "weekly":
+            done, expected = days.count("1"), length * self.value / 7
+        else:
+            mask = self.due_mask(created, start, length)
+            done, expected = "".join(compress(days, mask)).count("1"), mask.count(1)
+        return min(100.0, done * 100 / expected) if expected else 0
@@ -0,0 +1,69 @@
+class RefreshScheduler:
+    """Agrupar los repintados de la interfaz en uno por frame
+
+    Las mutaciones marcan regiones sucias (por ejemplo "stats",
+    "habits" o "calendar") y, opcionalmente, claves concretas dentro de
+    una region (el nombre de una tarjeta). El primer `mark` programa un
+    `flush` con `root.after`; los siguientes se acumulan, asi una
+    operacion masiva produce un solo repintado.
+    """
+
+    FRAME_MS = 16
+
+    def __init__(self, root, handlers, order=None, delay_ms=FRAME_MS):
+        self.root = root
+        self.handlers = handlers # {region: funcion(keys)}; keys es None si toda la region esta sucia
+        self.order = list(order or handlers)
+        self.delay_ms = delay_ms
+        self._dirty = {}
+        self._after_id = None
+        self._suspended = 0
+
+    def mark(self, region, key=None):
+        """Marcar una region (o solo una clave de ella) como sucia"""
+        if key is None:
+            self._dirty[region] = None
+        else:
+            keys = self._dirty.setdefault(region, set())
+            if keys is not None:
+                keys.add(key)
+        self._schedule()
+
+    def mark_all(self):
+        """Marcar todas las regiones como sucias"""
+        for region in self.order:
+            self._dirty[region] = None
+        self._schedule()
+
+    def _schedule(self):
+        if self._after_id is None and not self._suspended:
+            self._after_id = self.root.after(self.delay_ms, self.flush)
+
+    def flush(self):
+        """Repintar ahora las regiones sucias, en orden"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        dirty, self._dirty = self._dirty, {}
+        for region in self.order:
+            if region in dirty:
+                self.handlers[region](dirty[region])
+
+    def batch(self):
+        """Context manager: suspender repintados durante una operacion masiva"""
+        return _Batch(self)
+
+
+class _Batch:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    def __enter__(self):
+        self.scheduler._suspended += 1
+        return self.scheduler
+
+    def __exit__(self, *exc):
+        self.scheduler._suspended -= 1
+        if not self.scheduler._suspended and self.scheduler._dirty:
+            self.scheduler._schedule()
+        return False
@@ -0,0 +1,112 @@
+import bisect
+import unicodedata
+
+
+def normalize(text):
+    """Minusculas y sin acentos, para comparar texto de busqueda"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class HabitIndex:
+    """Indices de busqueda sobre los habitos
+
+    Mantiene categoria -> nombres, un indice de trigramas del nombre y la
+    descripcion (consultas de 3 o mas caracteres) y una lista ordenada de
+    palabras para busquedas por prefijo (consultas mas cortas). Se
+    actualiza habito a habito con `add`/`remove`.
+    """
+
+    def __init__(self, habits=None):
+        self.by_category = {} # {categoria: set de nombres}
+        self._trigrams = {} # {trigrama: set de nombres}
+        self._words = [] # [(palabra, nombre)] ordenada
+        self._texts = {} # {nombre: texto normalizado}
+        self._categories = {} # {nombre: categoria}
+        if habits:
+            self.rebuild(habits)
+
+    def rebuild(self, habits):
+        """Reconstruir los indices para un diccionario de habitos completo"""
+        for index in (self.by_category, self._trigrams, self._texts, self._categories):
+            index.clear()
+        # Lista de palabras ordenada una sola vez, no con un insort por palabra
+        self._words = sorted((word, name) for name, data in habits.items()
+                             for word in self._add(name, data))
+
+    def add(self, name, data):
+        """Indexar (o reindexar) un habito"""
+        if name in self._texts:
+            self.remove(name)
+        for word in self._add(name, data):
+            bisect.insort(self._words, (word, name))
+
+    def _add(self, name, data):
+        """Indexar categoria y trigramas; devuelve las palabras a indexar"""
+        category = data.get("category", "Otro")
+        text = normalize(f"{name} {data.get('description', '')}")
+        self._texts[name] = text
+        self._categories[name] = category
+        self.by_category.setdefault(category, set()).add(name)
+        for gram in trigrams(text):
+            self._trigrams.setdefault(gram, set()).add(name)
+        return set(text.split())
+
+    def remove(self, name):
+        """Quitar un habito de los indices"""
+        text = self._texts.pop(name, None)
+        if text is None:
+            return
+        category = self._categories.pop(name)
+        self.by_category[category].discard(name)
+        if not self.by_category[category]:
+            del self.by_category[category]
+        for gram in trigrams(text):
+            names = self._trigrams[gram]
+            names.discard(name)
+            if not names:
+                del self._trigrams[gram]
+        for word in set(text.split()):
+            index = bisect.bisect_left(self._words, (word, name))
+            if index < len(self._words) and self._words[index] == (word, name):
+                del self._words[index]
+
+    def categories(self):
+        return sorted(self.by_category)
+
+    def _prefix(self, prefix):
+        """Nombres con alguna palabra que empieza por `prefix`"""
+        names = set()
+        index = bisect.bisect_left(self._words, (prefix,))
+        while index < len(self._words) and self._words[index][0].startswith(prefix):
+            names.add(self._words[index][1])
+            index += 1
+        return names
+
+    def _text(self, query):
+        """Nombres cuyo nombre o descripcion contiene `query`"""
+        if len(query) < 3:
+            return self._prefix(query)
+        # Interseccion de trigramas, empezando por el mas selectivo
+        sets = sorted((self._trigrams.get(gram, set()) for gram in trigrams(query)), key=len)
+        candidates = set(sets[0])
+        for names in sets[1:]:
+            candidates &= names
+            if not candidates:
+                break
+        return {name for name in candidates if query in self._texts[name]}
+
+    def search(self, text="", category=None):
+        """Nombres que cumplen la busqueda y la categoria, o None si no hay filtro"""
+        result = None
+        if category is not None:
+            result = set(self.by_category.get(category, ()))
+        query = normalize(text.strip())
+        if query:
+            matches = self._text(query)
+            result = matches if result is None else result & matches
+        return result
@@ -0,0 +1,92 @@
+import json
+import re
+
+_WHITESPACE = re.compile(r"\s*")
+_decoder = json.JSONDecoder()
+
+
+def _skip(text, pos):
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _expect(text, pos, char):
+    pos = _skip(text, pos)
+    if text[pos:pos + 1] != char:
+        raise ValueError(f"Snapshot invalido: se esperaba {char!r} en la posicion {pos}")
+    return pos + 1
+
+
+class SnapshotIndex:
+    """Snapshot JSON decodificado por partes
+
+    Al abrirlo solo se decodifican los metadatos ("habits"); del objeto
+    "completions" se guarda la posicion de la lista de cada habito dentro
+    del texto, localizada con `str.index` sin crear ningun objeto. Cada
+    historial se decodifica despues, cuando se necesita. "streaks" guarda
+    el estado de rachas de cada habito, de modo que rachas y completitud
+    de hoy se pueden consultar sin decodificar su historial.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.habits = {}
+        self.spans = {} # {habit_name: (inicio, fin) de su lista en el texto}
+        self.journal_seq = 0 # ultimo registro del diario incluido en el snapshot
+        self.streaks = {} # {habit_name: [ultimo dia, racha final, racha mas larga]}
+        self._index()
+
+    @classmethod
+    def read(cls, path):
+        """Leer e indexar un archivo de snapshot"""
+        # Leer bytes y decodificar de una vez es mas rapido que el modo texto
+        with open(path, "rb") as f:
+            return cls(f.read().decode("utf-8"))
+
+    def _index(self):
+        text = self.text
+        pos = _expect(text, 0, "{")
+        while True:
+            pos = _skip(text, pos)
+            if text[pos:pos + 1] == "}":
+                return
+            key, pos = _decoder.raw_decode(text, pos)
+            pos = _skip(text, _expect(text, pos, ":"))
+            if key == "completions":
+                pos = self._index_completions(pos)
+            else:
+                value, pos = _decoder.raw_decode(text, pos)
+                if key == "habits":
+                    self.habits = value
+                elif key == "journal_seq":
+                    self.journal_seq = value
+                elif key == "streaks":
+                    self.streaks = value
+            pos = _skip(text, pos)
+            if text[pos:pos + 1] == ",":
+                pos += 1
+
+    def _index_completions(self, pos):
+        text = self.text
+        pos = _expect(text, pos, "{")
+        while True:
+            pos = _skip(text, pos)
+            if text[pos:pos + 1] == "}":
+                return pos + 1
+            name, pos = _decoder.raw_decode(text, pos)
+            start = _skip(text, _expect(text, pos, ":"))
+            if text[start:start + 1] != "[":
+                raise ValueError(f"Snapshot invalido: historial de {name!r} no es una lista")
+            # Las fechas 'YYYY-MM-DD' nunca contienen ']'
+            end = text.index("]", start) + 1
+            self.spans[name] = (start, end)
+            pos = _skip(text, end)
+            if text[pos:pos + 1] == ",":
+                pos += 1
+
+    def history(self, name):
+        """Decodificar la lista de fechas de un habito"""
+        span = self.spans.get(name)
+        if span is None:
+            return []
+        start, end = span
+        return json.loads(self.text[start:end])
@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from habit_store import BaseHabitStore, DAILY, DATE_FORMAT, format_date, new_habit_record, parse_date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS habits (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    category TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    created_date TEXT NOT NULL,
+    target_frequency TEXT NOT NULL DEFAULT 'daily'
+);
+CREATE TABLE IF NOT EXISTS completions (
+    habit_id INTEGER NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+    date TEXT NOT NULL,
+    PRIMARY KEY (habit_id, date)
+) WITHOUT ROWID;
+"""
+
+
+class SqliteHabitStore(BaseHabitStore):
+    """Backend SQLite con las completitudes indexadas por (habito, fecha)
+
+    Solo los metadatos de los habitos viven en memoria; las consultas de
+    rango (mes del calendario, rachas, porcentajes) usan el indice de la
+    clave primaria de `completions`. Los cambios se acumulan en una
+    transaccion hasta `persist()`.
+    """
+
+    def __init__(self, data_file="habits_data.db"):
+        self.data_file = data_file
+        self.habits = {}
+        self._ids = {} # {habit_name: habit_id}
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            # La conexion puede abrirse en el hilo de E/S y usarse despues en
+            # el de la interfaz, nunca en los dos a la vez
+            self.conn = sqlite3.connect(self.data_file, check_same_thread=False)
+            self.conn.execute("PRAGMA foreign_keys = ON")
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def _habit_id(self, name):
+        if name not in self._ids:
+            raise KeyError(name)
+        return self._ids[name]
+
+    def add_habit(self, name, category="Otro", description="", created_date=None, target_frequency=DAILY):
+        """Agregar un nuevo habito"""
+        name = self._validate_new_name(name)
+        data = new_habit_record(category, description, created_date, target_frequency)
+        cursor = self._connect().execute(
+            "INSERT INTO habits (name, category, description, created_date, target_frequency) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (name, data["category"], data["description"], data["created_date"], data["target_frequency"]))
+        self._ids[name] = cursor.lastrowid
+        self.habits[name] = data
+        return data
+
+    def delete_habit(self, name):
+        """Eliminar un habito y todas sus completitudes
+
+        Devuelve (metadatos, fechas) para poder deshacer con `restore_habit`.
+        """
+        habit_id = self._habit_id(name)
+        tombstone = (dict(self.habits[name]), self.completed_dates(name))
+        self._connect().execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+        del self._ids[name]
+        del self.habits[name]
+        return tombstone
+
+    def update_habit(self, name, **changes):
+        """Cambiar categoria o descripcion; devuelve los valores anteriores"""
+        habit_id = self._habit_id(name)
+        changes = self._validate_changes(changes)
+        previous = {key: self.habits[name].get(key) for key in changes}
+        if changes:
+            assignments = ", ".join(f"{key} = ?" for key in changes)
+            self._connect().execute(f"UPDATE habits SET {assignments} WHERE id = ?",
+                                    (*changes.values(), habit_id))
+        self.habits[name] = dict(self.habits[name], **changes)
+        return previous
+
+    def is_completed(self, name, day=None):
+        """Indicar si el habito esta completado en una fecha (hoy por defecto)"""
+        if name not in self._ids:
+            return False
+        row = self._connect().execute("SELECT 1 FROM completions WHERE habit_id = ? AND date = ?",
+                                      (self._ids[name], format_date(day))).fetchone()
+        return row is not None
+
+    def set_completion(self, name, day=None, done=True):
+        """Marcar o desmarcar un habito en una fecha"""
+        habit_id = self._habit_id(name)
+        if done:
+            self._connect().execute("INSERT OR IGNORE INTO completions (habit_id, date) VALUES (?, ?)",
+                                    (habit_id, format_date(day)))
+        else:
+            self._connect().execute("DELETE FROM completions WHERE habit_id = ? AND date = ?",
+                                    (habit_id, format_date(day)))
+
+    def set_completions(self, names, days, done=True):
+        """Marcar o desmarcar varias fechas de varios habitos en una transaccion"""
+        habit_ids = [self._habit_id(name) for name in names]
+        days = [format_date(day) for day in days]
+        rows = [(habit_id, day) for habit_id in habit_ids for day in days]
+        conn = self._connect()
+        before = conn.total_changes
+        if done:
+            conn.executemany("INSERT OR IGNORE INTO completions (habit_id, date) VALUES (?, ?)", rows)
+        else:
+            conn.executemany("DELETE FROM completions WHERE habit_id = ? AND date = ?", rows)
+        return conn.total_changes - before
+
+    def _range_clause(self, start, end):
+        clause, params = "", []
+        if start is not None:
+            clause += " AND date >= ?"
+            params.append(format_date(start))
+        if end is not None:
+            clause += " AND date <= ?"
+            params.append(format_date(end))
+        return clause, params
+
+    def completed_dates(self, name, start=None, end=None):
+        """Fechas completadas (date) de un habito dentro de un rango, ordenadas"""
+        if name not in self._ids:
+            return []
+        clause, params = self._range_clause(start, end)
+        rows = self._connect().execute("SELECT date FROM completions WHERE habit_id = ?" + clause + " ORDER BY date",
+                                       [self._ids[name]] + params)
+        return [parse_date(date_str) for (date_str,) in rows]
+
+    def count_completions(self, name, start=None, end=None):
+        """Numero de dias completados de un habito dentro de un rango"""
+        if name not in self._ids:
+            return 0
+        clause, params = self._range_clause(start, end)
+        (count,) = self._connect().execute("SELECT COUNT(*) FROM completions WHERE habit_id = ?" + clause,
+                                           [self._ids[name]] + params).fetchone()
+        return count
+
+    def calculate_streak(self, habit_name):
+        """Calcular racha actual recorriendo el indice desde hoy hacia atras"""
+        if habit_name not in self._ids:
+            return 0
+        schedule = self.schedule(habit_name)
+        if not schedule.daily:
+            return self._schedule_streaks(habit_name, schedule)[0]
+        current_date = datetime.now().date()
+        rows = self._connect().execute("SELECT date FROM completions WHERE habit_id = ? AND date <= ? "
+                                       "ORDER BY date DESC",
+                                       (self._ids[habit_name], format_date(current_date)))
+        streak = 0
+        for (date_str,) in rows:
+            if date_str != current_date.strftime(DATE_FORMAT):
+                break
+            streak += 1
+            current_date -= timedelta(days=1)
+        return streak
+
+    def longest_streak(self, habit_name):
+        """Racha mas larga agrupando fechas consecutivas en el indice"""
+        if habit_name not in self._ids:
+            return 0
+        schedule = self.schedule(habit_name)
+        if not schedule.daily:
+            return self._schedule_streaks(habit_name, schedule)[1]
+        (longest,) = self._connect().execute(
+            "SELECT COALESCE(MAX(run), 0) FROM ("
+            "  SELECT COUNT(*) AS run FROM ("
+            "    SELECT julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS grp"
+            "    FROM completions WHERE habit_id = ?"
+            "  ) GROUP BY grp"
+            ")", (self._ids[habit_name],)).fetchone()
+        return longest
+
+    def last_completion(self, habit_name):
+        """Ultima fecha completada de un habito (None si nunca)"""
+        if habit_name not in self._ids:
+            return None
+        (last,) = self._connect().execute("SELECT MAX(date) FROM completions WHERE habit_id = ?",
+                                          (self._ids[habit_name],)).fetchone()
+        return parse_date(last) if last else None
+
+    def to_dict(self):
+        """Representacion serializable de los datos (mismo formato que el JSON)"""
+        completions = {name: [] for name in self.habits}
+        names = {habit_id: name for name, habit_id in self._ids.items()}
+        for habit_id, date_str in self._connect().execute("SELECT habit_id, date FROM completions ORDER BY habit_id, date"):
+            completions[names[habit_id]].append(date_str)
+        return {"habits": self.habits, "completions": completions}
+
+    def import_data(self, data):
+        """Importar un diccionario con el formato de habits_data.json
+
+        Los metadatos y las fechas se normalizan como al crear un habito
+        (ValueError si alguno no es valido) antes de tocar la base.
+        """
+        habits = {name: new_habit_record(habit.get("category", "Otro"), habit.get("description", ""),
+                                         habit.get("created_date"), habit.get("target_frequency"))
+                  for name, habit in data.get("habits", {}).items()}
+        completions = {name: {format_date(date_str) for date_str in dates}
+                       for name, dates in data.get("completions", {}).items()}
+        conn = self._connect()
+        for name, record in habits.items():
+            conn.execute(
+                "INSERT INTO habits (name, category, description, created_date, target_frequency) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET category = excluded.category, "
+                "description = excluded.description, created_date = excluded.created_date, "
+                "target_frequency = excluded.target_frequency",
+                (name, record["category"], record["description"], record["created_date"],
+                 record["target_frequency"]))
+        self.load_data()
+        for name, dates in completions.items():
+            if name in self._ids:
+                conn.executemany("INSERT OR IGNORE INTO completions (habit_id, date) VALUES (?, ?)",
+                                 ((self._ids[name], date_str) for date_str in sorted(dates)))
+        self.persist()
+
+    def persist(self):
+        """Confirmar la transaccion en curso"""
+        if self.conn is not None:
+            self.conn.commit()
+
+    def save_data(self):
+        """Confirmar la transaccion en curso"""
+        self.persist()
+
+    def compact(self):
+        """Confirmar y compactar la base de datos"""
+        self.persist()
+        self._connect().execute("VACUUM")
+
+    def load_data(self):
+        """Cargar los metadatos de los habitos"""
+        rows = self._connect().execute(
+            "SELECT id, name, category, description, created_date, target_frequency FROM habits ORDER BY id")
+        self.habits, self._ids = {}, {}
+        for habit_id, name, category, description, created_date, target_frequency in rows:
+            self._ids[name] = habit_id
+            self.habits[name] = {
+                "category": category,
+                "description": description,
+                "created_date": created_date,
+                "target_frequency": target_frequency
+            }
+
+    def close(self):
+        """Confirmar cambios y cerrar la conexion"""
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """Importar un habits_data.json existente a una base SQLite"""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    store = SqliteHabitStore(db_path)
+    try:
+        store.import_data(data)
+        return len(store.habits)
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrar habits_data.json a una base SQLite")
+    parser.add_argument("json_path", nargs="?", default="habits_data.json",
+                        help="archivo JSON de origen")
+    parser.add_argument("db_path", nargs="?", default="habits_data.db",
+                        help="base SQLite de destino")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.json_path):
+        parser.error(f"No existe el archivo {args.json_path}")
+    try:
+        total = migrate_json_to_sqlite(args.json_path, args.db_path)
+    except ValueError as e:
+        parser.exit(1, f"Error: {e}\n")
+    print(f"{total} habitos migrados a {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
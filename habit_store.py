@@ -0,0 +1,770 @@
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+from habit_bitmap import CompletionBitmap
+from habit_journal import HabitJournal
+from habit_schedule import DAILY, Schedule
+from habit_snapshot import SnapshotIndex
+from habit_streaks import HabitStreak
+from habit_writer import atomic_write_json
+
+DATE_FORMAT = "%Y-%m-%d"
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+EDITABLE_FIELDS = ("category", "description", "target_frequency")
+# Hasta cuantas fechas por habito se actualizan las rachas de forma
+# incremental en set_completions; con mas se recalculan una vez al final
+INCREMENTAL_DAYS = 31
+
+
+def parse_date(value):
+    """Convertir 'YYYY-MM-DD', date o datetime a date"""
+    if value is None:
+        return datetime.now().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def format_date(value):
+    """Convertir una fecha a 'YYYY-MM-DD'"""
+    return parse_date(value).strftime(DATE_FORMAT)
+
+
+def date_range(start, end):
+    """Fechas de `start` a `end`, ambas incluidas"""
+    start, end = parse_date(start), parse_date(end)
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def new_habit_record(category="Otro", description="", created_date=None, target_frequency=DAILY):
+    """Diccionario de metadatos de un habito nuevo"""
+    return {
+        "category": category,
+        "description": description,
+        "created_date": format_date(created_date),
+        "target_frequency": str(Schedule.parse(target_frequency))
+    }
+
+
+def open_store(data_file="habits_data.json", **options):
+    """Abrir el backend adecuado segun la extension del archivo
+
+    Los archivos .db/.sqlite/.sqlite3 usan SqliteHabitStore; el resto el
+    snapshot JSON de HabitStore (con las opciones de diario indicadas).
+    """
+    if os.path.splitext(data_file)[1].lower() in SQLITE_EXTENSIONS:
+        from habit_sqlite import SqliteHabitStore
+        return SqliteHabitStore(data_file)
+    return HabitStore(data_file, **options)
+
+
+class BaseHabitStore:
+    """Operaciones comunes a todos los backends de almacenamiento
+
+    Cada backend implementa `habits`, `add_habit`, `delete_habit`,
+    `update_habit`, `is_completed`, `set_completion`, `completed_dates`,
+    `count_completions`, `calculate_streak`, `longest_streak`,
+    `last_completion`, `persist` y `load_data`.
+    """
+
+    def _validate_new_name(self, name):
+        """Validar el nombre de un habito nuevo"""
+        name = name.strip()
+        if not name:
+            raise ValueError("Por favor ingresa el nombre del habito")
+        if name in self.habits:
+            raise ValueError("Este habito ya existe")
+        return name
+
+    def _validate_changes(self, changes):
+        """Validar los campos de `update_habit`; devuelve los cambios normalizados"""
+        unknown = set(changes) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Campos no editables: {', '.join(sorted(unknown))}")
+        if "target_frequency" in changes:
+            changes = dict(changes, target_frequency=str(Schedule.parse(changes["target_frequency"])))
+        return changes
+
+    def restore_habit(self, name, tombstone):
+        """Reinsertar un habito borrado con lo que devolvio `delete_habit`"""
+        data, dates = tombstone
+        self.add_habit(name, data["category"], data["description"], data["created_date"],
+                       data.get("target_frequency", DAILY))
+        self.set_completions([name], dates, True)
+
+    def schedule(self, name):
+        """Frecuencia objetivo de un habito (diaria si no existe)"""
+        return Schedule.parse(self.habits.get(name, {}).get("target_frequency", DAILY))
+
+    def _created_ordinal(self, name):
+        return parse_date(self.habits[name]["created_date"]).toordinal()
+
+    def _history_bitmap(self, name, start, end):
+        """Bitmap con las completitudes de un habito entre dos ordinales"""
+        return CompletionBitmap(day.toordinal() for day in
+                                self.completed_dates(name, date.fromordinal(start), date.fromordinal(end)))
+
+    def _schedule_streaks(self, name, schedule):
+        """(racha actual, racha mas larga) de un habito con frecuencia no diaria"""
+        created, today = self._created_ordinal(name), parse_date(None).toordinal()
+        return schedule.streaks(self._history_bitmap(name, created, today), created, today)
+
+    def toggle_completion(self, name, day=None):
+        """Alternar la completitud de un habito; devuelve el nuevo estado"""
+        done = not self.is_completed(name, day)
+        self.set_completion(name, day, done)
+        return done
+
+    def set_completions(self, names, days, done=True):
+        """Marcar o desmarcar varias fechas de varios habitos en una operacion
+
+        Se validan todos los habitos antes de cambiar nada. Devuelve el
+        numero de pares (habito, fecha) que cambiaron.
+        """
+        names, days = list(names), [parse_date(day) for day in days]
+        for name in names:
+            if name not in self.habits:
+                raise KeyError(name)
+        changed = 0
+        for name in names:
+            for day in days:
+                if self.is_completed(name, day) != done:
+                    self.set_completion(name, day, done)
+                    changed += 1
+        return changed
+
+    def completed_today(self):
+        """Numero de habitos completados hoy"""
+        today = parse_date(None)
+        return sum(1 for habit in self.habits if self.is_completed(habit, today))
+
+    def calculate_completion_rate(self, habit_name, days=30):
+        """Calcular porcentaje de completitud en los ultimos N dias"""
+        if habit_name not in self.habits:
+            return 0
+
+        created_date = parse_date(self.habits[habit_name]["created_date"])
+        end_date = datetime.now().date()
+        start_date = max(created_date, end_date - timedelta(days=days-1))
+
+        schedule = self.schedule(habit_name)
+        if not schedule.daily:
+            # Solo cuentan los dias que tocan segun la frecuencia
+            start, end = start_date.toordinal(), end_date.toordinal()
+            return schedule.completion_rate(self._history_bitmap(habit_name, start, end),
+                                            created_date.toordinal(), start, end)
+
+        total_days = (end_date - start_date).days + 1
+        completed_days = self.count_completions(habit_name, start_date, end_date)
+
+        return (completed_days / total_days) * 100 if total_days > 0 else 0
+
+    def average_streak(self):
+        """Racha promedio de todos los habitos"""
+        if not self.habits:
+            return 0
+        return sum(self.calculate_streak(habit) for habit in self.habits) / len(self.habits)
+
+    def prepare_persist(self):
+        """Preparar el guardado para hacerlo fuera del hilo de la interfaz
+
+        Se llama en el hilo que modifica el almacen y devuelve una funcion
+        que solo hace E/S sobre una copia de los cambios, o None si no
+        queda nada que escribir. Por defecto se persiste aqui mismo.
+        """
+        self.persist()
+        return None
+
+    @contextmanager
+    def bulk_update(self):
+        """Agrupar muchos cambios (importaciones) hasta el siguiente `persist`"""
+        yield self
+
+    def history_loaded(self, name):
+        """Indicar si el historial de un habito ya esta en memoria"""
+        return True
+
+    def pending_history(self):
+        """Nombres de los habitos cuyo historial aun no se ha cargado"""
+        return []
+
+    def ensure_history(self, names=None):
+        """Cargar ya el historial de esos habitos (todos por defecto)"""
+
+    def close(self):
+        """Liberar recursos del backend"""
+
+
+class HabitStore(BaseHabitStore):
+    """Motor de datos de habitos sin dependencias de interfaz grafica"""
+
+    def __init__(self, data_file="habits_data.json", journal=False, compact_every=500):
+        # Datos
+        self.data_file = data_file
+        self.habits = {}
+        self.completions = defaultdict(CompletionBitmap) # {habit_name: CompletionBitmap}
+        self.streaks = {} # {habit_name: HabitStreak}
+        self._schedule_stats = {} # {habit_name: (hoy, racha actual, mejor racha)} de frecuencias no diarias
+
+        # Diario de cambios (modo write-ahead)
+        self.journal = HabitJournal(data_file + ".journal") if journal else None
+        self.compact_every = compact_every
+        self._pending = []
+        self._needs_snapshot = False # un guardado fallo: el proximo reescribe el snapshot
+        self._bulk = 0 # profundidad de bulk_update: no se registra en el diario
+        self._dirty = set() # habitos cambiados fuera del diario; el proximo snapshot los lleva enteros
+        self._seq = 0 # numero del ultimo registro del diario; el snapshot guarda el que incluye
+        self.on_external_change = None # callback cuando se incorporan cambios de otro proceso
+
+        # Carga perezosa: historiales aun sin decodificar del snapshot
+        self._snapshot = None # SnapshotIndex
+        self._unloaded = {} # {habit_name: registros del diario posteriores al snapshot}
+
+    def add_habit(self, name, category="Otro", description="", created_date=None, target_frequency=DAILY):
+        """Agregar un nuevo habito"""
+        name = self._validate_new_name(name)
+        self.habits[name] = new_habit_record(category, description, created_date, target_frequency)
+        self._record({"op": "add", "name": name, "data": self.habits[name]})
+        return self.habits[name]
+
+    def delete_habit(self, name):
+        """Eliminar un habito y todas sus completitudes
+
+        Devuelve una lapida (metadatos, bitmap, rachas) con la que
+        `restore_habit` lo reinserta sin copiar el historial.
+        """
+        if name not in self.habits:
+            raise KeyError(name)
+        self._require_history(name)
+        data = self.habits.pop(name)
+        completions = self.completions.pop(name, None) or CompletionBitmap()
+        streak = self.streaks.pop(name, None) or HabitStreak()
+        self._schedule_stats.pop(name, None)
+        self._record({"op": "delete", "name": name})
+        return data, completions, streak
+
+    def restore_habit(self, name, tombstone):
+        """Reinsertar un habito borrado a partir de su lapida"""
+        name = self._validate_new_name(name)
+        data, completions, streak = tombstone
+        self.habits[name] = data
+        self.completions[name] = completions
+        self.streaks[name] = streak
+        if completions:
+            # El historial restaurado viaja en el proximo snapshot, no fecha a fecha en el diario
+            self._needs_snapshot = True
+            self._dirty.add(name)
+        else:
+            self._record({"op": "add", "name": name, "data": data})
+
+    def update_habit(self, name, **changes):
+        """Cambiar categoria o descripcion; devuelve los valores anteriores"""
+        if name not in self.habits:
+            raise KeyError(name)
+        changes = self._validate_changes(changes)
+        data = self.habits[name]
+        previous = {key: data.get(key) for key in changes}
+        self.habits[name] = dict(data, **changes)
+        self._schedule_stats.pop(name, None)
+        self._record({"op": "update", "name": name, "data": changes})
+        return previous
+
+    def is_completed(self, name, day=None):
+        """Indicar si el habito esta completado en una fecha (hoy por defecto)"""
+        ordinal = parse_date(day).toordinal()
+        streak = self.streaks.get(name)
+        if name in self._unloaded and streak is not None and (streak.last is None or ordinal >= streak.last):
+            # Desde el ultimo dia completado en adelante basta el resumen de rachas
+            return ordinal == streak.last
+        self._require_history(name)
+        completions = self.completions.get(name)
+        return completions is not None and ordinal in completions
+
+    def set_completion(self, name, day=None, done=True):
+        """Marcar o desmarcar un habito en una fecha"""
+        if name not in self.habits:
+            raise KeyError(name)
+        day = parse_date(day)
+        record = {"op": "done" if done else "undone", "name": name, "date": day.isoformat()}
+        self._apply_completion(record)
+        self._record(record)
+
+    def _apply_completion(self, record):
+        """Marcar o desmarcar segun un registro "done"/"undone" manteniendo las rachas"""
+        name = record["name"]
+        self._schedule_stats.pop(name, None)
+        if name in self._unloaded:
+            # Sin decodificar el historial: se aplica al cargarlo, como el diario
+            self._unloaded[name].append(record)
+            self.streaks.pop(name, None)
+            return
+        ordinal = parse_date(record["date"]).toordinal()
+        completions = self.completions[name]
+        if (ordinal in completions) != (record["op"] == "done"):
+            streak = self.streaks.setdefault(name, HabitStreak())
+            if record["op"] == "done":
+                completions.add(ordinal)
+                streak.on_add(completions, ordinal)
+            else:
+                completions.discard(ordinal)
+                streak.on_discard(completions, ordinal)
+
+    def set_completions(self, names, days, done=True):
+        """Marcar o desmarcar varias fechas de varios habitos en una operacion
+
+        Se validan todos los habitos antes de cambiar nada. Con pocas
+        fechas (un clic, una semana) las rachas se actualizan de forma
+        incremental como en `set_completion`; con mas de INCREMENTAL_DAYS
+        se recalculan una sola vez al final en lugar de por fecha.
+        Devuelve el numero de pares (habito, fecha) que cambiaron.
+        """
+        names, days = list(names), [parse_date(day) for day in days]
+        for name in names:
+            if name not in self.habits:
+                raise KeyError(name)
+        op = "done" if done else "undone"
+        incremental = len(days) <= INCREMENTAL_DAYS
+        changed = 0
+        for name in names:
+            self._require_history(name)
+            completions = self.completions[name]
+            streak = self.streaks.setdefault(name, HabitStreak())
+            before = changed
+            for day in days:
+                ordinal = day.toordinal()
+                if (ordinal in completions) == done:
+                    continue
+                if done:
+                    completions.add(ordinal)
+                    if incremental:
+                        streak.on_add(completions, ordinal)
+                else:
+                    completions.discard(ordinal)
+                    if incremental:
+                        streak.on_discard(completions, ordinal)
+                self._record({"op": op, "name": name, "date": day.isoformat()})
+                changed += 1
+            if changed != before:
+                if not incremental:
+                    self.streaks[name] = HabitStreak(completions)
+                self._schedule_stats.pop(name, None)
+        return changed
+
+    def completed_dates(self, name, start=None, end=None):
+        """Fechas completadas (date) de un habito dentro de un rango, ordenadas"""
+        self._require_history(name)
+        completions = self.completions.get(name)
+        if completions is None:
+            return []
+        return completions.dates(self._ordinal(start), self._ordinal(end))
+
+    def count_completions(self, name, start=None, end=None):
+        """Numero de dias completados de un habito dentro de un rango"""
+        self._require_history(name)
+        completions = self.completions.get(name)
+        if completions is None:
+            return 0
+        return completions.count_range(self._ordinal(start), self._ordinal(end))
+
+    def calculate_streak(self, habit_name):
+        """Calcular racha actual de un habito """
+        schedule = self.schedule(habit_name)
+        if not schedule.daily and habit_name in self.habits:
+            return self._schedule_streaks(habit_name, schedule)[0]
+        today = datetime.now().date().toordinal()
+        streak = self._streak(habit_name, today)
+        if streak is None:
+            return 0
+
+        # Estado incremental: no se recorre el historial
+        return streak.current(self.completions.get(habit_name), today)
+
+    def longest_streak(self, habit_name):
+        """Racha mas larga historica de un habito"""
+        schedule = self.schedule(habit_name)
+        if not schedule.daily and habit_name in self.habits:
+            return self._schedule_streaks(habit_name, schedule)[1]
+        streak = self._streak(habit_name)
+        return streak.longest if streak is not None else 0
+
+    def last_completion(self, habit_name):
+        """Ultima fecha completada de un habito (None si nunca)"""
+        streak = self._streak(habit_name)
+        if streak is None or streak.last is None:
+            return None
+        return date.fromordinal(streak.last)
+
+    def _streak(self, name, today=None):
+        """Estado de rachas de un habito
+
+        Un historial aun sin decodificar usa el resumen del snapshot; solo
+        se decodifica si no hay resumen o si hay dias completados despues
+        de `today` (la racha actual tendria que mirar el bitmap).
+        """
+        streak = self.streaks.get(name)
+        if name in self._unloaded and (streak is None or today is not None and
+                                       streak.last is not None and streak.last > today):
+            self._require_history(name)
+            streak = self.streaks.get(name)
+        return streak
+
+    def rebuild_streaks(self):
+        """Recalcular desde cero el estado de rachas de todos los habitos"""
+        self.streaks = {name: HabitStreak(bitmap) for name, bitmap in self.completions.items()}
+        self._schedule_stats = {}
+
+    def _history_bitmap(self, name, start, end):
+        """El bitmap en memoria del habito (cubre cualquier rango)"""
+        self._require_history(name)
+        return self.completions[name]
+
+    def _schedule_streaks(self, name, schedule):
+        """Rachas de una frecuencia no diaria, cacheadas hasta el siguiente cambio o dia"""
+        today = datetime.now().date().toordinal()
+        cached = self._schedule_stats.get(name)
+        if cached is None or cached[0] != today:
+            cached = (today,) + super()._schedule_streaks(name, schedule)
+            self._schedule_stats[name] = cached
+        return cached[1:]
+
+    def history_loaded(self, name):
+        """Indicar si el historial de un habito ya esta en memoria"""
+        return name not in self._unloaded
+
+    def pending_history(self):
+        """Nombres de los habitos cuyo historial aun no se ha cargado"""
+        return list(self._unloaded)
+
+    def ensure_history(self, names=None):
+        """Cargar ya el historial de esos habitos (todos por defecto)"""
+        for name in list(self._unloaded if names is None else names):
+            self._require_history(name)
+
+    def _require_history(self, name):
+        """Decodificar bajo demanda el historial de un habito"""
+        if name in self._unloaded:
+            bitmap = CompletionBitmap(parse_date(d) for d in self._snapshot.history(name))
+            self._install_history(name, bitmap)
+
+    def _install_history(self, name, bitmap):
+        """Instalar un historial decodificado y reaplicar su parte del diario"""
+        records = self._unloaded.pop(name)
+        for record in records:
+            if record["op"] == "done":
+                bitmap.add(parse_date(record["date"]))
+            else:
+                bitmap.discard(parse_date(record["date"]))
+        self.completions[name] = bitmap
+        if records or name not in self.streaks:
+            # Sin cambios posteriores el resumen del snapshot sigue valido
+            self.streaks[name] = HabitStreak(bitmap)
+        self._schedule_stats.pop(name, None)
+        if not self._unloaded:
+            self._snapshot = None # liberar el texto del snapshot
+
+    def prepare_history_load(self):
+        """Devolver la funcion que decodifica los historiales pendientes
+
+        La funcion solo lee el texto inmutable del snapshot, asi que puede
+        ejecutarse en otro hilo; su resultado se entrega despues a
+        `install_histories` en el hilo que usa el almacen.
+        """
+        if not self._unloaded:
+            return None
+        snapshot, names = self._snapshot, list(self._unloaded)
+
+        def decode():
+            return {name: CompletionBitmap(parse_date(d) for d in snapshot.history(name)) for name in names}
+        return decode
+
+    def install_histories(self, bitmaps):
+        """Instalar historiales decodificados en segundo plano
+
+        Se ignoran los que entretanto se cargaron bajo demanda o se borraron.
+        """
+        for name, bitmap in bitmaps.items():
+            if name in self._unloaded:
+                self._install_history(name, bitmap)
+
+    def _ordinal(self, value):
+        """Ordinal de una fecha opcional de rango"""
+        return parse_date(value).toordinal() if value is not None else None
+
+    def to_dict(self):
+        """Representacion serializable de los datos"""
+        self.ensure_history()
+        return self._serialize(self.habits, self.completions)
+
+    @staticmethod
+    def _serialize(habits, completions, journal_seq=None, streaks=None):
+        data = {
+            "habits": habits,
+            "completions": {k: [day.isoformat() for day in v.dates()] for k, v in completions.items()}
+        }
+        if journal_seq is not None:
+            data["journal_seq"] = journal_seq
+        if streaks is not None:
+            data["streaks"] = streaks
+        return data
+
+    def _streak_states(self):
+        """Estado de rachas de cada habito para guardarlo en el snapshot"""
+        return {name: streak.state() for name, streak in self.streaks.items() if name in self.habits}
+
+    @contextmanager
+    def bulk_update(self):
+        """Agrupar muchos cambios sin registrarlos uno a uno en el diario
+
+        El siguiente `persist` reescribe el snapshot completo en lugar de
+        anexar un registro por cambio.
+        """
+        self._bulk += 1
+        try:
+            yield self
+        finally:
+            self._bulk -= 1
+            self._needs_snapshot = True
+
+    def _record(self, record):
+        """Registrar una mutacion pendiente para el diario
+
+        El numero de secuencia se asigna al escribirla, con el bloqueo del
+        diario tomado, para que sea unico aunque otro proceso tambien anexe.
+        """
+        if self.journal is None:
+            return
+        if self._bulk:
+            self._dirty.add(record["name"])
+        else:
+            self._pending.append(record)
+
+    def _apply_record(self, record):
+        """Reaplicar una mutacion leida del diario"""
+        op, name = record.get("op"), record.get("name")
+        if op == "add":
+            self.habits[name] = record["data"]
+        elif op == "update":
+            if name in self.habits:
+                self.habits[name] = dict(self.habits[name], **record["data"])
+        elif op == "delete":
+            self.habits.pop(name, None)
+            self._unloaded.pop(name, None)
+            self.completions.pop(name, None)
+            self.streaks.pop(name, None)
+        elif name in self._unloaded:
+            # Se reaplica al decodificar el historial del habito
+            self._unloaded[name].append(record)
+            self.streaks.pop(name, None)
+        elif op == "done":
+            self.completions[name].add(parse_date(record["date"]))
+        elif op == "undone":
+            self.completions[name].discard(parse_date(record["date"]))
+
+    def persist(self):
+        """Persistir los cambios pendientes
+
+        En modo diario solo se anexan las mutaciones nuevas y se compacta
+        el snapshot cada `compact_every` registros; sin diario se reescribe
+        el archivo completo.
+        """
+        write = self.prepare_persist()
+        if write is not None:
+            write()
+
+    def prepare_persist(self):
+        """Capturar los cambios pendientes y devolver la funcion que los escribe
+
+        La captura es barata (lineas del diario ya serializadas o copias
+        de los bitmaps); la serializacion del snapshot y los fsync quedan
+        en la funcion devuelta, que puede ejecutarse en otro hilo. Las
+        funciones deben ejecutarse en el mismo orden en que se prepararon.
+
+        En modo diario el bloqueo entre procesos se toma aqui y lo suelta
+        la funcion devuelta: antes de numerar los registros se incorporan
+        los que otro proceso (la CLI con la interfaz abierta) anexo desde
+        la ultima lectura, asi que ni se repiten numeros de secuencia ni
+        un snapshot borra cambios ajenos del diario.
+        """
+        if self.journal is None:
+            return self._snapshot_writer()
+        first = self.journal.acquire()
+        try:
+            if first:
+                # Con otra escritura nuestra pendiente el bloqueo nunca se solto
+                self._sync_journal()
+            pending, self._pending = self._pending, []
+            for record in pending:
+                self._seq += 1
+                record["seq"] = self._seq
+            self.journal.record_count += len(pending)
+            if self._needs_snapshot or self.journal.record_count >= self.compact_every:
+                # El snapshot ya incluye las mutaciones pendientes
+                self.journal.record_count = 0
+                write = self._snapshot_writer()
+            elif pending:
+                write = self._guarded(self.journal.prepare_append(pending))
+            else:
+                write = None
+        except BaseException:
+            self.journal.release()
+            raise
+        if write is None:
+            self.journal.release()
+            return None
+
+        def locked():
+            try:
+                write()
+            finally:
+                self.journal.release()
+        return locked
+
+    def _sync_journal(self):
+        """Incorporar lo que otros procesos escribieron en el diario (con el bloqueo tomado)"""
+        records = self.journal.read_new()
+        if records is None:
+            self._reload()
+        elif records:
+            for record in records:
+                self._seq = max(self._seq, record.get("seq") or 0)
+                self._merge_record(record)
+        else:
+            return
+        if self.on_external_change is not None:
+            self.on_external_change()
+
+    def _merge_record(self, record):
+        """Aplicar un registro del diario a los datos ya cargados, con sus rachas"""
+        op, name = record.get("op"), record.get("name")
+        if op in ("done", "undone"):
+            if name in self.habits:
+                self._apply_completion(record)
+        else:
+            self._apply_record(record)
+            self._schedule_stats.pop(name, None)
+
+    def _reload(self):
+        """Releer el snapshot que compacto otro proceso y reaplicar lo nuestro sin guardar
+
+        Lo pendiente del diario se vuelve a aplicar encima; los habitos
+        cambiados fuera del diario (importaciones, restaurar un borrado)
+        conservan entera la version de este proceso.
+        """
+        pending, needs_snapshot = self._pending, self._needs_snapshot
+        dirty = {name: (self.habits.get(name), self.completions.get(name)) for name in self._dirty}
+        self.load_data(lazy=True)
+        for record in pending:
+            self._merge_record(record)
+        for name, (data, bitmap) in dirty.items():
+            self._unloaded.pop(name, None)
+            self._schedule_stats.pop(name, None)
+            if data is None:
+                self.habits.pop(name, None)
+                self.completions.pop(name, None)
+                self.streaks.pop(name, None)
+            else:
+                bitmap = bitmap if bitmap is not None else CompletionBitmap()
+                self.habits[name] = data
+                self.completions[name] = bitmap
+                self.streaks[name] = HabitStreak(bitmap)
+        self._pending, self._needs_snapshot, self._dirty = pending, needs_snapshot, set(dirty)
+
+    def _snapshot_writer(self):
+        """Copiar el estado actual y devolver la funcion que escribe el snapshot"""
+        self.ensure_history()
+        habits = {name: dict(data) for name, data in self.habits.items()}
+        completions = {name: bitmap.copy() for name, bitmap in self.completions.items()}
+        streaks = self._streak_states()
+        journal_seq = self._seq
+        self._needs_snapshot = False
+        self._dirty = set()
+        reset = self.journal.prepare_reset(journal_seq) if self.journal is not None else None
+
+        def write():
+            # Si se cae entre el rename y el vaciado del diario, journal_seq
+            # evita reaplicar al releer registros que el snapshot ya incluye
+            atomic_write_json(self.data_file, self._serialize(habits, completions, journal_seq, streaks))
+            if reset is not None:
+                reset()
+        return self._guarded(write)
+
+    def _guarded(self, func, *args):
+        """Envolver una escritura para forzar un snapshot completo si falla"""
+        def write():
+            try:
+                func(*args)
+            except Exception:
+                self._needs_snapshot = True
+                if self.journal is not None:
+                    self.journal.offset = None # el diario quedo en un estado desconocido
+                raise
+        return write
+
+    def compact(self):
+        """Volcar el estado al snapshot y vaciar el diario"""
+        self.save_data()
+
+    def save_data(self):
+        """Guardar el snapshot completo de forma atomica (y vaciar el diario)"""
+        self._needs_snapshot = True
+        self.persist()
+
+    def load_data(self, lazy=False):
+        """Cargar datos desde archivo JSON
+
+        Con `lazy` solo se decodifican los metadatos de los habitos; cada
+        historial se decodifica al consultarlo por primera vez o con
+        `prepare_history_load`/`install_histories` en segundo plano.
+        """
+        if self.journal is None:
+            self._read_snapshot()
+        else:
+            # Snapshot y diario se leen juntos, sin que otro proceso compacte en medio
+            self.journal.acquire()
+            try:
+                self._read_snapshot()
+                self._replay_journal()
+            finally:
+                self.journal.release()
+
+        # Unico recalculo completo de rachas de los historiales ya cargados;
+        # los que siguen sin decodificar usan el resumen del snapshot si el
+        # diario no los toco
+        self.rebuild_streaks()
+        if self._snapshot is not None:
+            for name, records in self._unloaded.items():
+                state = self._snapshot.streaks.get(name)
+                if state is not None and not records:
+                    self.streaks[name] = HabitStreak.from_state(*state)
+        if not lazy:
+            self.ensure_history()
+        if not self._unloaded:
+            self._snapshot = None
+
+    def _read_snapshot(self):
+        """Leer el snapshot (solo metadatos; los historiales quedan pendientes)"""
+        self.habits, self.completions = {}, defaultdict(CompletionBitmap)
+        self._snapshot, self._unloaded, self._seq, self._dirty = None, {}, 0, set()
+        if os.path.exists(self.data_file):
+            self._snapshot = SnapshotIndex.read(self.data_file)
+            self.habits = self._snapshot.habits
+            self._unloaded = {name: [] for name in self._snapshot.spans}
+            self._seq = self._snapshot.journal_seq
+
+    def _replay_journal(self):
+        """Reaplicar los cambios registrados despues del ultimo snapshot
+
+        Los registros que el snapshot ya incluye (seq <= journal_seq) se saltan.
+        """
+        included = self._seq
+        for record in self.journal.replay():
+            seq = record.get("seq")
+            if seq is not None:
+                if seq <= included:
+                    continue
+                self._seq = max(self._seq, seq)
+            self._apply_record(record)
+        self._pending = []
@@ -0,0 +1,70 @@
+class HabitStreak:
+    """Estado incremental de rachas de un habito
+
+    Guarda el ultimo dia completado, la longitud de la racha que termina
+    en ese dia y la racha mas larga. Se recalcula completo solo al cargar;
+    cada marca o desmarca lo actualiza mirando unicamente la racha que
+    contiene el dia modificado. La racha actual se lee en O(1).
+    """
+
+    __slots__ = ("last", "tail", "longest")
+
+    def __init__(self, bitmap=None):
+        self.last = None
+        self.tail = 0
+        self.longest = 0
+        if bitmap is not None:
+            self.rebuild(bitmap)
+
+    def rebuild(self, bitmap):
+        """Recalcular todo el estado a partir del bitmap"""
+        self.last = bitmap.last_before()
+        self.tail = bitmap.run_length_back(self.last) if self.last is not None else 0
+        self.longest = bitmap.longest_run()
+
+    def on_add(self, bitmap, ordinal):
+        """Actualizar despues de marcar `ordinal` en el bitmap"""
+        forward = bitmap.run_length_forward(ordinal + 1)
+        run = bitmap.run_length_back(ordinal) + forward
+        self.longest = max(self.longest, run)
+
+        # La racha que contiene el dia llega hasta el ultimo completado
+        end = ordinal + forward
+        if self.last is None or end >= self.last:
+            self.last = end
+            self.tail = run
+
+    def on_discard(self, bitmap, ordinal):
+        """Actualizar despues de desmarcar `ordinal` en el bitmap"""
+        left = bitmap.run_length_back(ordinal - 1)
+        right = bitmap.run_length_forward(ordinal + 1)
+
+        if ordinal == self.last:
+            self.last = ordinal - 1 if left else bitmap.last_before(ordinal - 1)
+            self.tail = left if left else (bitmap.run_length_back(self.last) if self.last is not None else 0)
+        elif self.last is not None and ordinal + right == self.last:
+            self.tail = right
+
+        # Solo se recorre el historial si se rompio la racha mas larga
+        if left + 1 + right == self.longest:
+            self.longest = bitmap.longest_run()
+
+    def current(self, bitmap, today):
+        """Racha actual terminando en el ordinal `today`"""
+        if self.last == today:
+            return self.tail
+        if self.last is None or self.last < today:
+            return 0
+        # Hay dias futuros marcados: contar desde hoy
+        return bitmap.run_length_back(today)
+
+    def state(self):
+        """[ultimo dia, racha final, racha mas larga] para guardar en el snapshot"""
+        return [self.last, self.tail, self.longest]
+
+    @classmethod
+    def from_state(cls, last, tail, longest):
+        """Reconstruir el estado guardado con `state` sin recorrer el historial"""
+        streak = cls()
+        streak.last, streak.tail, streak.longest = last, tail, longest
+        return streak
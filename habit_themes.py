@@ -0,0 +1,72 @@
+import json
+import os
+
+THEMES_FILE = "habit_themes.json"
+
+DEFAULT_THEMES = {
+    "light": {
+        "bg_primary": "#f0f4f8",
+        "bg_secondary": "white",
+        "bg_accent": "#4338ca",
+        "text_primary": "#1e293b",
+        "text_secondary": "#64748b",
+        "text_accent": "white",
+        "border": "#e2e8f0",
+        "success": "#059669",
+        "danger": "#dc2626",
+        "card_bg": "white",
+        "stats_bg": "#f8fafc"
+    },
+    "dark": {
+        "bg_primary": "#0f172a",
+        "bg_secondary": "#1e293b",
+        "bg_accent": "#6366f1",
+        "text_primary": "#f1f5f9",
+        "text_secondary": "#94a3b8",
+        "text_accent": "white",
+        "border": "#334155",
+        "success": "#10b981",
+        "danger": "#ef4444",
+        "card_bg": "#1e293b",
+        "stats_bg": "#0f172a"
+    }
+}
+
+# Nombre visible de cada tema en el boton del header
+THEME_LABELS = {"light": "Claro", "dark": "Oscuro"}
+
+# Colores de cada rol de widget: (clave de fondo, clave de texto)
+ROLE_COLORS = {
+    "primary": ("bg_primary", "text_primary"),
+    "muted": ("bg_primary", "text_secondary"),
+    "card": ("card_bg", "text_primary"),
+    "secondary": ("card_bg", "text_secondary"),
+    "stats": ("stats_bg", "text_primary"),
+    "header": ("bg_accent", "text_accent"),
+    "accent": ("bg_accent", "text_accent"),
+    "danger": ("danger", "text_accent"),
+}
+
+
+def theme_label(name):
+    """Nombre visible de un tema"""
+    return THEME_LABELS.get(name, name.replace("_", " ").title())
+
+
+def load_themes(path=THEMES_FILE):
+    """Cargar los temas predefinidos mas los temas personalizados
+
+    El archivo es un JSON {nombre: {clave: color}}; las claves que falten
+    se toman del tema indicado en "base" (por defecto "light").
+    """
+    themes = {name: dict(colors) for name, colors in DEFAULT_THEMES.items()}
+    if not os.path.exists(path):
+        return themes
+    with open(path, "r", encoding="utf-8") as f:
+        custom = json.load(f)
+    for name, colors in custom.items():
+        base = themes.get(colors.get("base", "light"), DEFAULT_THEMES["light"])
+        theme = dict(base)
+        theme.update({key: value for key, value in colors.items() if key != "base"})
+        themes[name] = theme
+    return themes
@@ -0,0 +1,175 @@
+import argparse
+import csv
+import json
+import os
+from habit_store import open_store, parse_date
+from habit_writer import atomic_open
+
+FIELDS = ("habit", "date", "category", "description", "created_date", "target_frequency")
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+BATCH_SIZE = 1000
+
+
+def detect_format(path):
+    """Formato (csv o ndjson) segun la extension del archivo"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Formato no soportado: {extension or path} (usa .csv, .ndjson o .jsonl)")
+    return FORMATS[extension]
+
+
+def iter_records(store):
+    """Generar un registro por completitud, habito a habito
+
+    Los habitos sin completitudes generan un unico registro sin fecha
+    para que sus metadatos tambien se exporten.
+    """
+    for name, data in list(store.habits.items()):
+        meta = {"habit": name,
+                "category": data.get("category", "Otro"),
+                "description": data.get("description", ""),
+                "created_date": data.get("created_date"),
+                "target_frequency": data.get("target_frequency", "daily")}
+        exported = False
+        for day in store.completed_dates(name):
+            exported = True
+            yield dict(meta, date=day.isoformat())
+        if not exported:
+            yield dict(meta, date=None)
+
+
+def write_csv(records, f):
+    """Escribir registros como CSV, uno por linea"""
+    writer = csv.DictWriter(f, fieldnames=FIELDS)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow({key: record.get(key) or "" for key in FIELDS})
+        count += 1
+    return count
+
+
+def write_ndjson(records, f):
+    """Escribir registros como NDJSON, uno por linea"""
+    count = 0
+    for record in records:
+        f.write(json.dumps({key: record.get(key) for key in FIELDS}, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def read_csv(f):
+    """Leer registros de un CSV exportado"""
+    for row in csv.DictReader(f):
+        yield {key: (row.get(key) or None) for key in FIELDS}
+
+
+def read_ndjson(f):
+    """Leer registros de un NDJSON exportado (ignora lineas vacias)"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson}
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+
+def export_file(store, path, fmt=None):
+    """Exportar todas las completitudes a un archivo; devuelve el numero de registros
+
+    El formato y el destino se validan antes de tocar el disco y se
+    escribe en un temporal que se renombra al terminar, asi que un error
+    nunca deja el destino truncado. No se puede exportar sobre los
+    archivos del propio almacen.
+    """
+    writer = WRITERS[fmt or detect_format(path)]
+    data_file = getattr(store, "data_file", None)
+    if data_file is not None:
+        target = os.path.realpath(path)
+        if target in {os.path.realpath(data_file + suffix) for suffix in ("", ".journal", ".journal.lock", "-wal", "-shm")}:
+            raise ValueError(f"No se puede exportar sobre el archivo de datos {data_file}")
+    with atomic_open(path, newline="") as f:
+        return writer(iter_records(store), f)
+
+
+def import_records(store, records, batch_size=BATCH_SIZE):
+    """Insertar en el almacen los registros de un iterable, por lotes
+
+    Los habitos que no existen se crean con los metadatos del registro;
+    los existentes conservan los suyos. Las fechas se agrupan por habito
+    y se aplican con `set_completions` cada `batch_size` registros.
+    Devuelve {"habits": creados, "completions": marcadas}.
+    """
+    stats = {"habits": 0, "completions": 0}
+    batch, size = {}, 0
+
+    def flush():
+        for name, days in batch.items():
+            stats["completions"] += store.set_completions([name], days, True)
+        batch.clear()
+
+    for record in records:
+        name = (record.get("habit") or "").strip()
+        if not name:
+            continue
+        if name not in store.habits:
+            store.add_habit(name, record.get("category") or "Otro", record.get("description") or "",
+                            record.get("created_date") or record.get("date"),
+                            record.get("target_frequency") or "daily")
+            stats["habits"] += 1
+        if record.get("date"):
+            batch.setdefault(name, []).append(parse_date(record["date"]))
+            size += 1
+            if size >= batch_size:
+                flush()
+                size = 0
+    flush()
+    return stats
+
+
+def import_file(store, path, fmt=None, batch_size=BATCH_SIZE):
+    """Importar un archivo CSV/NDJSON con un unico guardado al final"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        with store.bulk_update():
+            stats = import_records(store, READERS[fmt or detect_format(path)](f), batch_size)
+    store.persist()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importar o exportar habitos en CSV/NDJSON")
+    parser.add_argument("command", choices=("export", "import"), help="operacion a realizar")
+    parser.add_argument("path", help="archivo .csv, .ndjson o .jsonl")
+    parser.add_argument("--data", default="habits_data.json",
+                        help="archivo de datos (.json o base SQLite)")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())),
+                        help="formato del archivo (por defecto segun la extension)")
+    args = parser.parse_args(argv)
+
+    try:
+        fmt = args.format or detect_format(args.path)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == "import" and not os.path.exists(args.path):
+        parser.error(f"No existe el archivo {args.path}")
+
+    store = open_store(args.data, journal=True)
+    try:
+        store.load_data()
+        if args.command == "export":
+            try:
+                total = export_file(store, args.path, fmt)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"{total} registros exportados a {args.path}")
+        else:
+            stats = import_file(store, args.path, fmt)
+            print(f"{stats['habits']} habitos nuevos y {stats['completions']} completitudes importadas")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+import tkinter as tk
+import weakref
+from datetime import date
+from habit_themes import ROLE_COLORS
+
+WEEKDAYS = ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom']
+
+
+class CalendarCanvas(tk.Canvas):
+    """Cuadricula mensual dibujada como items de un unico Canvas
+
+    Los 7 encabezados y las 42 celdas (rectangulo, numero y check) se
+    crean una sola vez; cambiar de mes o de tema solo ejecuta
+    `itemconfigure` y `coords` sobre los IDs guardados. Un clic en un
+    dia llama a `on_day_click(dia, extender)`; `extender` es True con
+    Shift pulsado (seleccion de rango).
+    """
+
+    ROWS = 6
+    HEADER_HEIGHT = 30
+    PADDING = 2
+
+    def __init__(self, master, get_theme, on_day_click=None, **kwargs):
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, **kwargs)
+        self.get_theme = get_theme
+        self.on_day_click = on_day_click
+        self._model = None # (weeks, completed, today, due)
+        self._cell_size = (20, 20)
+
+        self._headers = [self.create_text(0, 0, text=day, font=("Arial", 12, "bold"))
+                         for day in WEEKDAYS]
+        self._cells = []
+        for _ in range(self.ROWS * 7):
+            rect = self.create_rectangle(0, 0, 0, 0, width=1)
+            label = self.create_text(0, 0, font=("Arial", 12, "bold"))
+            check = self.create_text(0, 0, text="✓", font=("Arial", 8, "bold"))
+            self._cells.append((rect, label, check))
+        self._message = self.create_text(0, 0, font=("Arial", 14), state="hidden")
+
+        self.bind("<Configure>", self._layout)
+        self.bind("<Button-1>", lambda event: self._on_click(event, False))
+        self.bind("<Shift-Button-1>", lambda event: self._on_click(event, True))
+
+    def _layout(self, event=None):
+        """Recalcular coordenadas de los items al cambiar el tamaño"""
+        width = max(self.winfo_width(), 7 * 20)
+        height = max(self.winfo_height(), self.HEADER_HEIGHT + self.ROWS * 20)
+        cell_w = width / 7
+        cell_h = (height - self.HEADER_HEIGHT) / self.ROWS
+        self._cell_size = (cell_w, cell_h)
+
+        for column, header in enumerate(self._headers):
+            self.coords(header, (column + 0.5) * cell_w, self.HEADER_HEIGHT / 2)
+
+        for index, (rect, label, check) in enumerate(self._cells):
+            row, column = divmod(index, 7)
+            x0 = column * cell_w + self.PADDING
+            y0 = self.HEADER_HEIGHT + row * cell_h + self.PADDING
+            x1 = (column + 1) * cell_w - self.PADDING
+            y1 = self.HEADER_HEIGHT + (row + 1) * cell_h - self.PADDING
+            self.coords(rect, x0, y0, x1, y1)
+            self.coords(label, (x0 + x1) / 2, (y0 + y1) / 2)
+            self.coords(check, x1 - 10, y0 + 10)
+
+        self.coords(self._message, width / 2, height / 2)
+
+    def _on_click(self, event, extend):
+        """Traducir un clic a un numero de dia del mes mostrado"""
+        if self._model is None or self.on_day_click is None:
+            return
+        cell_w, cell_h = self._cell_size
+        column = int(event.x // cell_w)
+        row = int((event.y - self.HEADER_HEIGHT) // cell_h)
+        weeks = self._model[0]
+        if 0 <= column < 7 and 0 <= row < len(weeks) and weeks[row][column]:
+            self.on_day_click(weeks[row][column], extend)
+
+    def show_message(self, text):
+        """Ocultar la cuadricula y mostrar un mensaje"""
+        self._model = None
+        for item in self._headers:
+            self.itemconfigure(item, state="hidden")
+        for cell in self._cells:
+            for item in cell:
+                self.itemconfigure(item, state="hidden")
+        self.itemconfigure(self._message, text=text, state="normal",
+                           fill=self.get_theme("text_secondary"))
+
+    def show_month(self, weeks, completed, today=None, due=None):
+        """Pintar un mes
+
+        `weeks` es la salida de calendar.monthcalendar, `completed` el
+        conjunto de numeros de dia completados, `today` el numero del dia
+        actual si cae en este mes y `due` los dias que tocan segun la
+        frecuencia (None si todos); los que no tocan se pintan atenuados.
+        """
+        if (weeks, completed, today, due) == self._model:
+            return # mismo mes ya pintado
+        self._model = (weeks, completed, today, due)
+        self.itemconfigure(self._message, state="hidden")
+
+        text_secondary = self.get_theme("text_secondary")
+        for item in self._headers:
+            self.itemconfigure(item, state="normal", fill=text_secondary)
+
+        for index, (rect, label, check) in enumerate(self._cells):
+            row, column = divmod(index, 7)
+            day = weeks[row][column] if row < len(weeks) else 0
+            if day == 0:
+                # Dia vacio
+                self.itemconfigure(rect, state="hidden")
+                self.itemconfigure(label, state="hidden")
+                self.itemconfigure(check, state="hidden")
+                continue
+
+            # Color del dia
+            is_completed = day in completed
+            if is_completed:
+                bg_color, text_color = self.get_theme("success"), "white"
+            elif day == today:
+                bg_color, text_color = self.get_theme("bg_accent"), "white"
+            elif due is not None and day not in due:
+                bg_color, text_color = self.get_theme("bg_primary"), self.get_theme("text_secondary")
+            else:
+                bg_color, text_color = self.get_theme("card_bg"), self.get_theme("text_primary")
+
+            self.itemconfigure(rect, state="normal", fill=bg_color, outline=self.get_theme("border"))
+            self.itemconfigure(label, state="normal", text=str(day), fill=text_color)
+            self.itemconfigure(check, state="normal" if is_completed else "hidden", fill=text_color)
+
+    def refresh_colors(self):
+        """Repintar el ultimo modelo con los colores del tema actual"""
+        if self._model is not None:
+            model, self._model = self._model, None
+            self.show_month(*model)
+
+
+class ThemeRegistry:
+    """Registro de widgets por rol de tema
+
+    Cada widget se registra al crearse con su rol (`_theme_type`); cambiar
+    de tema recorre solo estas listas precalculadas con un `configure`
+    por widget, sin recorrer el arbol ni consultar `winfo_class`/`cget`.
+    Los widgets destruidos desaparecen solos de los WeakSet.
+    """
+
+    # Clases de widget que no aceptan color de texto
+    BG_ONLY = ("Frame", "Canvas", "Toplevel")
+
+    def __init__(self):
+        self._widgets = {} # {(rol, usa_fg): WeakSet de widgets}
+
+    def register(self, widget, role, theme):
+        """Registrar un widget y aplicarle el tema actual"""
+        widget._theme_type = role
+        uses_fg = widget.winfo_class() not in self.BG_ONLY
+        self._widgets.setdefault((role, uses_fg), weakref.WeakSet()).add(widget)
+        widget.configure(**self._options(role, uses_fg, theme))
+        return widget
+
+    def _options(self, role, uses_fg, theme):
+        bg_key, fg_key = ROLE_COLORS[role]
+        options = {"bg": theme[bg_key]}
+        if uses_fg:
+            options["fg"] = theme[fg_key]
+        return options
+
+    def apply(self, theme):
+        """Aplicar un tema a todos los widgets registrados, por lotes de rol"""
+        for (role, uses_fg), widgets in self._widgets.items():
+            options = self._options(role, uses_fg, theme)
+            for widget in list(widgets):
+                try:
+                    widget.configure(**options)
+                except tk.TclError:
+                    # Widget destruido pero aun referenciado
+                    widgets.discard(widget)
+
+    def __len__(self):
+        return sum(len(widgets) for widgets in self._widgets.values())
+
+
+class HeatmapCanvas(tk.Canvas):
+    """Mapa de calor de un año completo en un unico Canvas
+
+    Vista de un habito: cuadricula semanas x dias de la semana (estilo
+    GitHub) con los rectangulos creados una sola vez y recoloreados con
+    `itemconfigure`. Vista comparativa: una fila de 365 dias por habito
+    pintada en una sola PhotoImage, que se escala con `zoom` y se
+    muestra como un unico item.
+    """
+
+    CELL = 13
+    GAP = 2
+    LEFT = 40
+    TOP = 24
+    WEEKS = 54
+    NAME_WIDTH = 160
+    DAY_WIDTH = 2
+    ROW_HEIGHT = 12
+
+    def __init__(self, master, get_theme, **kwargs):
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, **kwargs)
+        self.get_theme = get_theme
+        self._model = None # ("year" | "compare", argumentos)
+        self._cells = [] # rectangulos de la vista anual, creados al primer uso
+        self._month_labels = []
+        self._weekday_labels = []
+        self._row_labels = [] # textos reciclados de la vista comparativa
+        self._image = None
+        self._image_item = self.create_image(self.NAME_WIDTH, self.TOP, anchor="nw", state="hidden")
+        self._message = self.create_text(20, 20, anchor="nw", font=("Arial", 14), state="hidden")
+
+    def _hide_all(self):
+        for item in self.find_all():
+            self.itemconfigure(item, state="hidden")
+
+    def show_message(self, text):
+        """Ocultar el mapa y mostrar un mensaje"""
+        self._model = None
+        self._hide_all()
+        self.itemconfigure(self._message, text=text, state="normal",
+                           fill=self.get_theme("text_secondary"))
+
+    def _ensure_year_items(self):
+        if self._cells:
+            return
+        step = self.CELL + self.GAP
+        for index in range(self.WEEKS * 7):
+            week, weekday = divmod(index, 7)
+            x0 = self.LEFT + week * step
+            y0 = self.TOP + weekday * step
+            self._cells.append(self.create_rectangle(x0, y0, x0 + self.CELL, y0 + self.CELL, width=1))
+        self._month_labels = [self.create_text(0, self.TOP - 12, anchor="w", font=("Arial", 9))
+                              for _ in range(12)]
+        self._weekday_labels = [self.create_text(self.LEFT - 6, self.TOP + row * step + self.CELL / 2,
+                                                 anchor="e", text=WEEKDAYS[row], font=("Arial", 9))
+                                for row in range(0, 7, 2)]
+
+    def show_year(self, year, completed, created, today):
+        """Pintar un año de un habito
+
+        `completed` es el conjunto de ordinales completados, `created` el
+        ordinal de creacion del habito y `today` el ordinal de hoy; los dias
+        fuera de [created, today] se pintan como inactivos.
+        """
+        model = ("year", (year, completed, created, today))
+        if model == self._model:
+            return
+        self._hide_all()
+        self._model = model
+        self._ensure_year_items()
+
+        first = date(year, 1, 1).toordinal()
+        last = date(year, 12, 31).toordinal()
+        origin = first - date(year, 1, 1).weekday() # lunes de la primera semana
+        done_color = self.get_theme("success")
+        empty_color = self.get_theme("border")
+        inactive_color = self.get_theme("bg_primary")
+        outline = self.get_theme("bg_primary")
+
+        for index, rect in enumerate(self._cells):
+            week, weekday = divmod(index, 7)
+            ordinal = origin + week * 7 + weekday
+            if ordinal < first or ordinal > last:
+                continue
+            if ordinal in completed:
+                fill = done_color
+            elif created <= ordinal <= today:
+                fill = empty_color
+            else:
+                fill = inactive_color
+            self.itemconfigure(rect, state="normal", fill=fill,
+                               outline=self.get_theme("bg_accent") if ordinal == today else outline)
+
+        step = self.CELL + self.GAP
+        text_secondary = self.get_theme("text_secondary")
+        for month, label in enumerate(self._month_labels, start=1):
+            week = (date(year, month, 1).toordinal() - origin) // 7
+            self.coords(label, self.LEFT + week * step, self.TOP - 12)
+            self.itemconfigure(label, text=date(year, month, 1).strftime("%b"),
+                               fill=text_secondary, state="normal")
+        for label in self._weekday_labels:
+            self.itemconfigure(label, fill=text_secondary, state="normal")
+        self.configure(scrollregion=(0, 0, self.LEFT + self.WEEKS * step, self.TOP + 7 * step))
+
+    def show_comparison(self, year, rows, today):
+        """Pintar varios habitos, un dia por columna y un habito por fila
+
+        `rows` es una lista de (nombre, ordinales completados, ordinal de
+        creacion). Toda la cuadricula se genera como una sola imagen.
+        """
+        model = ("compare", (year, rows, today))
+        if model == self._model:
+            return
+        self._hide_all()
+        self._model = model
+
+        first = date(year, 1, 1).toordinal()
+        n_days = date(year, 12, 31).toordinal() - first + 1
+        done_color = self.get_theme("success")
+        empty_color = self.get_theme("border")
+        inactive_color = self.get_theme("bg_primary")
+
+        # Una fila de pixeles por habito, en una sola llamada a put()
+        pixel_rows = []
+        for _, completed, created in rows:
+            colors = []
+            for ordinal in range(first, first + n_days):
+                if ordinal in completed:
+                    colors.append(done_color)
+                elif created <= ordinal <= today:
+                    colors.append(empty_color)
+                else:
+                    colors.append(inactive_color)
+            pixel_rows.append("{" + " ".join(colors) + "}")
+
+        if rows:
+            base = tk.PhotoImage(master=self, width=n_days, height=len(rows))
+            base.put(" ".join(pixel_rows), to=(0, 0))
+            self._image = base.zoom(self.DAY_WIDTH, self.ROW_HEIGHT)
+            self.itemconfigure(self._image_item, image=self._image, state="normal")
+
+        # Nombres de los habitos: textos reciclados
+        while len(self._row_labels) < len(rows):
+            self._row_labels.append(self.create_text(self.NAME_WIDTH - 8, 0, anchor="e", font=("Arial", 9)))
+        text_primary = self.get_theme("text_primary")
+        for index, (name, _, _) in enumerate(rows):
+            label = self._row_labels[index]
+            self.coords(label, self.NAME_WIDTH - 8, self.TOP + (index + 0.5) * self.ROW_HEIGHT)
+            self.itemconfigure(label, text=name, fill=text_primary, state="normal")
+        self.configure(scrollregion=(0, 0, self.NAME_WIDTH + n_days * self.DAY_WIDTH,
+                                     self.TOP + len(rows) * self.ROW_HEIGHT))
+
+    def refresh_colors(self):
+        """Repintar el ultimo modelo con los colores del tema actual"""
+        if self._model is None:
+            return
+        kind, args = self._model
+        self._model = None
+        if kind == "year":
+            self.show_year(*args)
+        else:
+            self.show_comparison(*args)
+
+
+class DebugOverlay:
+    """Ventana flotante con el resumen del perfilador (se alterna con F12)"""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, root, profiler):
+        self.root = root
+        self.profiler = profiler
+        self.window = None
+        self._label = None
+        self._after_id = None
+
+    def toggle(self, event=None):
+        if self.window is None:
+            self._open()
+        else:
+            self._close()
+
+    def _open(self):
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Perfilador")
+        self.window.attributes("-topmost", True)
+        self.window.protocol("WM_DELETE_WINDOW", self._close)
+        self._label = tk.Label(self.window, font=("Courier", 9), justify="left", anchor="nw",
+                               bg="black", fg="#00ff88", padx=10, pady=10)
+        self._label.pack(fill="both", expand=True)
+        self._refresh()
+
+    def _close(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self.window is not None:
+            self.window.destroy()
+        self.window = self._label = None
+
+    def _refresh(self):
+        summary = self.profiler.summary()
+        lines = [f"{'seccion':<24}{'llamadas':>9}{'total ms':>11}{'max ms':>9}{'ult ms':>9}{'+w':>7}{'-w':>7}"]
+        for name, stats in summary["sections"].items():
+            lines.append(f"{name:<24}{stats['calls']:>9}{stats['total_ms']:>11.1f}{stats['max_ms']:>9.1f}"
+                         f"{stats['last_ms']:>9.1f}{stats['created']:>7}{stats['destroyed']:>7}")
+        widgets, stalls = summary["widgets"], summary["stalls"]
+        lines.append("")
+        lines.append(f"widgets vivos: {widgets['alive']}  (creados {widgets['created']}, "
+                     f"destruidos {widgets['destroyed']})")
+        lines.append(f"bloqueos del mainloop: {stalls['count']}  (max {stalls['max_ms']:.0f} ms)")
+        self._label.configure(text="\n".join(lines))
+        self._after_id = self.root.after(self.REFRESH_MS, self._refresh)
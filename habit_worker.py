@@ -0,0 +1,93 @@
+import queue
+import threading
+import traceback
+
+
+class IOWorker:
+    """Hilo de fondo para la E/S de disco
+
+    Los trabajos se ejecutan en orden en un unico hilo (asi un guardado
+    nunca adelanta a otro). Sus resultados vuelven a una cola que el hilo
+    de Tk vacia con `root.after`, de modo que los callbacks `on_done` y
+    `on_error` siempre corren en el hilo de la interfaz.
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, root, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._outstanding = 0
+        self._after_id = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="habit-io", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        """Indicar si quedan trabajos sin terminar o sin entregar"""
+        return self._outstanding > 0
+
+    def submit(self, func, on_done=None, on_error=None):
+        """Encolar `func()`; `on_done(resultado)` u `on_error(excepcion)` se llaman en el hilo de Tk"""
+        if self._stopped:
+            raise RuntimeError("El hilo de E/S ya esta detenido")
+        self._outstanding += 1
+        self._jobs.put((func, on_done, on_error))
+        self._schedule_poll()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            func, on_done, on_error = job
+            try:
+                result = func()
+            except Exception as exc:
+                self._results.put((on_error, exc, True))
+            else:
+                self._results.put((on_done, result, False))
+
+    def _schedule_poll(self):
+        if self._after_id is None and not self._stopped:
+            self._after_id = self.root.after(self.poll_ms, self.poll)
+
+    def poll(self):
+        """Entregar los resultados terminados a sus callbacks
+
+        Un callback que falla se informa y no impide entregar los demas
+        ni seguir sondeando mientras queden trabajos pendientes.
+        """
+        self._after_id = None
+        try:
+            while True:
+                try:
+                    callback, value, failed = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self._outstanding -= 1
+                try:
+                    if callback is not None:
+                        callback(value)
+                    elif failed:
+                        traceback.print_exception(type(value), value, value.__traceback__)
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            if self._outstanding:
+                self._schedule_poll()
+
+    def stop(self, timeout=None):
+        """Terminar los trabajos encolados, entregar sus resultados y parar el hilo"""
+        if self._stopped:
+            return
+        self._stopped = True
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._jobs.put(None)
+        self._thread.join(timeout)
+        self.poll()
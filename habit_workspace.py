@@ -0,0 +1,117 @@
+import json
+import os
+import re
+from collections import OrderedDict
+from habit_search import normalize
+from habit_store import open_store
+from habit_writer import atomic_write_json
+
+WORKSPACE_FILE = "habit_workspace.json"
+DEFAULT_PROFILE = "Principal"
+DEFAULT_DATA_FILE = "habits_data.json"
+CACHE_SIZE = 3
+
+
+class Workspace:
+    """Perfiles de datos (un archivo por perfil) con una cache LRU de almacenes
+
+    El registro vive en habit_workspace.json como {"profiles": {nombre:
+    archivo}, "active": nombre}; sin registro hay un unico perfil sobre
+    habits_data.json, asi que los datos existentes siguen funcionando.
+    Los archivos relativos se resuelven junto al registro.
+
+    Los almacenes abiertos quedan en una cache de `maxsize` perfiles:
+    volver a uno reciente no recarga nada y, al pasar del limite, `put`
+    devuelve los menos usados para que quien los expulsa los guarde y
+    los cierre.
+    """
+
+    def __init__(self, path=WORKSPACE_FILE, maxsize=CACHE_SIZE):
+        self.path = path
+        self.maxsize = maxsize
+        self.profiles = {DEFAULT_PROFILE: DEFAULT_DATA_FILE}
+        self.active = DEFAULT_PROFILE
+        self._stores = OrderedDict() # {nombre: almacen cargado}, del menos al mas reciente
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.profiles = data.get("profiles") or self.profiles
+            self.active = data.get("active") if data.get("active") in self.profiles else next(iter(self.profiles))
+
+    def names(self):
+        return list(self.profiles)
+
+    def data_file(self, name):
+        """Ruta del archivo de datos de un perfil"""
+        if name not in self.profiles:
+            raise KeyError(name)
+        return os.path.join(os.path.dirname(self.path), self.profiles[name])
+
+    def add_profile(self, name, data_file=None, sqlite=False):
+        """Registrar un perfil nuevo; por defecto con archivo habits_<nombre>.json (.db con `sqlite`)"""
+        name = name.strip()
+        if not name:
+            raise ValueError("Por favor ingresa el nombre del perfil")
+        if name in self.profiles:
+            raise ValueError("Este perfil ya existe")
+        if data_file is None:
+            slug = re.sub(r"[^a-z0-9]+", "_", normalize(name)).strip("_") or "perfil"
+            extension = ".db" if sqlite else ".json"
+            data_file, suffix = f"habits_{slug}{extension}", 2
+            while data_file in self.profiles.values():
+                data_file, suffix = f"habits_{slug}_{suffix}{extension}", suffix + 1
+        self.profiles[name] = data_file
+        return data_file
+
+    def activate(self, name):
+        """Marcar un perfil como activo (se recuerda al guardar el registro)"""
+        if name not in self.profiles:
+            raise KeyError(name)
+        self.active = name
+
+    def prepare_save(self):
+        """Copiar el registro y devolver la funcion que lo escribe (solo E/S)"""
+        data = {"profiles": dict(self.profiles), "active": self.active}
+        return lambda: atomic_write_json(self.path, data)
+
+    def save(self):
+        self.prepare_save()()
+
+    def open(self, name):
+        """Almacen sin cargar del perfil (la carga la hace quien lo pide)"""
+        return open_store(self.data_file(name), journal=True)
+
+    def cached(self, name):
+        """Almacen ya cargado del perfil, o None; cuenta como uso reciente"""
+        store = self._stores.get(name)
+        if store is not None:
+            self._stores.move_to_end(name)
+        return store
+
+    def put(self, name, store, keep=()):
+        """Guardar un almacen cargado como el mas reciente
+
+        Devuelve los [(nombre, almacen)] expulsados por pasar de `maxsize`,
+        del menos usado al mas usado y nunca el perfil activo ni los de
+        `keep` (una carga que termina tarde no expulsa al que se esta
+        mostrando).
+        """
+        self._stores[name] = store
+        self._stores.move_to_end(name)
+        protected = {self.active, *keep}
+        evicted = []
+        while len(self._stores) > self.maxsize:
+            oldest = next((other for other in self._stores if other not in protected), None)
+            if oldest is None:
+                break
+            evicted.append((oldest, self._stores.pop(oldest)))
+        return evicted
+
+    def close(self):
+        """Cerrar todos los almacenes de la cache"""
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+
+    def __len__(self):
+        return len(self._stores)
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+
+def fsync_directory(path):
+    """Sincronizar el directorio para que el rename sea durable (solo POSIX)"""
+    if os.name != "posix":
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@lru_cache(maxsize=None)
+def _new_file_mode():
+    """Permisos de un archivo nuevo segun la umask del proceso
+
+    Se lee una sola vez y solo cuando hace falta: consultarla exige
+    cambiarla y eso no es seguro entre hilos.
+    """
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+def _file_mode(path):
+    """Permisos que debe conservar `path` al reemplazarlo"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return _new_file_mode()
+
+
+@contextmanager
+def atomic_open(path, newline=None):
+    """Abrir un archivo temporal de texto que reemplaza a `path` al cerrarse
+
+    Si el bloque falla el temporal se borra y `path` queda intacto.
+    """
+    import tempfile # diferido: acelera el arranque de la CLI, que casi nunca reescribe el snapshot
+    directory = os.path.dirname(os.path.abspath(path))
+    suffix = os.path.splitext(path)[1]
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.name == "posix":
+            # mkstemp crea el temporal con 0600: conservar los permisos del archivo
+            os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(directory)
+
+
+def atomic_write_json(path, data, indent=4):
+    """Escribir JSON en un archivo temporal y renombrarlo atomicamente
+
+    Un cierre inesperado deja el archivo anterior intacto en lugar de
+    un snapshot truncado.
+    """
+    with atomic_open(path) as f:
+        json.dump(data, f, indent=indent)
+
+
+def _timer_after(delay, callback):
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def _timer_cancel(timer):
+    timer.cancel()
+
+
+class CoalescingWriter:
+    """Agrupar varias solicitudes de guardado en un solo flush
+
+    Cada `request()` reinicia la ventana de inactividad; el flush se
+    ejecuta una sola vez cuando pasan `delay` segundos sin cambios. Por
+    defecto usa threading.Timer; la interfaz pasa `root.after` para que
+    el guardado ocurra en el hilo de Tk.
+    """
+
+    def __init__(self, flush, delay=0.5, after=None, cancel=None):
+        self._flush = flush
+        self.delay = delay
+        self._after = after or _timer_after
+        self._cancel = cancel or _timer_cancel
+        self._handle = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Indicar si hay un flush programado"""
+        return self._handle is not None
+
+    def request(self):
+        """Solicitar un guardado; se agrupa con los siguientes"""
+        with self._lock:
+            if self._handle is not None:
+                self._cancel(self._handle)
+            self._handle = self._after(self.delay, self._fire)
+
+    def _fire(self):
+        with self._lock:
+            self._handle = None
+        self._flush()
+
+    def flush(self):
+        """Ejecutar inmediatamente el guardado pendiente, si lo hay"""
+        with self._lock:
+            if self._handle is None:
+                return
+            self._cancel(self._handle)
+            self._handle = None
+        self._flush()
@@ -0,0 +1,206 @@
+import json
+import os
+from datetime import date, timedelta
+
+from habit_store import HabitStore
+
+TODAY = date.today()
+
+
+def open_journaled(path, lazy=False, compact_every=500):
+    store = HabitStore(str(path), journal=True, compact_every=compact_every)
+    store.load_data(lazy=lazy)
+    return store
+
+
+def journal_lines(path):
+    with open(str(path) + ".journal", "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_replay_reapplies_changes_after_snapshot(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path)
+    store.add_habit("Leer", created_date=TODAY - timedelta(days=10))
+    store.add_habit("Correr")
+    store.save_data()
+
+    store.set_completions(["Leer"], [TODAY - timedelta(days=2), TODAY - timedelta(days=1), TODAY])
+    store.set_completion("Leer", TODAY - timedelta(days=2), False)
+    store.update_habit("Leer", category="Estudio")
+    store.delete_habit("Correr")
+    store.persist()
+    assert os.path.exists(str(path) + ".journal")
+
+    reloaded = open_journaled(path)
+    assert reloaded.to_dict() == store.to_dict()
+    assert reloaded.calculate_streak("Leer") == 2
+    assert reloaded.habits["Leer"]["category"] == "Estudio"
+    assert "Correr" not in reloaded.habits
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path, compact_every=5)
+    store.add_habit("Leer", created_date=TODAY - timedelta(days=30))
+    store.persist()
+    for offset in range(6):
+        store.set_completion("Leer", TODAY - timedelta(days=offset))
+        store.persist()
+
+    with open(path, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    # 7 registros: el quinto compacta y los dos ultimos siguen en el diario
+    # detras del marcador de la compactacion
+    assert snapshot["journal_seq"] == 5
+    lines = [json.loads(line) for line in journal_lines(path)]
+    assert lines[0] == {"op": "snapshot", "seq": 5}
+    assert [line["seq"] for line in lines[1:]] == [6, 7]
+    assert open_journaled(path).count_completions("Leer") == 6
+
+
+def test_torn_last_line_is_trimmed_before_appending(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path)
+    store.add_habit("Leer")
+    store.persist()
+    with open(str(path) + ".journal", "a", encoding="utf-8") as f:
+        f.write('{"op":"done","name":"Le') # escritura cortada por un cierre inesperado
+
+    store = open_journaled(path)
+    store.set_completion("Leer", TODAY)
+    store.persist()
+
+    assert all(json.loads(line) for line in journal_lines(path))
+    assert open_journaled(path).is_completed("Leer", TODAY)
+
+
+def test_records_already_in_snapshot_are_not_replayed(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path)
+    store.add_habit("Leer")
+    store.persist()
+    with open(str(path) + ".journal", "r", encoding="utf-8") as f:
+        stale = f.read()
+    store.delete_habit("Leer")
+    store.add_habit("Leer", category="Estudio")
+    store.save_data()
+
+    # Cierre entre el rename del snapshot y el borrado del diario
+    with open(str(path) + ".journal", "w", encoding="utf-8") as f:
+        f.write(stale)
+
+    store = open_journaled(path)
+    assert store.habits["Leer"]["category"] == "Estudio"
+    store.set_completion("Leer", TODAY)
+    store.persist()
+    assert open_journaled(path).is_completed("Leer", TODAY)
+
+
+def test_corrupt_line_is_skipped(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path)
+    store.add_habit("Leer")
+    store.persist()
+    with open(str(path) + ".journal", "a", encoding="utf-8") as f:
+        f.write("no es json\n")
+    store.set_completion("Leer", TODAY)
+    store.persist()
+
+    assert open_journaled(path).is_completed("Leer", TODAY)
+
+
+def test_lazy_load_matches_eager_load(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path)
+    for index in range(4):
+        name = f"Habito {index}"
+        store.add_habit(name, created_date=TODAY - timedelta(days=40))
+        store.set_completions([name], [TODAY - timedelta(days=offset) for offset in range(0, 40, index + 1)])
+    store.save_data()
+    store.set_completion("Habito 1", TODAY + timedelta(days=1)) # dia futuro
+    store.set_completion("Habito 2", TODAY, False)
+    store.persist()
+
+    lazy, eager = open_journaled(path, lazy=True), open_journaled(path)
+    assert lazy.pending_history()
+    for name in eager.habits:
+        assert lazy.calculate_streak(name) == eager.calculate_streak(name)
+        assert lazy.longest_streak(name) == eager.longest_streak(name)
+        assert lazy.last_completion(name) == eager.last_completion(name)
+    assert lazy.completed_today() == eager.completed_today()
+
+    # Marcar sin decodificar el historial se aplica al cargarlo
+    lazy.set_completion("Habito 3", TODAY - timedelta(days=1))
+    lazy.persist()
+    eager.set_completion("Habito 3", TODAY - timedelta(days=1))
+    assert lazy.to_dict() == eager.to_dict()
+    assert open_journaled(path).to_dict() == eager.to_dict()
+
+
+def test_two_stores_on_the_same_file(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path)
+    store.add_habit("A")
+    store.add_habit("B")
+    store.save_data()
+
+    gui, cli = open_journaled(path), open_journaled(path)
+    changes = []
+    gui.on_external_change = lambda: changes.append(True)
+    cli.set_completion("A", TODAY)
+    cli.persist()
+    gui.set_completion("B", TODAY)
+    gui.persist()
+
+    seqs = [json.loads(line)["seq"] for line in journal_lines(path)]
+    assert len(seqs) == len(set(seqs))
+    assert changes and gui.is_completed("A", TODAY)
+
+    # El snapshot de la interfaz no pierde la completitud de la CLI
+    gui.save_data()
+    reloaded = open_journaled(path)
+    assert reloaded.is_completed("A", TODAY) and reloaded.is_completed("B", TODAY)
+
+
+def test_store_rereads_snapshot_compacted_by_another_process(tmp_path):
+    path = tmp_path / "habits.json"
+    store = open_journaled(path)
+    store.add_habit("A")
+    store.save_data()
+
+    gui, cli = open_journaled(path), open_journaled(path)
+    with gui.bulk_update():
+        gui.add_habit("Importado")
+        gui.set_completions(["Importado"], [TODAY - timedelta(days=offset) for offset in range(40)])
+    gui.set_completion("A", TODAY - timedelta(days=1))
+    cli.add_habit("C")
+    cli.set_completion("A", TODAY)
+    cli.save_data() # compacta mientras la interfaz tiene cambios sin guardar
+    gui.persist()
+
+    assert set(gui.habits) == {"A", "C", "Importado"}
+    assert gui.calculate_streak("A") == 2
+    reloaded = open_journaled(path)
+    assert reloaded.to_dict() == gui.to_dict()
+    assert reloaded.count_completions("Importado") == 40
+
+
+def test_cli_process_and_open_store(tmp_path):
+    import subprocess
+    import sys
+
+    path = tmp_path / "habits.json"
+    gui = open_journaled(path)
+    gui.add_habit("A")
+    gui.add_habit("B")
+    gui.save_data()
+
+    cli = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "habit_cli.py")
+    subprocess.run([sys.executable, cli, "--data", str(path), "done", "A"], check=True,
+                   stdout=subprocess.DEVNULL)
+    gui.set_completion("B", TODAY)
+    gui.save_data()
+
+    reloaded = open_journaled(path)
+    assert reloaded.is_completed("A", TODAY) and reloaded.is_completed("B", TODAY)
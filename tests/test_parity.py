@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+import pytest
+
+from habit_store import HabitStore, open_store
+
+TODAY = date.today()
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    path = tmp_path / ("habits.json" if request.param == "json" else "habits.db")
+    store = open_store(str(path))
+    store.load_data()
+    yield store
+    store.close()
+
+
+def fill(store):
+    """Mismos cambios en cualquier backend"""
+    store.add_habit("Leer", "Estudio", "20 paginas", TODAY - timedelta(days=60))
+    store.add_habit("Correr", "Ejercicio", "", TODAY - timedelta(days=30), "weekdays:0,2,4")
+    store.add_habit("Piano", "Personal", "", TODAY - timedelta(days=30), "weekly:3")
+    store.add_habit("Regar", "Otro", "", TODAY - timedelta(days=30), "every:3")
+    store.set_completions(["Leer"], [TODAY - timedelta(days=offset) for offset in range(0, 60, 1) if offset % 9])
+    store.set_completions(["Correr", "Piano", "Regar"], [TODAY - timedelta(days=offset) for offset in range(30)])
+    store.set_completions(["Piano"], [TODAY - timedelta(days=offset) for offset in range(0, 30, 2)], False)
+    store.set_completion("Leer", TODAY - timedelta(days=9))
+    store.toggle_completion("Regar", TODAY)
+    store.update_habit("Leer", description="30 paginas")
+    store.persist()
+
+
+@pytest.fixture
+def reference(tmp_path):
+    """El mismo contenido en el backend JSON de referencia"""
+    store = HabitStore(str(tmp_path / "reference.json"))
+    fill(store)
+    return store
+
+
+def test_queries_match_json_store(store, reference):
+    fill(store)
+    assert store.habits == reference.habits
+    for name in reference.habits:
+        assert store.calculate_streak(name) == reference.calculate_streak(name), name
+        assert store.longest_streak(name) == reference.longest_streak(name), name
+        assert store.last_completion(name) == reference.last_completion(name), name
+        assert store.count_completions(name) == reference.count_completions(name), name
+        assert store.completed_dates(name, TODAY - timedelta(days=20), TODAY) == \
+            reference.completed_dates(name, TODAY - timedelta(days=20), TODAY), name
+        assert store.calculate_completion_rate(name, 14) == pytest.approx(
+            reference.calculate_completion_rate(name, 14)), name
+    assert store.completed_today() == reference.completed_today()
+    assert store.average_streak() == pytest.approx(reference.average_streak())
+
+
+def test_data_survives_reload(store, reference):
+    fill(store)
+    store.close()
+    reopened = open_store(store.data_file)
+    reopened.load_data()
+    try:
+        assert reopened.to_dict() == reference.to_dict()
+    finally:
+        reopened.close()
+
+
+def test_delete_and_restore(store, reference):
+    fill(store)
+    tombstone = store.delete_habit("Leer")
+    assert "Leer" not in store.habits and store.calculate_streak("Leer") == 0
+    store.restore_habit("Leer", tombstone)
+    assert store.to_dict() == reference.to_dict()
+
+
+def test_sqlite_import_normalizes_and_rejects(tmp_path):
+    from habit_sqlite import SqliteHabitStore
+    store = SqliteHabitStore(str(tmp_path / "habits.db"))
+    store.load_data()
+    store.import_data({"habits": {"Leer": {"created_date": "2024-01-01", "target_frequency": "Weekly:7"}},
+                       "completions": {"Leer": ["2024-01-02", "2024-01-02"]}})
+    assert store.habits["Leer"]["target_frequency"] == "daily"
+    assert store.count_completions("Leer") == 1
+    with pytest.raises(ValueError):
+        store.import_data({"habits": {"Correr": {"target_frequency": "cada tanto"}}})
+    with pytest.raises(ValueError):
+        store.import_data({"habits": {}, "completions": {"Leer": ["2024-13-01"]}})
+    assert list(store.habits) == ["Leer"]
+    store.close()
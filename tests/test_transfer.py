@@ -0,0 +1,76 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from habit_store import open_store
+from habit_transfer import export_file, import_file
+
+TODAY = date.today()
+
+
+def open_loaded(path):
+    store = open_store(str(path), journal=True) if str(path).endswith(".json") else open_store(str(path))
+    store.load_data()
+    return store
+
+
+def contents(store):
+    """Metadatos y fechas de cada habito, comparables entre backends"""
+    return store.habits, {name: store.completed_dates(name) for name in store.habits}
+
+
+@pytest.fixture
+def source(tmp_path):
+    store = open_loaded(tmp_path / "source.json")
+    store.add_habit("Leer", "Estudio", "Novela, 20 paginas", TODAY - timedelta(days=20))
+    store.add_habit("Cafe sin azucar", "Salud", 'Dice "no"', TODAY - timedelta(days=5), "weekdays:0,3")
+    store.add_habit("Meditacion", "Personal", "", TODAY) # sin completitudes
+    store.set_completions(["Leer"], [TODAY - timedelta(days=offset) for offset in range(0, 20, 3)])
+    store.set_completions(["Cafe sin azucar"], [TODAY, TODAY - timedelta(days=4)])
+    store.save_data()
+    return store
+
+
+@pytest.mark.parametrize("extension", [".csv", ".ndjson", ".jsonl"])
+@pytest.mark.parametrize("target", ["target.json", "target.db"])
+def test_export_import_round_trip(tmp_path, source, extension, target):
+    path = str(tmp_path / ("export" + extension))
+    assert export_file(source, path) == 7 + 2 + 1
+
+    store = open_loaded(tmp_path / target)
+    try:
+        stats = import_file(store, path)
+        assert stats == {"habits": 3, "completions": 9}
+        assert contents(store) == contents(source)
+    finally:
+        store.close()
+
+
+def test_import_keeps_existing_habits(tmp_path, source):
+    path = str(tmp_path / "export.csv")
+    export_file(source, path)
+    store = open_loaded(tmp_path / "target.json")
+    store.add_habit("Leer", "Otro", "mia")
+    store.set_completion("Leer", TODAY - timedelta(days=1))
+
+    stats = import_file(store, path)
+    assert stats["habits"] == 2
+    assert store.habits["Leer"]["description"] == "mia"
+    assert store.count_completions("Leer") == 8
+
+
+def test_export_refuses_the_store_files(source):
+    size = os.path.getsize(source.data_file)
+    for path, fmt in ((source.data_file, "ndjson"), (source.data_file + ".journal", "ndjson")):
+        with pytest.raises(ValueError):
+            export_file(source, path, fmt)
+    assert os.path.getsize(source.data_file) == size
+
+
+def test_unknown_format_leaves_target_untouched(tmp_path, source):
+    path = tmp_path / "notas.txt"
+    path.write_text("contenido previo", encoding="utf-8")
+    with pytest.raises(ValueError):
+        export_file(source, str(path))
+    assert path.read_text(encoding="utf-8") == "contenido previo"
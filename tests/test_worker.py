@@ -0,0 +1,55 @@
+import threading
+
+from habit_worker import IOWorker
+
+
+class FakeRoot:
+    """Sustituto de Tk: `after` guarda los callbacks y `run` ejecuta los ya programados"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, func):
+        self.pending.append(func)
+        return len(self.pending)
+
+    def after_cancel(self, after_id):
+        pass
+
+    def run(self):
+        pending, self.pending = self.pending, []
+        for func in pending:
+            func()
+
+
+def test_failing_callback_does_not_stop_delivery(capsys):
+    root = FakeRoot()
+    worker = IOWorker(root)
+    release = threading.Event()
+    delivered = []
+
+    def broken(value):
+        raise RuntimeError("callback roto")
+
+    worker.submit(lambda: 1, on_done=broken)
+    worker.submit(lambda: 2, on_done=delivered.append)
+    worker.submit(release.wait, on_done=lambda _: delivered.append("lento"))
+    while not delivered:
+        root.run()
+    # El trabajo lento sigue pendiente: el sondeo debe seguir programado
+    assert worker.busy and root.pending
+    release.set()
+    while worker.busy:
+        root.run()
+    worker.stop()
+    assert delivered == [2, "lento"]
+    assert "callback roto" in capsys.readouterr().err
+
+
+def test_errors_reach_on_error():
+    root = FakeRoot()
+    worker = IOWorker(root)
+    errors = []
+    worker.submit(lambda: 1 / 0, on_error=errors.append)
+    worker.stop()
+    assert len(errors) == 1 and isinstance(errors[0], ZeroDivisionError)
@@ -0,0 +1,79 @@
+import json
+import os
+import stat
+
+import pytest
+
+from habit_writer import CoalescingWriter, atomic_open, atomic_write_json
+
+
+class FakeClock:
+    """`after`/`cancel` manuales para disparar los flush en el test"""
+
+    def __init__(self):
+        self.scheduled = {}
+        self.next_id = 0
+
+    def after(self, delay, callback):
+        self.next_id += 1
+        self.scheduled[self.next_id] = callback
+        return self.next_id
+
+    def cancel(self, handle):
+        del self.scheduled[handle]
+
+    def fire(self):
+        for handle in list(self.scheduled):
+            self.scheduled.pop(handle)()
+
+
+def test_atomic_write_replaces_content(tmp_path):
+    path = tmp_path / "data.json"
+    atomic_write_json(str(path), {"a": 1})
+    atomic_write_json(str(path), {"a": 2})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 2}
+    assert [entry.name for entry in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("anterior", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with atomic_open(str(path)) as f:
+            f.write("a medias")
+            raise RuntimeError("fallo")
+    assert path.read_text(encoding="utf-8") == "anterior"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["data.json"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="permisos POSIX")
+def test_permissions_are_kept(tmp_path):
+    path = tmp_path / "data.json"
+    atomic_write_json(str(path), {})
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+    os.chmod(path, 0o640)
+    atomic_write_json(str(path), {"a": 1})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_coalescing_writer_flushes_once():
+    clock, calls = FakeClock(), []
+    writer = CoalescingWriter(lambda: calls.append(1), after=clock.after, cancel=clock.cancel)
+    for _ in range(5):
+        writer.request()
+    assert len(clock.scheduled) == 1 and calls == []
+    clock.fire()
+    assert calls == [1]
+
+
+def test_coalescing_writer_flush_now():
+    clock, calls = FakeClock(), []
+    writer = CoalescingWriter(lambda: calls.append(1), after=clock.after, cancel=clock.cancel)
+    writer.flush()
+    assert calls == []
+    writer.request()
+    writer.flush()
+    assert calls == [1] and not clock.scheduled